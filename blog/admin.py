@@ -1,9 +1,13 @@
 from django.contrib import admin
+from django.core.cache import cache
+from django.db import transaction
 from django.utils.safestring import mark_safe
-from django.db import models
 
 from mptt.admin import DraggableMPTTAdmin
-from .models import Category, Article
+from mediafiles.derivatives import get_variant_url
+from .cache import invalidate_articles
+from .counters import apply_counter_deltas, get_counter_deltas
+from .models import Category, Article, ARTICLES_COUNT_CACHE_KEY
 
 
 @admin.register(Category)
@@ -20,6 +24,7 @@ class CategoryAdmin(DraggableMPTTAdmin):
         "title",
         "slug",
         "articles_count",
+        "articles_total",
     )
     # поля, которые имеют ссылку на объект модели (по клику на соответсвующее поле -> переход к редактированию)
     list_display_links = ("indented_title", "title", "slug")
@@ -32,33 +37,6 @@ class CategoryAdmin(DraggableMPTTAdmin):
         ("Описание", {"fields": ("description",)}),
     )
 
-    def get_queryset(self, request):
-        """
-        Метод, определяющий кол-во статей, которые были опубликованы в каждой из категорий
-        """
-        qs = super().get_queryset(request)
-
-        # Создание нового поля "articles_count" в qs, в который передается сумма статей со статусом = 1 (PUBLISHED)
-        qs = qs.annotate(
-            articles_count=models.Sum(
-                models.Case(
-                    models.When(articles__status=True, then=1),
-                    default=0,
-                    output_field=models.IntegerField(),
-                )
-            )
-        )
-
-        return qs
-
-    # Декоратор для определения понятного для человека названия метода, которое будет отображаться в админ-панели
-    @admin.display(description="Статей в категории")
-    def articles_count(self, instance):
-        """
-        Метод вывода информации из qs, по полю articles_count
-        """
-        return instance.articles_count
-
 
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
@@ -120,7 +98,12 @@ class ArticleAdmin(admin.ModelAdmin):
         """
         # Если поле thumbnail объекта модели существует, вернуть html тег img высотой 75px
         if instance.thumbnail:
-            return mark_safe(f'<img src="{instance.thumbnail.url}" height=75>')
+            # Наименьший вариант превью (если варианты еще не созданы - сжатое превью или оригинал)
+            url = (
+                get_variant_url(instance.thumbnail_variants, 0)
+                or instance.thumbnail_preview.url
+            )
+            return mark_safe(f'<img src="{url}" height=75>')
 
     # Декоратор для определения понятного для человека названия метода, которое будет отображаться в админ-панели
     @admin.display(description="Превью")
@@ -130,20 +113,47 @@ class ArticleAdmin(admin.ModelAdmin):
         """
         # Если поле thumbnail объекта модели существует, вернуть html тег img высотой 150px
         if instance.thumbnail:
-            return mark_safe(f'<img src="{instance.thumbnail.url}" height=150>')
+            # Наименьший вариант превью (если варианты еще не созданы - сжатое превью или оригинал)
+            url = (
+                get_variant_url(instance.thumbnail_variants, 0)
+                or instance.thumbnail_preview.url
+            )
+            return mark_safe(f'<img src="{url}" height=150>')
+
+    def after_status_update(self, rows, status, using):
+        """
+        Метод, выполняющий то, что при сохранении статьи делают сигналы (update их не вызывает): обновление
+        счетчиков статей в категориях, сброс закэшированного общего кол-ва статей и инвалидация кэша страниц.
+        rows - кортежи (id, id категории, прежний статус)
+        """
+        deltas = get_counter_deltas(
+            (old_status, category_id, status, category_id)
+            for _, category_id, old_status in rows
+        )
+        apply_counter_deltas(deltas, using=using)
+        cache.delete(ARTICLES_COUNT_CACHE_KEY.format("all"))
+        # Кэш страниц инвалидируется после коммита (см. article_invalidate_page_cache)
+        articles = [(pk, category_id) for pk, category_id, _ in rows]
+        transaction.on_commit(lambda: invalidate_articles(articles), using=using)
 
     # Декоратор для определения понятного для человека названия "действия", которое будет отображаться в админ-панели
     @admin.action(description="Опубликовать выбранные записи")
     def set_status_published(self, requset, queryset):
+        # Запомним затрагиваемые статьи: update не вызывает сигналы, поэтому кэш страниц сбрасываем вручную
+        rows = list(queryset.values_list("id", "category_id", "status"))
         # Для полученного в request qs обновим поле 'status'
         count = queryset.update(status=Article.Status.PUBLISHED)
+        self.after_status_update(rows, Article.Status.PUBLISHED, queryset.db)
         # Вернем сообщение с кол-вом измененных записей
         self.message_user(requset, f"{count} записи(-ей) опубликованы")
 
     # Декоратор для определения понятного для человека названия "действия", которое будет отображаться в админ-панели
     @admin.action(description="Снять с публикации выбранные записи")
     def set_status_draft(self, requset, queryset):
+        # Запомним затрагиваемые статьи: update не вызывает сигналы, поэтому кэш страниц сбрасываем вручную
+        rows = list(queryset.values_list("id", "category_id", "status"))
         # Для полученного в request qs обновим поле 'status'
         count = queryset.update(status=Article.Status.DRAFT)
+        self.after_status_update(rows, Article.Status.DRAFT, queryset.db)
         # Вернем сообщение с кол-вом измененных записей
         self.message_user(requset, f"{count} записи(-ей) сняты с публикации")
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "blog"
+
+    def ready(self):
+        # Приемник django_ckeditor_5, удаляющий неиспользуемые файлы редактора, делает отдельный запрос статьи
+        # при каждом сохранении (и ищет файлы без учета папок по датам). Эту работу выполняет pre_save приемник
+        # статьи по уже загруженной прежней версии (см. blog.models.article_delete_thumbnail_on_update)
+        from django.db.models.signals import pre_save
+        from django_ckeditor_5.signals import cleanup_unused_ckeditor_images_on_update
+
+        pre_save.disconnect(cleanup_unused_ckeditor_images_on_update)
@@ -0,0 +1,17 @@
+from utils import replace_views
+from .async_views import (
+    AsyncArticlesByCategoryView,
+    AsyncArticlesView,
+    AsyncArticleView,
+)
+from .urls import urlpatterns as sync_urlpatterns
+
+# Маршруты блога для ASGI: страницы только для чтения обслуживают async представления, остальные - синхронные
+urlpatterns = replace_views(
+    sync_urlpatterns,
+    {
+        "blog": AsyncArticlesView.as_view(),
+        "articles_by_category": AsyncArticlesByCategoryView.as_view(),
+        "article": AsyncArticleView.as_view(),
+    },
+)
@@ -0,0 +1,239 @@
+"""
+Асинхронные версии представлений блога только для чтения (для ASGI, см. config/asgi_urls.py).
+
+Запросы к БД и кэшу выполняются асинхронно (aget, async for, cache.aget_many), пользователь, дерево категорий
+и кол-во статей для пагинации загружаются до рендеринга, поэтому шаблон рендерится без запросов к БД
+и один ASGI процесс обслуживает много одновременных читателей без потока на каждый запрос.
+Синхронные версии (blog/views.py) остаются для WSGI.
+"""
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Max
+from django.http import Http404
+from django.shortcuts import render
+from django.views import View
+
+from utils import DataMixin, KeysetPaginationMixin
+from .cache import (
+    AsyncCachedPageMixin,
+    ARTICLE_LIST_TAG,
+    CATEGORY_TREE_TAG,
+    aget_category_node,
+    article_tag,
+    category_tag,
+)
+from .models import Article, Category, ARTICLES_COUNT_CACHE_KEY
+from .search import get_search_backend
+from .templatetags.blog_tags import aget_category_tree_html
+from .views import get_subtree_ids
+
+
+# AsyncCachedPageMixin - миксин кэширования страницы целиком для анонимных пользователей
+# DataMixin - миксин с данными для панели навигации
+# KeysetPaginationMixin - миксин курсорной пагинации (без COUNT(*) и OFFSET на каждой странице)
+class AsyncArticlesView(AsyncCachedPageMixin, DataMixin, KeysetPaginationMixin, View):
+    """
+    Представление: отображение статей в блоге (асинхронная версия ArticlesView)
+    """
+
+    paginate_by = 5  # Настройка пагинации (5 статей на странице)
+    template_name = "blog/blog.html"  # Путь к шаблону html
+
+    def get_search_query(self):
+        """
+        Метод получения поискового запроса из request.GET
+        """
+        return self.request.GET.get("search", "").strip()
+
+    def get_count_cache_key(self):
+        """
+        Ключ кэша общего кол-ва опубликованных статей
+        """
+        return ARTICLES_COUNT_CACHE_KEY.format("all")
+
+    def get_cache_tags(self):
+        """
+        Теги кэша страницы: лента статей и дерево категорий в боковой панели
+        """
+        return [ARTICLE_LIST_TAG, CATEGORY_TREE_TAG]
+
+    async def aget_last_modified(self):
+        """
+        Время последнего изменения опубликованных статей (MAX по индексу статуса и времени обновления). Для
+        результатов поиска условные запросы не поддерживаются
+        """
+        if self.get_search_query():
+            return None
+        result = await (
+            Article.objects.get_queryset()
+            .filter(status=Article.Status.PUBLISHED)
+            .aaggregate(last_modified=Max("time_update"))
+        )
+        return result["last_modified"]
+
+    async def apaginate_search(self, search_query):
+        """
+        Метод получения страницы результатов поиска (стандартная постраничная пагинация). Кол-во результатов
+        ограничено BLOG_SEARCH_LIMIT, поэтому они загружаются целиком и разбиваются на страницы в памяти
+        """
+        queryset = Article.objects.summary()
+        # Поисковый бэкенд выполняет синхронный запрос к индексу (FTS5), поэтому вызывается в потоке
+        queryset = await sync_to_async(get_search_backend(queryset.db).search)(
+            queryset, search_query
+        )
+        paginator = Paginator([article async for article in queryset], self.paginate_by)
+        try:
+            page = paginator.page(self.request.GET.get("page") or 1)
+        except InvalidPage:
+            raise Http404("Некорректный номер страницы")
+        return paginator, page
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Метод, выполняющийся при GET запросе
+        """
+        search_query = self.get_search_query()
+        if search_query:
+            paginator, page = await self.apaginate_search(search_query)
+        else:
+            paginator, page = await self.apaginate_queryset(
+                Article.objects.summary().order_by("-time_create"), self.paginate_by
+            )
+        context = await self.aget_mixin_context(
+            title="AM | Блог",
+            articles=page.object_list,
+            paginator=paginator,
+            page_obj=page,
+            is_paginated=page.has_other_pages(),
+            category_tree_html=await aget_category_tree_html(),
+        )
+        return render(request, self.template_name, context=context)
+
+
+# AsyncCachedPageMixin - миксин кэширования страницы целиком для анонимных пользователей
+# DataMixin - миксин с данными для панели навигации
+# KeysetPaginationMixin - миксин курсорной пагинации (без COUNT(*) и OFFSET на каждой странице)
+class AsyncArticlesByCategoryView(
+    AsyncCachedPageMixin, DataMixin, KeysetPaginationMixin, View
+):
+    """
+    Представление: отображение статей категории и ее подкатегорий (асинхронная версия ArticlesByCategoryView)
+    """
+
+    paginate_by = 5  # Настройка пагинации (5 статей на странице)
+    template_name = "blog/blog.html"  # Путь к шаблону html
+    category = None  # Категория (CategoryNode из кэша)
+
+    async def aget_category(self):
+        """
+        Метод получения категории по slug из кэша (один раз за запрос)
+        """
+        if self.category is None:
+            self.category = await aget_category_node(self.kwargs["slug"])
+            if self.category is None:
+                raise Http404("Категория не найдена")
+        return self.category
+
+    def get_count_function(self):
+        """
+        Кол-во опубликованных статей категории вместе с подкатегориями берется из денормализованного счетчика
+        (асинхронная функция)
+        """
+        return lambda: (
+            Category.objects.filter(pk=self.category.pk)
+            .values_list("articles_total", flat=True)
+            .afirst()
+        )
+
+    def get_cache_tags(self):
+        """
+        Теги кэша страницы: статьи категории и дерево категорий в боковой панели
+        """
+        return [category_tag(self.category.pk), CATEGORY_TREE_TAG]
+
+    async def aget_last_modified(self):
+        """
+        Время последнего изменения опубликованных статей категории и ее подкатегорий
+        """
+        category = await self.aget_category()
+        result = await (
+            Article.objects.get_queryset()
+            .filter(
+                status=Article.Status.PUBLISHED,
+                category__in=get_subtree_ids(category),
+            )
+            .aaggregate(last_modified=Max("time_update"))
+        )
+        return result["last_modified"]
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Метод, выполняющийся при GET запросе
+        """
+        category = await self.aget_category()
+        paginator, page = await self.apaginate_queryset(
+            Article.objects.summary().filter(category__in=get_subtree_ids(category)),
+            self.paginate_by,
+        )
+        context = await self.aget_mixin_context(
+            title=f"AM | {category.title}",
+            articles=page.object_list,
+            paginator=paginator,
+            page_obj=page,
+            is_paginated=page.has_other_pages(),
+            category_tree_html=await aget_category_tree_html(),
+        )
+        return render(request, self.template_name, context=context)
+
+
+# AsyncCachedPageMixin - миксин кэширования страницы целиком для анонимных пользователей
+# DataMixin - миксин с данными для панели навигации
+class AsyncArticleView(AsyncCachedPageMixin, DataMixin, View):
+    """
+    Представление: отображение отдельной статьи (асинхронная версия ArticleView)
+    """
+
+    template_name = "blog/article.html"  # Путь к шаблону html
+
+    def get_cache_tags(self):
+        """
+        Теги кэша страницы: сама статья
+        """
+        return [article_tag(self.object.pk)]
+
+    async def aget_last_modified(self):
+        """
+        Время последнего изменения статьи (запрос только id и времени обновления по уникальному slug)
+        """
+        row = (
+            await Article.objects.get_queryset()
+            .filter(slug=self.kwargs["slug"], status=Article.Status.PUBLISHED)
+            .values_list("pk", "time_update")
+            .afirst()
+        )
+        if row is None:
+            return None
+        self.article_pk, last_modified = row
+        return last_modified
+
+    async def aget_conditional_tags(self):
+        """
+        Теги страницы для ETag: статья (например, ее превью меняет фоновая задача без изменения времени обновления)
+        """
+        return [article_tag(self.article_pk)]
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Метод, выполняющийся при GET запросе
+        """
+        try:
+            self.object = await Article.objects.all().aget(slug=self.kwargs["slug"])
+        except Article.DoesNotExist:
+            raise Http404("Статья не найдена")
+        context = await self.aget_mixin_context(
+            title=f"AM | {self.object.title}",
+            article=self.object,
+            object=self.object,
+        )
+        return render(request, self.template_name, context=context)
@@ -0,0 +1,415 @@
+"""
+Кэш готовых HTML страниц блога для анонимных читателей с инвалидацией по тегам.
+
+Каждая страница сохраняется в кэше вместе с версиями своих тегов ("article-list", "article:<id>", "category:<id>",
+"category-tree"). Инвалидация тега - это запись новой версии, поэтому все страницы с этим тегом становятся
+устаревшими без перебора ключей кэша.
+
+Те же версии тегов вместе со временем последнего изменения статей страницы образуют валидаторы условных
+GET запросов (ETag / Last-Modified): повторный запрос страницы без изменений получает ответ 304 до рендеринга.
+
+Данные, которые сохраняются в кэш, читаются из основной БД (main.routers.primary_reads), а не с реплики: иначе
+страница, отрендеренная по отстающей реплике, закэшировалась бы с уже новыми версиями тегов.
+"""
+
+import hashlib
+from collections import namedtuple
+from uuid import uuid4
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from main.routers import primary_reads
+
+TAG_KEY = "blog:tag:{}"  # Шаблон ключа версии тега
+PAGE_KEY = "blog:page:{}"  # Шаблон ключа закэшированной страницы
+CATEGORY_NODE_KEY = "blog:category-node:{}"  # Шаблон ключа категории по slug
+
+# Общие теги
+ARTICLE_LIST_TAG = "article-list"  # Ленты статей (главная блога, результаты поиска)
+CATEGORY_TREE_TAG = "category-tree"  # Страницы с деревом категорий в боковой панели
+
+
+def article_tag(article_id):
+    return f"article:{article_id}"
+
+
+def category_tag(category_id):
+    return f"category:{category_id}"
+
+
+def get_tag_versions(tags):
+    """
+    Функция получения текущих версий тегов (для отсутствующих в кэше тегов создается новая версия)
+    """
+    keys = {TAG_KEY.format(tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+async def aget_tag_versions(tags):
+    """
+    Асинхронная версия get_tag_versions
+    """
+    keys = {TAG_KEY.format(tag): tag for tag in tags}
+    versions = await cache.aget_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        versions.update(missing)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def invalidate_tags(*tags):
+    """
+    Функция инвалидации тегов: запись новых версий делает устаревшими все страницы с этими тегами
+    """
+    tags = {tag for tag in tags if tag}
+    if tags:
+        cache.set_many({TAG_KEY.format(tag): uuid4().hex for tag in tags}, timeout=None)
+
+
+def get_ancestor_ids(category_ids):
+    """
+    Функция получения id категорий вместе со всеми их предками (одним запросом по диапазонам дерева MPTT)
+    """
+    Category = apps.get_model("blog", "Category")
+    descendants = Category.objects.filter(
+        pk__in=category_ids,
+        tree_id=OuterRef("tree_id"),
+        lft__gte=OuterRef("lft"),
+        rght__lte=OuterRef("rght"),
+    )
+    return list(
+        Category.objects.filter(Exists(descendants)).values_list("pk", flat=True)
+    )
+
+
+def invalidate_articles(rows):
+    """
+    Функция инвалидации страниц по набору статей: rows - пары (id статьи, id категории). Страница категории
+    показывает и статьи подкатегорий, поэтому инвалидируются также все предки категорий статей
+    """
+    tags = {ARTICLE_LIST_TAG}
+    category_ids = set()
+    for article_id, category_id in rows:
+        tags.add(article_tag(article_id))
+        category_ids.add(category_id)
+    if category_ids:
+        tags.update(category_tag(pk) for pk in get_ancestor_ids(category_ids))
+    invalidate_tags(*tags)
+
+
+# Данные категории, необходимые странице категории (в т.ч. положение в дереве MPTT для выборки подкатегорий)
+CategoryNode = namedtuple(
+    "CategoryNode", ["pk", "title", "slug", "tree_id", "lft", "rght"]
+)
+
+
+def get_category_node(slug):
+    """
+    Функция получения категории по slug. Результат (в т.ч. отсутствие категории) хранится в кэше вместе с версией
+    дерева категорий, поэтому обычно функция стоит одного обращения к кэшу и ни одного запроса к БД
+    """
+    key = CATEGORY_NODE_KEY.format(hashlib.md5(slug.encode()).hexdigest())
+    version_key = TAG_KEY.format(CATEGORY_TREE_TAG)
+    cached = cache.get_many([key, version_key])
+    entry = cached.get(key)
+    if entry is not None and entry["version"] == cached.get(version_key):
+        return entry["node"]
+
+    version = get_tag_versions([CATEGORY_TREE_TAG])[CATEGORY_TREE_TAG]
+    Category = apps.get_model("blog", "Category")
+    with primary_reads():
+        row = (
+            Category.objects.filter(slug=slug)
+            .values_list(*CategoryNode._fields)
+            .first()
+        )
+    node = CategoryNode(*row) if row else None
+    cache.set(key, {"version": version, "node": node}, settings.BLOG_PAGE_CACHE_TIMEOUT)
+    return node
+
+
+async def aget_category_node(slug):
+    """
+    Асинхронная версия get_category_node
+    """
+    key = CATEGORY_NODE_KEY.format(hashlib.md5(slug.encode()).hexdigest())
+    version_key = TAG_KEY.format(CATEGORY_TREE_TAG)
+    cached = await cache.aget_many([key, version_key])
+    entry = cached.get(key)
+    if entry is not None and entry["version"] == cached.get(version_key):
+        return entry["node"]
+
+    version = (await aget_tag_versions([CATEGORY_TREE_TAG]))[CATEGORY_TREE_TAG]
+    Category = apps.get_model("blog", "Category")
+    with primary_reads():
+        row = (
+            await Category.objects.filter(slug=slug)
+            .values_list(*CategoryNode._fields)
+            .afirst()
+        )
+    node = CategoryNode(*row) if row else None
+    await cache.aset(
+        key, {"version": version, "node": node}, settings.BLOG_PAGE_CACHE_TIMEOUT
+    )
+    return node
+
+
+def get_page_cache_key(request):
+    """
+    Функция формирования ключа кэша страницы по полному URL (включая строку запроса)
+    """
+    url = request.build_absolute_uri()
+    return PAGE_KEY.format(hashlib.md5(url.encode()).hexdigest())
+
+
+def get_cached_response(key):
+    """
+    Функция получения страницы из кэша. Страница возвращается, только если версии всех ее тегов не изменились
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    versions = cache.get_many([TAG_KEY.format(tag) for tag in entry["tags"]])
+    for tag, version in entry["tags"].items():
+        if versions.get(TAG_KEY.format(tag)) != version:
+            return None
+    return entry["response"]
+
+
+async def aget_cached_response(key):
+    """
+    Асинхронная версия get_cached_response
+    """
+    entry = await cache.aget(key)
+    if entry is None:
+        return None
+    versions = await cache.aget_many([TAG_KEY.format(tag) for tag in entry["tags"]])
+    for tag, version in entry["tags"].items():
+        if versions.get(TAG_KEY.format(tag)) != version:
+            return None
+    return entry["response"]
+
+
+def set_cached_response(key, response, tags, timeout=None):
+    """
+    Функция сохранения страницы в кэше вместе с текущими версиями ее тегов
+    """
+    entry = {"tags": get_tag_versions(tags), "response": response}
+    cache.set(
+        key,
+        entry,
+        timeout if timeout is not None else settings.BLOG_PAGE_CACHE_TIMEOUT,
+    )
+
+
+async def aset_cached_response(key, response, tags, timeout=None):
+    """
+    Асинхронная версия set_cached_response
+    """
+    entry = {"tags": await aget_tag_versions(tags), "response": response}
+    await cache.aset(
+        key,
+        entry,
+        timeout if timeout is not None else settings.BLOG_PAGE_CACHE_TIMEOUT,
+    )
+
+
+def get_etag(last_modified, versions):
+    """
+    Функция формирования ETag страницы: время изменения данных и версии тегов (инвалидация тега, например,
+    удаление статьи или изменение дерева категорий, тоже меняет ETag)
+    """
+    value = f"{last_modified.isoformat()}:{sorted(versions.items())}"
+    return quote_etag(hashlib.md5(value.encode()).hexdigest())
+
+
+def get_validators(etag, last_modified):
+    """
+    Функция формирования заголовков валидаторов страницы (общих для ответов 200 и 304)
+    """
+    validators = HttpResponse()
+    validators["ETag"] = etag
+    validators["Last-Modified"] = http_date(last_modified.timestamp())
+    # Браузер хранит страницу, но перед показом проверяет ее актуальность (условным запросом)
+    patch_cache_control(validators, no_cache=True)
+    return validators
+
+
+def get_not_modified_response(request, validators, last_modified):
+    """
+    Функция проверки условного запроса: ответ 304 Not Modified / 412 Precondition Failed или None
+    """
+    response = get_conditional_response(
+        request,
+        etag=validators["ETag"],
+        last_modified=int(last_modified.timestamp()),
+        response=validators,
+    )
+    return None if response is validators else response
+
+
+def set_validators(response, validators):
+    """
+    Функция копирования заголовков валидаторов в ответ 200
+    """
+    if validators is not None and response.status_code == 200:
+        for header in ("ETag", "Last-Modified", "Cache-Control"):
+            response[header] = validators[header]
+    return response
+
+
+def is_cacheable_page_request(request, user):
+    """
+    Функция, определяющая, можно ли отдать страницу из кэша: GET / HEAD запрос анонимного пользователя без
+    ожидающих сообщений
+    """
+    return (
+        request.method in ("GET", "HEAD")
+        and not user.is_authenticated
+        and "messages" not in request.COOKIES
+    )
+
+
+class CachedPageMixin:
+    """
+    Класс миксина кэширования страницы целиком для анонимных пользователей (GET / HEAD запросы). Если представление
+    определяет get_last_modified, страница также отдается с ETag / Last-Modified, а повторный запрос без изменений
+    получает ответ 304 (один легкий запрос к БД, без загрузки объектов и рендеринга шаблона)
+    """
+
+    def get_cache_tags(self):
+        """
+        Метод получения тегов страницы (вызывается после отработки представления)
+        """
+        return [ARTICLE_LIST_TAG]
+
+    def get_last_modified(self):
+        """
+        Метод получения времени последнего изменения данных страницы (вызывается до отработки представления).
+        None - условные запросы не поддерживаются (или данных нет)
+        """
+        return None
+
+    def get_conditional_tags(self):
+        """
+        Метод получения тегов страницы для ETag (вызывается после get_last_modified, до отработки представления)
+        """
+        return self.get_cache_tags()
+
+    def get_etag(self, last_modified):
+        """
+        Метод формирования ETag страницы по времени изменения данных и версиям тегов
+        """
+        return get_etag(last_modified, get_tag_versions(self.get_conditional_tags()))
+
+    def is_cacheable_request(self, request):
+        return is_cacheable_page_request(request, request.user)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_cacheable_request(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        validators = None
+        last_modified = self.get_last_modified()
+        if last_modified is not None:
+            validators = get_validators(self.get_etag(last_modified), last_modified)
+            response = get_not_modified_response(request, validators, last_modified)
+            if response is not None:
+                return response
+
+        key = get_page_cache_key(request)
+        response = get_cached_response(key)
+        if response is None:
+            # Страница для кэша рендерится по основной БД (шаблон тоже выполняет запросы, поэтому рендеринг
+            # выполняется здесь же, а не после промежуточных слоев)
+            with primary_reads():
+                response = super().dispatch(request, *args, **kwargs)
+                if response.status_code == 200:
+                    tags = self.get_cache_tags()
+
+                    def store(rendered):
+                        # Страницы, устанавливающие cookie (например, CSRF), не кэшируются
+                        if not rendered.cookies:
+                            set_cached_response(key, rendered, tags)
+
+                    if hasattr(response, "add_post_render_callback"):
+                        response.add_post_render_callback(store)
+                        response.render()
+                    else:
+                        store(response)
+
+        return set_validators(response, validators)
+
+
+class AsyncCachedPageMixin:
+    """
+    Класс миксина кэширования страницы целиком для async представлений (асинхронная версия CachedPageMixin: кэш,
+    запросы к БД и проверка пользователя выполняются без перехода в поток). Ключи и записи кэша общие
+    с CachedPageMixin, поэтому страницу, закэшированную одной версией представления, отдает и другая
+    """
+
+    def get_cache_tags(self):
+        """
+        Метод получения тегов страницы (вызывается после отработки представления)
+        """
+        return [ARTICLE_LIST_TAG]
+
+    async def aget_last_modified(self):
+        """
+        Метод получения времени последнего изменения данных страницы (вызывается до отработки представления).
+        None - условные запросы не поддерживаются (или данных нет)
+        """
+        return None
+
+    async def aget_conditional_tags(self):
+        """
+        Метод получения тегов страницы для ETag (вызывается после aget_last_modified, до отработки представления)
+        """
+        return self.get_cache_tags()
+
+    async def aget_etag(self, last_modified):
+        """
+        Метод формирования ETag страницы по времени изменения данных и версиям тегов
+        """
+        tags = await self.aget_conditional_tags()
+        return get_etag(last_modified, await aget_tag_versions(tags))
+
+    async def ais_cacheable_request(self, request):
+        return is_cacheable_page_request(request, await request.auser())
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not await self.ais_cacheable_request(request):
+            return await super().dispatch(request, *args, **kwargs)
+
+        validators = None
+        last_modified = await self.aget_last_modified()
+        if last_modified is not None:
+            etag = await self.aget_etag(last_modified)
+            validators = get_validators(etag, last_modified)
+            response = get_not_modified_response(request, validators, last_modified)
+            if response is not None:
+                return response
+
+        key = get_page_cache_key(request)
+        response = await aget_cached_response(key)
+        if response is None:
+            # Async представления возвращают уже отрендеренный ответ. Страница для кэша читается из основной БД
+            with primary_reads():
+                response = await super().dispatch(request, *args, **kwargs)
+            # Страницы, устанавливающие cookie (например, CSRF), не кэшируются
+            if response.status_code == 200 and not response.cookies:
+                await aset_cached_response(key, response, self.get_cache_tags())
+
+        return set_validators(response, validators)
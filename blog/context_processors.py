@@ -1,25 +1,39 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
 from .models import Category
-from django.db import models
 
 
-def get_categories(request):
+def use_categories_context(request):
     """
-    Метод, определяющий кол-во статей, которые были опубликованы в каждой из категорий
+    Метод, определяющий, нужен ли контекст категорий представлению, обрабатывающему запрос. Не нужен для
+    обработчика 404 (запрос не сопоставлен URL), приложений из BLOG_CATEGORIES_CONTEXT_EXCLUDE_NAMESPACES (админ-панель)
+    и представлений с атрибутом categories_context = False
     """
-    qs = Category.objects.all()  # Получение всех объектов модели категорий
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return False
+    if set(match.namespaces) & set(settings.BLOG_CATEGORIES_CONTEXT_EXCLUDE_NAMESPACES):
+        return False
+    view = getattr(match.func, "view_class", match.func)
+    return getattr(view, "categories_context", True)
 
-    # Не сработало((
-    # qs = qs.annotate(articles_count=Count('articles'), filter=Q(articles__status=Article.Status.PUBLISHED))
 
-    #  Создание нового поля "articles_count" в qs, в который передается сумма статей со статусом = 1 (PUBLISHED)
-    qs = qs.annotate(
-        articles_count=models.Sum(
-            models.Case(
-                models.When(articles__status=True, then=1),
-                default=0,
-                output_field=models.IntegerField(),
-            )
-        )
-    )
+def load_categories(request):
+    """
+    Метод получения категорий, закэшированных в объекте запроса: несколько шаблонов одной страницы делят один запрос
+    """
+    if not hasattr(request, "_blog_categories"):
+        request._blog_categories = list(Category.objects.all())
+    return request._blog_categories
+
 
-    return {"categories": qs}
+def get_categories(request):
+    """
+    Метод, передающий в контекст категории. Кол-во опубликованных статей в каждой из категорий хранится в самой
+    категории (поля articles_count и articles_total), поэтому JOIN со статьями не нужен. Запрос к БД выполняется,
+    только если шаблон действительно обращается к categories
+    """
+    if not use_categories_context(request):
+        return {}
+    return {"categories": SimpleLazyObject(lambda: load_categories(request))}
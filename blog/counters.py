@@ -0,0 +1,91 @@
+"""
+Денормализованные счетчики опубликованных статей в категориях.
+
+Category.articles_count - кол-во опубликованных статей непосредственно в категории, Category.articles_total - вместе
+со всеми подкатегориями (по дереву MPTT). Счетчики обновляются инкрементально из сигналов модели статей и из массовых
+действий админ-панели, а команда reconcile_category_counters пересчитывает их целиком.
+"""
+
+from collections import Counter
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, F
+
+
+def get_counter_deltas(changes):
+    """
+    Функция расчета изменений счетчиков по категориям.
+    changes - набор кортежей (старый статус, старая категория, новый статус, новая категория);
+    для созданной статьи старая категория = None, для удаленной новая категория = None
+    """
+    deltas = Counter()
+    for old_status, old_category_id, new_status, new_category_id in changes:
+        if old_status and old_category_id is not None:
+            deltas[old_category_id] -= 1
+        if new_status and new_category_id is not None:
+            deltas[new_category_id] += 1
+    return {category_id: delta for category_id, delta in deltas.items() if delta}
+
+
+def apply_counter_deltas(deltas, using="default"):
+    """
+    Функция применения изменений счетчиков: прямой счетчик меняется у самой категории, а счетчик с подкатегориями -
+    у категории и всех ее предков (диапазон lft / rght дерева MPTT)
+    """
+    if not deltas:
+        return
+
+    Category = apps.get_model("blog", "Category")
+    categories = Category.objects.using(using)
+    nodes = categories.filter(pk__in=deltas).values_list("pk", "tree_id", "lft", "rght")
+    with transaction.atomic(using=using):
+        for pk, tree_id, lft, rght in nodes:
+            delta = deltas[pk]
+            categories.filter(pk=pk).update(articles_count=F("articles_count") + delta)
+            categories.filter(tree_id=tree_id, lft__lte=lft, rght__gte=rght).update(
+                articles_total=F("articles_total") + delta
+            )
+
+
+def recount_categories(using="default", category_model=None, article_model=None):
+    """
+    Функция полного пересчета счетчиков всех категорий. Возвращает кол-во исправленных категорий.
+    Модели можно передать явно (для вызова из миграций)
+    """
+    Category = category_model or apps.get_model("blog", "Category")
+    Article = article_model or apps.get_model("blog", "Article")
+
+    direct = dict(
+        Article.objects.using(using)
+        .filter(status=True)
+        .order_by()
+        .values("category_id")
+        .annotate(count=Count("id"))
+        .values_list("category_id", "count")
+    )
+    categories = list(
+        Category.objects.using(using)
+        .order_by("tree_id", "lft")
+        .only("id", "parent_id", "articles_count", "articles_total")
+    )
+
+    # В порядке обхода дерева (tree_id, lft) потомки идут после предков, поэтому в обратном порядке итоги детей
+    # готовы к моменту прибавления их к родителю
+    totals = Counter()
+    for category in reversed(categories):
+        totals[category.pk] += direct.get(category.pk, 0)
+        if category.parent_id is not None:
+            totals[category.parent_id] += totals[category.pk]
+
+    changed = []
+    for category in categories:
+        count, total = direct.get(category.pk, 0), totals[category.pk]
+        if (category.articles_count, category.articles_total) != (count, total):
+            category.articles_count, category.articles_total = count, total
+            changed.append(category)
+
+    Category.objects.using(using).bulk_update(
+        changed, ["articles_count", "articles_total"], batch_size=500
+    )
+    return len(changed)
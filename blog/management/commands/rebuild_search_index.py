@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Article
+from blog.search import get_search_backend
+
+
+class Command(BaseCommand):
+    """
+    Команда полной перестройки поискового индекса статей
+    """
+
+    help = "Перестраивает поисковый индекс статей блога"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database", default="default", help="Алиас БД (по умолчанию default)"
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        queryset = Article.objects.using(using).only(
+            "pk", "title", "short_description", "full_description"
+        )
+        get_search_backend(using).rebuild(queryset, using=using)
+        self.stdout.write(
+            self.style.SUCCESS(f"Проиндексировано статей: {queryset.count()}")
+        )
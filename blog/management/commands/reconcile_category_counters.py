@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from blog.counters import recount_categories
+
+
+class Command(BaseCommand):
+    """
+    Команда пересчета счетчиков опубликованных статей в категориях (исправление расхождений)
+    """
+
+    help = "Пересчитывает счетчики опубликованных статей во всех категориях блога"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database", default="default", help="Алиас БД (по умолчанию default)"
+        )
+
+    def handle(self, *args, **options):
+        fixed = recount_categories(using=options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Исправлено категорий: {fixed}"))
@@ -0,0 +1,74 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.transfer import MODELS, JsonlImporter, after_import, export_jsonl
+
+
+class Command(BaseCommand):
+    """
+    Команда потокового экспорта / импорта категорий, статей и фотографий галереи в формате JSON Lines
+    """
+
+    help = "Экспортирует / импортирует статьи, категории и галерею в формате JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=("export", "import"))
+        parser.add_argument("path", help='Путь к файлу ("-" - stdout / stdin)')
+        parser.add_argument(
+            "--models",
+            nargs="+",
+            default=MODELS,
+            choices=MODELS,
+            help="Экспортируемые модели (по умолчанию все)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Кол-во объектов в одном INSERT при импорте",
+        )
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            help="Обновлять существующие объекты с теми же id (иначе - ошибка)",
+        )
+        parser.add_argument(
+            "--derivatives",
+            action="store_true",
+            help="После импорта поставить в очередь генерацию вариантов изображений",
+        )
+        parser.add_argument(
+            "--database", default="default", help="Алиас БД (по умолчанию default)"
+        )
+
+    def handle(self, *args, **options):
+        if options["action"] == "export":
+            counts = self.export(options)
+        else:
+            counts = self.import_(options)
+        for label, count in counts.items():
+            self.stderr.write(self.style.SUCCESS(f"{label}: {count}"))
+
+    def export(self, options):
+        if options["path"] == "-":
+            return export_jsonl(sys.stdout, options["models"], options["database"])
+        with open(options["path"], "w", encoding="utf-8") as stream:
+            return export_jsonl(stream, options["models"], options["database"])
+
+    def import_(self, options):
+        importer = JsonlImporter(
+            using=options["database"],
+            batch_size=options["batch_size"],
+            update=options["update"],
+        )
+        try:
+            if options["path"] == "-":
+                importer.run(sys.stdin)
+            else:
+                with open(options["path"], encoding="utf-8") as stream:
+                    importer.run(stream)
+        except (ValueError, KeyError) as error:
+            raise CommandError(f"Ошибка импорта: {error}")
+        after_import(importer, derivatives=options["derivatives"])
+        return importer.counts
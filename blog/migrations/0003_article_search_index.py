@@ -0,0 +1,180 @@
+import re
+from html import unescape
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+# Название виртуальной таблицы полнотекстового индекса (rowid = id статьи)
+FTS_TABLE = "app_article_fts"
+
+# Ниже - копия нормализации текста из blog.search на момент создания миграции: миграция не импортирует модули
+# приложения, поэтому их последующие изменения не меняют результат миграции. При изменении стеммера индекс
+# перестраивается командой rebuild_search_index
+
+# Упрощенная реализация стеммера Snowball для русского языка (http://snowball.tartarus.org/algorithms/russian/stemmer.html)
+# Окончания в каждой группе перечислены от длинных к коротким. Окончания групп "_AFTER_A" отсекаются только после "а"/"я"
+# fmt: off
+VOWELS = "аеиоуыэюя"
+PERFECTIVE_GERUND_AFTER_A = ("вшись", "вши", "в")
+PERFECTIVE_GERUND = ("ившись", "ывшись", "ивши", "ывши", "ив", "ыв")
+REFLEXIVE = ("ся", "сь")
+ADJECTIVE = (
+    "ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой", "ем", "им", "ым",
+    "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+PARTICIPLE_AFTER_A = ("ем", "нн", "вш", "ющ", "щ")
+PARTICIPLE = ("ивш", "ывш", "ующ")
+VERB_AFTER_A = ("ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н")
+VERB = (
+    "ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют", "ены", "ить",
+    "ыть", "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю",
+)
+NOUN = (
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях", "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой", "ий", "ям",
+    "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья", "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+)
+DERIVATIONAL = ("ость", "ост")
+SUPERLATIVE = ("ейше", "ейш")
+# fmt: on
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+CYRILLIC_RE = re.compile(r"^[а-я]+$")
+
+
+def html_to_text(value):
+    """
+    Функция получения чистого текста из HTML (тело статьи хранится в HTML CKEditor)
+    """
+    return unescape(strip_tags(value or ""))
+
+
+def _region_after_vowel(word, start, consonant=False):
+    """
+    Функция поиска начала области слова: позиция после первой гласной (RV) или после первой согласной,
+    следующей за гласной (R1, R2), начиная с позиции start
+    """
+    for i in range(start, len(word)):
+        if consonant:
+            if i > start and word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        elif word[i] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _regions(word):
+    """
+    Функция вычисления начала областей RV и R2 слова (по алгоритму Snowball)
+    """
+    r1 = _region_after_vowel(word, 0, consonant=True)
+    return _region_after_vowel(word, 0), _region_after_vowel(
+        word, r1 - 1, consonant=True
+    )
+
+
+def _remove_ending(word, rv, endings, after_a=False):
+    """
+    Функция отсечения первого подходящего окончания в пределах области RV. Возвращает (слово, было ли отсечение)
+    """
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= rv:
+            stem = word[: -len(ending)]
+            if after_a and not (stem.endswith(("а", "я")) and len(stem) - 1 >= rv):
+                continue
+            return stem, True
+    return word, False
+
+
+def stem_word(word):
+    """
+    Функция стемминга: русские слова приводятся к основе, остальные (латиница, числа) - только к нижнему регистру
+    """
+    word = word.lower().replace("ё", "е")
+    if not CYRILLIC_RE.match(word):
+        return word
+
+    rv, r2 = _regions(word)
+
+    # Шаг 1: деепричастие совершенного вида, либо возвратное окончание + прилагательное / глагол / существительное
+    word, removed = _remove_ending(word, rv, PERFECTIVE_GERUND_AFTER_A, after_a=True)
+    if not removed:
+        word, removed = _remove_ending(word, rv, PERFECTIVE_GERUND)
+    if not removed:
+        word, _ = _remove_ending(word, rv, REFLEXIVE)
+        word, removed = _remove_ending(word, rv, ADJECTIVE)
+        if removed:
+            word, participle = _remove_ending(
+                word, rv, PARTICIPLE_AFTER_A, after_a=True
+            )
+            if not participle:
+                word, _ = _remove_ending(word, rv, PARTICIPLE)
+        else:
+            word, removed = _remove_ending(word, rv, VERB_AFTER_A, after_a=True)
+            if not removed:
+                word, removed = _remove_ending(word, rv, VERB)
+            if not removed:
+                word, _ = _remove_ending(word, rv, NOUN)
+
+    # Шаг 2: окончание "и"
+    word, _ = _remove_ending(word, rv, ("и",))
+    # Шаг 3: словообразовательный суффикс в области R2
+    word, _ = _remove_ending(word, r2, DERIVATIONAL)
+    # Шаг 4: превосходная степень, двойная "н" и мягкий знак
+    word, _ = _remove_ending(word, rv, SUPERLATIVE)
+    if word.endswith("нн") and len(word) - 1 >= rv:
+        word = word[:-1]
+    else:
+        word, _ = _remove_ending(word, rv, ("ь",))
+    return word
+
+
+def normalize_text(text):
+    """
+    Функция приведения текста к виду, в котором он хранится в индексе: слова заменяются на их основы
+    """
+    return " ".join(stem_word(word) for word in WORD_RE.findall(text))
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Создание виртуальной таблицы FTS5 и первичное заполнение ее статьями (только для SQLite)
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "title, short_description, body, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+    Article = apps.get_model("blog", "Article")
+    articles = Article.objects.using(schema_editor.connection.alias).values_list(
+        "pk", "title", "short_description", "full_description"
+    )
+    for pk, title, short_description, full_description in articles.iterator():
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, short_description, body) VALUES (%s, %s, %s, %s)",
+            [
+                pk,
+                normalize_text(title),
+                normalize_text(html_to_text(short_description)),
+                normalize_text(html_to_text(full_description)),
+            ],
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0002_alter_article_full_description"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
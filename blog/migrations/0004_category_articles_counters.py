@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:09
+
+from django.db import migrations, models
+
+from blog.counters import recount_categories
+
+
+def fill_counters(apps, schema_editor):
+    """
+    Первичное заполнение счетчиков опубликованных статей в категориях
+    """
+    recount_categories(
+        using=schema_editor.connection.alias,
+        category_model=apps.get_model("blog", "Category"),
+        article_model=apps.get_model("blog", "Article"),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0003_article_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="articles_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Статей в категории"
+            ),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="articles_total",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Статей с подкатегориями"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0004_category_articles_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                fields=["tree_id", "lft", "rght"], name="app_category_tree_idx"
+            ),
+        ),
+    ]
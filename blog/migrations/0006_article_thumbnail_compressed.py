@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0005_category_tree_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="thumbnail_compressed",
+            field=models.ImageField(
+                blank=True,
+                editable=False,
+                upload_to="blog/thumbnails",
+                verbose_name="Превью поста (сжатое)",
+            ),
+        ),
+    ]
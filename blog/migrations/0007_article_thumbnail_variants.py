@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0006_article_thumbnail_compressed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="thumbnail_variants",
+            field=models.JSONField(
+                blank=True, default=dict, editable=False, verbose_name="Варианты превью"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:17
+
+import blog.models
+import django.core.validators
+import utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0007_article_thumbnail_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="article",
+            name="thumbnail",
+            field=models.ImageField(
+                upload_to=blog.models.article_media_path,
+                validators=[
+                    django.core.validators.FileExtensionValidator(
+                        allowed_extensions=("png", "jpg", "jpeg", "webp")
+                    ),
+                    utils.validate_image_pixels,
+                ],
+                verbose_name="Превью поста",
+            ),
+        ),
+    ]
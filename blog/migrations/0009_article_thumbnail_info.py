@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0008_alter_article_thumbnail"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="thumbnail_color",
+            field=models.CharField(
+                blank=True, editable=False, max_length=7, verbose_name="Цвет превью"
+            ),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="thumbnail_height",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Высота превью"
+            ),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="thumbnail_placeholder",
+            field=models.TextField(
+                blank=True, editable=False, verbose_name="Заглушка превью"
+            ),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="thumbnail_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Ширина превью"
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:33
+
+import blog.models
+import django.core.validators
+import mediafiles.storage
+import utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0009_article_thumbnail_info"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="article",
+            name="thumbnail",
+            field=models.ImageField(
+                storage=mediafiles.storage.ContentAddressedStorage(),
+                upload_to=blog.models.article_media_path,
+                validators=[
+                    django.core.validators.FileExtensionValidator(
+                        allowed_extensions=("png", "jpg", "jpeg", "webp")
+                    ),
+                    utils.validate_image_pixels,
+                ],
+                verbose_name="Превью поста",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="article",
+            name="thumbnail_compressed",
+            field=models.ImageField(
+                blank=True,
+                editable=False,
+                storage=mediafiles.storage.ContentAddressedStorage(),
+                upload_to="blog/thumbnails",
+                verbose_name="Превью поста (сжатое)",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0010_article_content_storage"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["status", "time_update"], name="app_article_status_upd_idx"
+            ),
+        ),
+    ]
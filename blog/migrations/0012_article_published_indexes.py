@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0011_article_status_time_update_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                condition=models.Q(("status", True)),
+                fields=["-time_create", "-id"],
+                name="app_article_published_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                condition=models.Q(("status", True)),
+                fields=["category", "-time_create", "-id"],
+                name="app_article_cat_pub_idx",
+            ),
+        ),
+    ]
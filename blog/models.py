@@ -1,31 +1,61 @@
 from io import BytesIO
+import logging
 import os
 from PIL import Image
 from django.core.files.base import ContentFile
 from django.core.files import File
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldError
 from django.core.validators import FileExtensionValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models.query import ModelIterable
 from django.urls import reverse
 from mptt.fields import TreeForeignKey
 from mptt.models import MPTTModel
-from django.db.models.signals import pre_save, pre_delete, post_save
+from django.db.models.signals import pre_save, pre_delete, post_save, post_delete
 from django.dispatch import receiver
 from django_ckeditor_5.fields import CKEditor5Field
 
-from utils import unique_slugify, image_compress
-
-
-class Category(MPTTModel):
+from jobs.queue import enqueue
+from mediafiles.derivatives import release_derivatives
+from mediafiles.storage import content_storage
+from utils import (
+    FieldTrackerMixin,
+    UniqueSlugMixin,
+    delete_unused_uploads,
+    validate_image_pixels,
+)
+from .counters import apply_counter_deltas, get_counter_deltas, recount_categories
+from .cache import (
+    CATEGORY_TREE_TAG,
+    category_tag,
+    invalidate_articles,
+    invalidate_tags,
+)
+from .search import get_search_backend
+
+logger = logging.getLogger(__name__)
+
+
+class Category(FieldTrackerMixin, UniqueSlugMixin, MPTTModel):
     """
     Модель категорий со вложенностью
     """
 
     # Поле заголовка. CharField для короткого и точного текстового описания (20 символов)
     title = models.CharField(max_length=20, verbose_name="Название категории")
-    # Поле slug. SlugField для URL категории, уникальное
+    # Поле slug. SlugField для URL категории, уникальное (пустой slug заполняется из названия при сохранении)
     slug = models.SlugField(max_length=20, verbose_name="URL категории", unique=True)
     # Поле описания категории
     description = models.TextField(verbose_name="Описание категории", max_length=100)
+    # Денормализованные счетчики опубликованных статей (обновляются сигналами статей, см. blog/counters.py)
+    articles_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Статей в категории"
+    )
+    articles_total = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Статей с подкатегориями"
+    )
     parent = TreeForeignKey(
         "self",  # Внешний ключ ссылается на ту же модель, в которой он определен, то есть на Category
         on_delete=models.CASCADE,  # Если родительская категория удалена, то все дочерние категории также будут удалены
@@ -36,6 +66,9 @@ class Category(MPTTModel):
         verbose_name="Родительская категория",  # Название родительской категории, отображаемое в админ-панели
     )
 
+    # Отслеживаемые поля (перемещение категории в дереве меняет итоговые счетчики предков)
+    tracked_fields = ("parent",)
+
     class MPTTMeta:
         """
         Метамодель: сортировка по вложенности
@@ -53,6 +86,12 @@ class Category(MPTTModel):
         verbose_name_plural = (
             "Категории"  # Имя во множественном числе (для админ-панели)
         )
+        indexes = [
+            # Индекс для выборки категории со всеми подкатегориями по диапазону дерева MPTT
+            models.Index(
+                fields=["tree_id", "lft", "rght"], name="app_category_tree_idx"
+            ),
+        ]
 
     def __str__(self):
         """
@@ -70,19 +109,60 @@ class Category(MPTTModel):
         return reverse("articles_by_category", kwargs={"slug": self.slug})
 
 
+# Шаблон ключа кэша кол-ва опубликованных статей (для пагинации)
+ARTICLES_COUNT_CACHE_KEY = "blog:articles-count:{}"
+
+
 def article_media_path(instance, file):
     """
-    Функция переопределяющая директорию сохранения файлов поста в media на
-    'blog/"article id. Название поста"/"Название файла"'
+    Функция, задающая директорию сохранения превью статьи в media ("blog/thumbnails"). Окончательное имя файла
+    формирует хранилище (mediafiles.storage.ContentAddressedStorage) по хэшу содержимого, от исходного имени
+    остается только расширение. Функция сохранена, т.к. на нее ссылаются миграции
+    """
+    return "blog/thumbnails/{0}".format(file)
+
+
+class DeferredFieldAccessError(FieldError):
+    """
+    Исключение: обращение к отложенному (не загруженному) полю объекта из облегченного списка
+    """
+
+
+class SummaryModelIterable(ModelIterable):
+    """
+    Итератор qs, помечающий объекты как загруженные для списка (с отложенными тяжелыми полями)
     """
-    return "blog/thumbnails/Thmb.id_to_replace. {0}".format(file)
 
+    def __iter__(self):
+        for obj in super().__iter__():
+            obj._summary_only = True
+            yield obj
 
-class Article(models.Model):
+
+class Article(FieldTrackerMixin, UniqueSlugMixin, models.Model):
     """
     Модель статей для сайта
     """
 
+    # Поля, которые загружаются для списков статей (карточек), без тяжелого тела статьи
+    SUMMARY_FIELDS = (
+        "id",
+        "title",
+        "slug",
+        "short_description",
+        "thumbnail",
+        "thumbnail_compressed",
+        "thumbnail_variants",
+        "thumbnail_width",
+        "thumbnail_height",
+        "thumbnail_placeholder",
+        "thumbnail_color",
+        "status",
+        "time_create",
+        "time_update",
+        "category_id",
+    )
+
     class ArticleManager(models.Manager):
         """
         Кастомный менеджер для модели статей
@@ -98,6 +178,20 @@ class Article(models.Model):
                 .filter(status=Article.Status.PUBLISHED)
             )
 
+        def summary(self):
+            """
+            Метод, возвращающий облегченный список опубликованных статей для карточек: загружаются только поля
+            SUMMARY_FIELDS, тело статьи (full_description) не читается из БД. Обращение к незагруженному полю
+            приводит к отдельному запросу на каждый объект, поэтому при BLOG_STRICT_DEFERRED_FIELDS вызывает ошибку
+            """
+            queryset = (
+                self.get_queryset()
+                .filter(status=Article.Status.PUBLISHED)
+                .only(*Article.SUMMARY_FIELDS)
+            )
+            queryset._iterable_class = SummaryModelIterable
+            return queryset
+
         # Данный метод отрабатывает и в админ-панели (а это не нужно), поэтому им не пользуемся
         # def get_queryset(self):
         #     """
@@ -117,7 +211,7 @@ class Article(models.Model):
 
     # Поле заголовка. CharField для короткого и точного текстового описания (50 символов)
     title = models.CharField(verbose_name="Заголовок", max_length=50)
-    # Поле slug. SlugField для URL статьи, уникальное
+    # Поле slug. SlugField для URL статьи, уникальное (пустой slug заполняется из заголовка при сохранении)
     slug = models.SlugField(verbose_name="URL", max_length=55, unique=True)
     # Поле короткого описания для отображения в превью статьи
     short_description = models.CharField(
@@ -128,10 +222,38 @@ class Article(models.Model):
     # Поле превью. ImageField для валидации и загрузки изображения
     thumbnail = models.ImageField(
         upload_to=article_media_path,  # Путь сохранения
+        storage=content_storage,  # Имя файла - хэш содержимого (одинаковые файлы хранятся один раз)
         verbose_name="Превью поста",  # Имя (для админ-панели)
         validators=[
-            FileExtensionValidator(allowed_extensions=("png", "jpg", "jpeg", "webp"))
-        ],  # Валидация допустимых форматов
+            FileExtensionValidator(allowed_extensions=("png", "jpg", "jpeg", "webp")),
+            validate_image_pixels,
+        ],  # Валидация допустимых форматов и размера изображения
+    )
+    # Поле сжатого превью (webp). Заполняется фоновой задачей blog.tasks.compress_article_thumbnail
+    thumbnail_compressed = models.ImageField(
+        upload_to="blog/thumbnails",  # Путь сохранения
+        storage=content_storage,  # Имя файла - хэш содержимого (одинаковые файлы хранятся один раз)
+        verbose_name="Превью поста (сжатое)",  # Имя (для админ-панели)
+        blank=True,  # Пустое, пока задача сжатия не выполнена
+        editable=False,
+    )
+    # Поле вариантов превью разной ширины и формата (для srcset). Заполняется той же фоновой задачей
+    thumbnail_variants = models.JSONField(
+        default=dict, blank=True, editable=False, verbose_name="Варианты превью"
+    )
+    # Поля размера превью, превью-заглушки (data: URI крошечного WEBP) и преобладающего цвета для резервирования
+    # места и отображения до загрузки изображения. Заполняются той же фоновой задачей
+    thumbnail_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name="Ширина превью"
+    )
+    thumbnail_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name="Высота превью"
+    )
+    thumbnail_placeholder = models.TextField(
+        blank=True, editable=False, verbose_name="Заглушка превью"
+    )
+    thumbnail_color = models.CharField(
+        max_length=7, blank=True, editable=False, verbose_name="Цвет превью"
     )
     # Поле статуса (опубликовано / черновик). В БД хранится bool, но для лучшего восприятия отображаются Status.choices
     status = models.BooleanField(
@@ -161,13 +283,35 @@ class Article(models.Model):
     # Вызов и сохранение объектов модели через кастомный менеджер
     objects = ArticleManager()
 
+    # Поля, значения которых запоминаются при загрузке объекта (для проверки изменений без запроса к БД)
+    tracked_fields = ("thumbnail", "category", "status", "full_description")
+
     class Meta:
         """
-        Метамодель: сортировка, названия полей в админ-панели
+        Метамодель: сортировка, индексы, названия полей в админ-панели
         """
 
         db_table = "app_article"  # Название таблицы в БД
         ordering = ["-time_create"]  # Сортировка от новых статей к старым
+        indexes = [
+            # Индекс для времени последнего изменения опубликованных статей (ETag / Last-Modified ленты)
+            models.Index(
+                fields=["status", "time_update"], name="app_article_status_upd_idx"
+            ),
+            # Частичные индексы опубликованных статей (условие индекса совпадает с фильтром публичных страниц
+            # status, поэтому SQLite выбирает их и для фильтра по статусу): лента - сортировка по времени создания
+            # и id (курсорная пагинация) без сортировки во временном B-дереве, категория - поиск по категории
+            models.Index(
+                fields=["-time_create", "-id"],
+                name="app_article_published_idx",
+                condition=models.Q(status=True),
+            ),
+            models.Index(
+                fields=["category", "-time_create", "-id"],
+                name="app_article_cat_pub_idx",
+                condition=models.Q(status=True),
+            ),
+        ]
         verbose_name = "Статья"  # Имя в единственном числе (для админ-панели)
         verbose_name_plural = "Статьи"  # Имя во множественном числе (для админ-панели)
 
@@ -179,6 +323,21 @@ class Article(models.Model):
         """
         return self.title
 
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        """
+        Переопределение метода refresh_from_db: именно он вызывается при обращении к отложенному полю. Для объектов
+        облегченного списка (Article.objects.summary()) такое обращение - это N+1 запрос, о нем нужно сообщить
+        """
+        if fields and getattr(self, "_summary_only", False):
+            message = (
+                f"Обращение к отложенным полям {', '.join(fields)} статьи id={self.pk}, загруженной "
+                f"через Article.objects.summary(). Добавьте поля в Article.SUMMARY_FIELDS"
+            )
+            if settings.BLOG_STRICT_DEFERRED_FIELDS:
+                raise DeferredFieldAccessError(message)
+            logger.warning(message)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
     def get_absolute_url(self):
         """
         Метод, формирующий корректный URL адрес статьи. Позволяет узнать канонический путь представления (в данном
@@ -186,73 +345,189 @@ class Article(models.Model):
         """
         return reverse("article", kwargs={"slug": self.slug})
 
-
-@receiver(pre_save, sender=Article)
-def prepopulated_slug(sender, instance, **kwargs):
-    if not instance.slug:
-        instance.slug = unique_slugify(instance, instance.title)
+    @property
+    def thumbnail_preview(self):
+        """
+        Свойство, возвращающее превью для отображения: сжатое, если фоновая задача уже выполнена, иначе оригинал
+        """
+        return self.thumbnail_compressed or self.thumbnail
 
 
 @receiver(pre_save, sender=Article)
-def article_delete_thumbnail_on_update(sender, instance, **kwargs):
+def article_delete_thumbnail_on_update(sender, instance, using, **kwargs):
     """
-    Функция удаления превью модели из папки 'media' при обновлении объекта модели, а также сжатия фото
+    Функция удаления превью модели (и убранных из текста файлов редактора) из папки 'media' при обновлении объекта
+    модели. Сжатие фото выполняется фоновой задачей после сохранения (см. article_enqueue_thumbnail_compress)
     """
-    # Попробовать получить файл со старым превью по ключу объекта
-    try:
-        thumbnail_old = sender.objects.get(pk=instance.pk).thumbnail
-    except sender.DoesNotExist:  # Если объект еще не создан - передать сжатое фото
-        instance.thumbnail = image_compress(instance.thumbnail, width=600)
+    # Если объект еще не создан - старого превью нет (запрос к БД не нужен), новое превью нужно сжать
+    if instance._state.adding:
+        instance._thumbnail_changed = True
         return False
 
-    thumbnail_new = instance.thumbnail  # Новое превью = загруженное превью объекта
+    # Прежние значения полей запомнены при загрузке объекта (запрос к БД не нужен)
+    previous = instance.get_previous_values()
+    # Запоминаем прежние категорию и статус (для инвалидации кэша страниц и обновления счетчиков категорий)
+    instance._previous_category_id = previous.get("category", instance.category_id)
+    instance._previous_status = previous.get("status", instance.status)
+    # Удаление файлов редактора, убранных из текста статьи (если текст загружен в объект)
+    if "full_description" in previous:
+        delete_unused_uploads(
+            previous["full_description"],
+            instance.full_description,
+            sender._base_manager.using(using).exclude(pk=instance.pk),
+            "full_description",
+        )
 
-    # Если новое превью отличается от старого (в случае обновления поля отличного от изображения)
-    if not thumbnail_old == thumbnail_new:
-        if (
-            "id_to_replace" not in thumbnail_old.path
-        ):  # Если превью загружено впервые (старого нет)
-            instance.thumbnail = image_compress(
-                instance.thumbnail, width=600
-            )  # Передать сжатое фото
-        if os.path.isfile(
-            thumbnail_old.path
-        ):  # Если путь к файлу старого превью существует
-            os.remove(thumbnail_old.path)  # Удалить путь к файлу старого превью
+    # Если превью не менялось (в случае обновления поля отличного от изображения) - файлы не трогаем
+    if not instance.has_changed("thumbnail"):
+        return False
+
+    # Сжатое превью и варианты заполняет фоновая задача, поэтому их актуальные значения берутся из БД
+    derived_old = (
+        sender.objects.get_queryset()
+        .filter(pk=instance.pk)
+        .values("thumbnail_compressed", "thumbnail_variants")
+        .first()
+        or {}
+    )
+    instance._thumbnail_changed = True  # Новое превью нужно сжать
+    # Сжатая копия, варианты и сведения о старом превью больше не актуальны
+    instance.thumbnail_compressed = ""
+    instance.thumbnail_variants = {}
+    instance.thumbnail_width = instance.thumbnail_height = None
+    instance.thumbnail_placeholder = instance.thumbnail_color = ""
+    # Файлы удаляются только после коммита: при откате транзакции в БД остаются ссылки на старое превью.
+    # Варианты удаляются напрямую, а хранилище превью само откладывает удаление файла до коммита
+    variants_old = derived_old.get("thumbnail_variants")
+    transaction.on_commit(
+        lambda: release_derivatives(instance, "thumbnail_variants", variants_old),
+        using=using,
+    )
+    storage = instance.thumbnail.storage
+    for name in (previous.get("thumbnail"), derived_old.get("thumbnail_compressed")):
+        if name:  # Удалить файлы старого превью (оригинал и сжатое)
+            storage.delete(name)
 
 
 @receiver(post_save, sender=Article)
-def update_thumbnail_name(sender, instance, **kwargs):
+def article_enqueue_thumbnail_compress(sender, instance, **kwargs):
     """
-    Функция переименования превью модели при первичном сохранении (для передачи в название id)
+    Функция постановки в очередь задачи сжатия нового превью
     """
-    thumbnail_old = sender.objects.get(pk=instance.pk).thumbnail  # Поле старого превью
-
-    # Если в названии превью присутствует "id_to_replace" (который задан по умолчанию в article_media_path)
-    if "id_to_replace" in thumbnail_old.path:
-        # Новый путь превью = старый путь, с замененным "id_to_replace" на id объекта
-        thumbnail_new_path = thumbnail_old.path.replace(
-            "id_to_replace", str(instance.pk)
-        )
-        # Новое имя превью = старое имя, с замененным "id_to_replace" на id объекта
-        thumbnail_new_name = thumbnail_old.name.replace(
-            "id_to_replace", str(instance.pk)
-        )
-        # Переименование пути до превью
-        os.rename(thumbnail_old.path, thumbnail_new_path)
-        # Переименование превью в объекте модели
-        instance.thumbnail = thumbnail_new_name
-        # Сохранение объекта модели
-        instance.save()
-    else:
-        return False
+    if instance.__dict__.pop("_thumbnail_changed", False):
+        enqueue("blog.tasks.compress_article_thumbnail", instance.pk)
 
 
 @receiver(pre_delete, sender=Article)
-def article_delete_thumbnail_on_delete(sender, instance, **kwargs):
+def article_delete_thumbnail_on_delete(sender, instance, using, **kwargs):
     """
     Функция удаления превью модели из папки 'media' при удалении объекта модели
     """
+    # Инвалидация кэша страниц статьи, ее категории и лент статей
+    invalidate_articles([(instance.pk, instance.category_id)])
     # Необходимо передать значение false, чтобы FileField не сохранил модель
     if instance.thumbnail:
         instance.thumbnail.delete(False)
+    if instance.thumbnail_compressed:
+        instance.thumbnail_compressed.delete(False)
+    # Варианты удаляются после коммита (как и файлы превью в хранилище)
+    transaction.on_commit(
+        lambda: release_derivatives(instance, "thumbnail_variants"), using=using
+    )
+
+
+@receiver(post_save, sender=Article)
+def article_update_search_index(sender, instance, using, **kwargs):
+    """
+    Функция обновления статьи в поисковом индексе после сохранения
+    """
+    get_search_backend(using).index(instance, using=using)
+
+
+@receiver(post_delete, sender=Article)
+def article_delete_search_index(sender, instance, using, **kwargs):
+    """
+    Функция удаления статьи из поискового индекса после удаления объекта модели
+    """
+    get_search_backend(using).remove(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def article_reset_count_cache(sender, instance, **kwargs):
+    """
+    Функция сброса закэшированного общего кол-ва статей после сохранения / удаления
+    """
+    cache.delete(ARTICLES_COUNT_CACHE_KEY.format("all"))
+
+
+@receiver(post_save, sender=Article)
+def article_invalidate_page_cache(sender, instance, using, **kwargs):
+    """
+    Функция инвалидации кэша страниц статьи, ее категории (текущей и прежней) и лент статей после сохранения.
+    Теги инвалидируются после коммита: иначе параллельный запрос успеет закэшировать страницу со старыми данными
+    под новой версией тега
+    """
+    rows = [(instance.pk, instance.category_id)]
+    previous_category_id = getattr(instance, "_previous_category_id", None)
+    if previous_category_id not in (None, instance.category_id):
+        # Статья пропадает и со страниц предков прежней категории
+        rows.append((instance.pk, previous_category_id))
+    transaction.on_commit(lambda: invalidate_articles(rows), using=using)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_invalidate_page_cache(sender, instance, using, **kwargs):
+    """
+    Функция инвалидации кэша страниц категории и страниц с деревом категорий после сохранения / удаления категории
+    (после коммита, как и для статей)
+    """
+    tag = category_tag(instance.pk)
+    transaction.on_commit(lambda: invalidate_tags(tag, CATEGORY_TREE_TAG), using=using)
+
+
+@receiver(post_save, sender=Article)
+def article_update_category_counters(sender, instance, created, using, **kwargs):
+    """
+    Функция обновления счетчиков опубликованных статей в категориях после сохранения статьи
+    (создание, смена статуса, перенос в другую категорию)
+    """
+    if created:
+        previous = (False, None)
+    else:
+        previous = (
+            getattr(instance, "_previous_status", instance.status),
+            getattr(instance, "_previous_category_id", instance.category_id),
+        )
+    deltas = get_counter_deltas([(*previous, instance.status, instance.category_id)])
+    apply_counter_deltas(deltas, using=using)
+
+
+@receiver(post_delete, sender=Article)
+def article_delete_category_counters(sender, instance, using, **kwargs):
+    """
+    Функция обновления счетчиков опубликованных статей в категориях после удаления статьи
+    """
+    deltas = get_counter_deltas([(instance.status, instance.category_id, False, None)])
+    apply_counter_deltas(deltas, using=using)
+
+
+@receiver(pre_save, sender=Category)
+def category_check_parent_change(sender, instance, **kwargs):
+    """
+    Функция проверки, меняется ли родитель категории. Родитель сравнивается со значением, запомненным при загрузке
+    из БД: MPTT обновляет _mptt_cached_fields и перемещает узел в БД (move_node) до сигнала pre_save
+    """
+    instance._parent_changed = instance.pk is not None and instance.has_changed(
+        "parent"
+    )
+
+
+@receiver(post_save, sender=Category)
+def category_update_counters(sender, instance, using, **kwargs):
+    """
+    Функция пересчета счетчиков статей после перемещения категории в дереве (меняются итоги прежних и новых предков)
+    """
+    if getattr(instance, "_parent_changed", False):
+        recount_categories(using=using)
@@ -0,0 +1,287 @@
+"""
+Полнотекстовый поиск по статьям блога.
+
+Поиск вынесен в отдельные бэкенды с общим интерфейсом (BaseSearchBackend), чтобы под другую БД можно было
+подключить свою реализацию через настройку BLOG_SEARCH_BACKEND. По умолчанию для SQLite используется виртуальная
+таблица FTS5, для остальных БД - простой поиск через icontains.
+"""
+
+import re
+from html import unescape
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Case, IntegerField, Q, When
+from django.utils.html import strip_tags
+from django.utils.module_loading import import_string
+
+# Название виртуальной таблицы полнотекстового индекса (rowid = id статьи)
+FTS_TABLE = "app_article_fts"
+
+# Упрощенная реализация стеммера Snowball для русского языка (http://snowball.tartarus.org/algorithms/russian/stemmer.html)
+# Окончания в каждой группе перечислены от длинных к коротким. Окончания групп "_AFTER_A" отсекаются только после "а"/"я"
+# fmt: off
+VOWELS = "аеиоуыэюя"
+PERFECTIVE_GERUND_AFTER_A = ("вшись", "вши", "в")
+PERFECTIVE_GERUND = ("ившись", "ывшись", "ивши", "ывши", "ив", "ыв")
+REFLEXIVE = ("ся", "сь")
+ADJECTIVE = (
+    "ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой", "ем", "им", "ым",
+    "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+PARTICIPLE_AFTER_A = ("ем", "нн", "вш", "ющ", "щ")
+PARTICIPLE = ("ивш", "ывш", "ующ")
+VERB_AFTER_A = ("ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н")
+VERB = (
+    "ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют", "ены", "ить",
+    "ыть", "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю",
+)
+NOUN = (
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях", "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой", "ий", "ям",
+    "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья", "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+)
+DERIVATIONAL = ("ость", "ост")
+SUPERLATIVE = ("ейше", "ейш")
+# fmt: on
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+CYRILLIC_RE = re.compile(r"^[а-я]+$")
+
+
+def html_to_text(value):
+    """
+    Функция получения чистого текста из HTML (тело статьи хранится в HTML CKEditor)
+    """
+    return unescape(strip_tags(value or ""))
+
+
+def _region_after_vowel(word, start, consonant=False):
+    """
+    Функция поиска начала области слова: позиция после первой гласной (RV) или после первой согласной,
+    следующей за гласной (R1, R2), начиная с позиции start
+    """
+    for i in range(start, len(word)):
+        if consonant:
+            if i > start and word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        elif word[i] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _regions(word):
+    """
+    Функция вычисления начала областей RV и R2 слова (по алгоритму Snowball)
+    """
+    r1 = _region_after_vowel(word, 0, consonant=True)
+    return _region_after_vowel(word, 0), _region_after_vowel(
+        word, r1 - 1, consonant=True
+    )
+
+
+def _remove_ending(word, rv, endings, after_a=False):
+    """
+    Функция отсечения первого подходящего окончания в пределах области RV. Возвращает (слово, было ли отсечение)
+    """
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= rv:
+            stem = word[: -len(ending)]
+            if after_a and not (stem.endswith(("а", "я")) and len(stem) - 1 >= rv):
+                continue
+            return stem, True
+    return word, False
+
+
+def stem_word(word):
+    """
+    Функция стемминга: русские слова приводятся к основе, остальные (латиница, числа) - только к нижнему регистру
+    """
+    word = word.lower().replace("ё", "е")
+    if not CYRILLIC_RE.match(word):
+        return word
+
+    rv, r2 = _regions(word)
+
+    # Шаг 1: деепричастие совершенного вида, либо возвратное окончание + прилагательное / глагол / существительное
+    word, removed = _remove_ending(word, rv, PERFECTIVE_GERUND_AFTER_A, after_a=True)
+    if not removed:
+        word, removed = _remove_ending(word, rv, PERFECTIVE_GERUND)
+    if not removed:
+        word, _ = _remove_ending(word, rv, REFLEXIVE)
+        word, removed = _remove_ending(word, rv, ADJECTIVE)
+        if removed:
+            word, participle = _remove_ending(
+                word, rv, PARTICIPLE_AFTER_A, after_a=True
+            )
+            if not participle:
+                word, _ = _remove_ending(word, rv, PARTICIPLE)
+        else:
+            word, removed = _remove_ending(word, rv, VERB_AFTER_A, after_a=True)
+            if not removed:
+                word, removed = _remove_ending(word, rv, VERB)
+            if not removed:
+                word, _ = _remove_ending(word, rv, NOUN)
+
+    # Шаг 2: окончание "и"
+    word, _ = _remove_ending(word, rv, ("и",))
+    # Шаг 3: словообразовательный суффикс в области R2
+    word, _ = _remove_ending(word, r2, DERIVATIONAL)
+    # Шаг 4: превосходная степень, двойная "н" и мягкий знак
+    word, _ = _remove_ending(word, rv, SUPERLATIVE)
+    if word.endswith("нн") and len(word) - 1 >= rv:
+        word = word[:-1]
+    else:
+        word, _ = _remove_ending(word, rv, ("ь",))
+    return word
+
+
+def normalize_text(text):
+    """
+    Функция приведения текста к виду, в котором он хранится в индексе: слова заменяются на их основы
+    """
+    return " ".join(stem_word(word) for word in WORD_RE.findall(text))
+
+
+class BaseSearchBackend:
+    """
+    Базовый класс поискового бэкенда
+    """
+
+    def index(self, article, using="default"):
+        """
+        Метод добавления (обновления) статьи в поисковом индексе
+        """
+        raise NotImplementedError
+
+    def remove(self, pk, using="default"):
+        """
+        Метод удаления статьи из поискового индекса
+        """
+        raise NotImplementedError
+
+    def rebuild(self, queryset, using="default"):
+        """
+        Метод полной перестройки индекса по переданному qs статей
+        """
+        for article in queryset.iterator():
+            self.index(article, using=using)
+
+    def search(self, queryset, query):
+        """
+        Метод поиска: возвращает qs, отфильтрованный по запросу и упорядоченный по релевантности
+        """
+        raise NotImplementedError
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """
+    Поиск через icontains (для БД без полнотекстового индекса). Индекс не ведется
+    """
+
+    def index(self, article, using="default"):
+        pass
+
+    def remove(self, pk, using="default"):
+        pass
+
+    def rebuild(self, queryset, using="default"):
+        pass
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query)
+            | Q(short_description__icontains=query)
+            | Q(full_description__icontains=query)
+        ).order_by("-time_create")
+
+
+class SqliteFTS5SearchBackend(BaseSearchBackend):
+    """
+    Поиск через виртуальную таблицу SQLite FTS5 с ранжированием bm25
+    """
+
+    # Веса столбцов индекса для bm25: заголовок важнее краткого описания, а оно - важнее тела статьи
+    weights = (10.0, 4.0, 1.0)
+
+    # Кол-во статей в одном пакетном INSERT при перестройке индекса
+    rebuild_batch_size = 1000
+
+    def get_row(self, article):
+        """
+        Метод получения нормализованных значений столбцов индекса для статьи
+        """
+        return (
+            normalize_text(article.title),
+            normalize_text(html_to_text(article.short_description)),
+            normalize_text(html_to_text(article.full_description)),
+        )
+
+    def index(self, article, using="default"):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [article.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, short_description, body) VALUES (%s, %s, %s, %s)",
+                [article.pk, *self.get_row(article)],
+            )
+
+    def remove(self, pk, using="default"):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+    def rebuild(self, queryset, using="default"):
+        """
+        Перестройка индекса в одной транзакции пакетными INSERT (быстро и для сотен тысяч статей)
+        """
+        sql = f"INSERT INTO {FTS_TABLE} (rowid, title, short_description, body) VALUES (%s, %s, %s, %s)"
+        with transaction.atomic(using=using), connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            batch = []
+            for article in queryset.iterator(chunk_size=self.rebuild_batch_size):
+                batch.append([article.pk, *self.get_row(article)])
+                if len(batch) >= self.rebuild_batch_size:
+                    cursor.executemany(sql, batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+
+    def build_match(self, query):
+        """
+        Метод формирования выражения MATCH: каждое слово запроса приводится к основе и ищется по префиксу
+        """
+        stems = [stem_word(word) for word in WORD_RE.findall(query)]
+        return " AND ".join(f'"{stem}"*' for stem in stems if stem)
+
+    def search(self, queryset, query):
+        match = self.build_match(query)
+        if not match:
+            return queryset.none()
+
+        weights = ", ".join(str(weight) for weight in self.weights)
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s",
+                [match, settings.BLOG_SEARCH_LIMIT],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+        if not ids:
+            return queryset.none()
+
+        # Сохранение порядка релевантности из индекса
+        relevance = Case(
+            *(When(pk=pk, then=position) for position, pk in enumerate(ids)),
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=ids).order_by(relevance)
+
+
+def get_search_backend(using="default"):
+    """
+    Функция получения поискового бэкенда: из настройки BLOG_SEARCH_BACKEND или по типу БД
+    """
+    if settings.BLOG_SEARCH_BACKEND:
+        return import_string(settings.BLOG_SEARCH_BACKEND)()
+    if connections[using].vendor == "sqlite":
+        return SqliteFTS5SearchBackend()
+    return SimpleSearchBackend()
@@ -0,0 +1,66 @@
+"""
+Фоновые задачи блога (выполняются обработчиком очереди jobs, см. команду run_jobs)
+"""
+
+import os
+
+from django.apps import apps
+
+from mediafiles.derivatives import build_derivatives, release_derivatives
+from mediafiles.placeholders import get_image_info
+from utils import image_compress
+from .cache import invalidate_articles
+
+
+def compress_article_thumbnail(article_id):
+    """
+    Задача сжатия превью статьи (конвертация в webp шириной 600px), генерации его вариантов для srcset и сведений
+    о превью (размер, превью-заглушка, цвет). Результаты сохраняются в поля модели, только если превью статьи
+    не изменилось за время выполнения задачи
+    """
+    Article = apps.get_model("blog", "Article")
+    article = (
+        Article.objects.get_queryset()
+        .only("thumbnail", "thumbnail_compressed", "thumbnail_variants", "category_id")
+        .filter(pk=article_id)
+        .first()
+    )
+    if article is None or not article.thumbnail:
+        return
+
+    source = article.thumbnail.name
+    with article.thumbnail.open("rb") as image:
+        compressed = image_compress(image, width=600)
+    variants = build_derivatives(article.thumbnail, "blog.Article.thumbnail")
+    info = get_image_info(article.thumbnail)
+
+    field = article.thumbnail_compressed
+    name = field.storage.save(
+        field.field.generate_filename(article, os.path.basename(compressed.name)),
+        compressed,
+    )
+    compressed.close()
+    # Обновление через UPDATE (без сигналов сохранения модели) и только для того же исходного превью
+    updated = (
+        Article.objects.get_queryset()
+        .filter(pk=article_id, thumbnail=source)
+        .update(
+            thumbnail_compressed=name,
+            thumbnail_variants=variants,
+            thumbnail_width=info["width"],
+            thumbnail_height=info["height"],
+            thumbnail_placeholder=info["placeholder"],
+            thumbnail_color=info["color"],
+        )
+    )
+    if not updated:
+        # Результаты не записаны - удаляются сжатая копия и варианты (если они не общие с другими объектами)
+        field.storage.delete(name)
+        release_derivatives(article, "thumbnail_variants", variants)
+        return
+
+    # Прежняя сжатая копия больше не используется (при том же содержимом имя совпадает, но ссылка на файл
+    # в хранилище добавлена новым сохранением, поэтому прежняя ссылка все равно удаляется)
+    if field:
+        field.storage.delete(field.name)
+    invalidate_articles([(article.pk, article.category_id)])
@@ -0,0 +1,97 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+from blog.cache import CATEGORY_TREE_TAG, TAG_KEY, aget_tag_versions, get_tag_versions
+from blog.models import Category
+from main.routers import primary_reads
+
+register = template.Library()
+
+# Ключ кэша готового HTML дерева категорий для боковой панели
+CATEGORY_TREE_KEY = "blog:category-tree-html"
+
+
+def get_category_rows():
+    """
+    Функция получения qs строк категорий (id, id родителя, название, slug) в порядке обхода дерева
+    """
+    return Category.objects.order_by("tree_id", "lft").values_list(
+        "pk", "parent_id", "title", "slug"
+    )
+
+
+def build_category_tree(rows):
+    """
+    Функция построения вложенного списка категорий из строк одного запроса: [{"title", "url", "children"}, ...].
+    URL формируется подстановкой slug в шаблон, вместо вызова reverse() для каждой категории
+    """
+    url_template = reverse("articles_by_category", kwargs={"slug": "__slug__"})
+    nodes, roots = {}, []
+    for pk, parent_id, title, slug in rows:
+        node = {
+            "title": title,
+            "url": url_template.replace("__slug__", slug),
+            "children": [],
+        }
+        nodes[pk] = node
+        # В порядке обхода дерева (tree_id, lft) родитель всегда идет раньше потомков
+        (nodes[parent_id]["children"] if parent_id in nodes else roots).append(node)
+    return roots
+
+
+def get_category_tree_html():
+    """
+    Функция получения готового HTML дерева категорий. HTML хранится в кэше вместе с версией дерева (версия тега
+    "category-tree" меняется при любом изменении категорий), поэтому обычно функция стоит одного обращения к кэшу
+    """
+    version_key = TAG_KEY.format(CATEGORY_TREE_TAG)
+    cached = cache.get_many([CATEGORY_TREE_KEY, version_key])
+    entry = cached.get(CATEGORY_TREE_KEY)
+    if entry is not None and entry["version"] == cached.get(version_key):
+        return entry["html"]
+
+    # Версия берется до построения дерева: если категории изменятся во время построения, запись сразу устареет
+    version = get_tag_versions([CATEGORY_TREE_TAG])[CATEGORY_TREE_TAG]
+    # Дерево хранится в кэше без срока, поэтому читается из основной БД, а не с отстающей реплики
+    with primary_reads():
+        rows = list(get_category_rows())
+    html = render_to_string(
+        "blog/category_tree.html", {"nodes": build_category_tree(rows)}
+    )
+    cache.set(CATEGORY_TREE_KEY, {"version": version, "html": str(html)}, None)
+    return str(html)
+
+
+async def aget_category_tree_html():
+    """
+    Асинхронная версия get_category_tree_html (для async представлений: HTML передается в контекст шаблона
+    как category_tree_html)
+    """
+    version_key = TAG_KEY.format(CATEGORY_TREE_TAG)
+    cached = await cache.aget_many([CATEGORY_TREE_KEY, version_key])
+    entry = cached.get(CATEGORY_TREE_KEY)
+    if entry is not None and entry["version"] == cached.get(version_key):
+        return entry["html"]
+
+    version = (await aget_tag_versions([CATEGORY_TREE_TAG]))[CATEGORY_TREE_TAG]
+    with primary_reads():
+        rows = [row async for row in get_category_rows()]
+    html = render_to_string(
+        "blog/category_tree.html", {"nodes": build_category_tree(rows)}
+    )
+    await cache.aset(CATEGORY_TREE_KEY, {"version": version, "html": str(html)}, None)
+    return str(html)
+
+
+@register.simple_tag(takes_context=True)
+def category_tree(context):
+    """
+    Тег, возвращающий готовый HTML дерева категорий (из контекста, если его заранее загрузило представление)
+    """
+    html = context.get("category_tree_html")
+    if html is None:
+        html = get_category_tree_html()
+    return mark_safe(html)
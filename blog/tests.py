@@ -1,3 +1,895 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from PIL import Image
+from asgiref.sync import sync_to_async
+from PIL.JpegImagePlugin import JpegImageFile
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from main.testing import SimpleTestCase, TestCase, make_image
+from mediafiles.derivatives import build_derivatives
+from mediafiles.storage import content_storage
+from utils import (
+    CkeditorCustomStorage,
+    ImageTooLargeError,
+    InvalidCursor,
+    KeysetPaginator,
+    SlugAllocator,
+    image_compress,
+    unique_slugify,
+    validate_image_pixels,
+)
+from .async_views import (
+    AsyncArticlesByCategoryView,
+    AsyncArticlesView,
+    AsyncArticleView,
+)
+from .cache import ARTICLE_LIST_TAG, article_tag, category_tag, get_tag_versions
+from .counters import apply_counter_deltas, get_counter_deltas, recount_categories
+from .models import Article, Category, ARTICLES_COUNT_CACHE_KEY
+from .search import SqliteFTS5SearchBackend, normalize_text, stem_word
+from .tasks import compress_article_thumbnail
+from .templatetags.blog_tags import get_category_tree_html
+from .transfer import JsonlImporter
+from .views import ArticlesByCategoryView, ArticlesView, ArticleView
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN SQLite")
+class PublicQueryPlanTests(TestCase):
+    """
+    Проверка планов основных запросов публичных страниц блога: выборка идет по индексу, а не полным
+    сканированием таблицы статей
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Category.objects.create(title="Python", slug="python")
+        cls.child = Category.objects.create(
+            title="Django", slug="django", parent=cls.root
+        )
+        for i in range(7):
+            Article.objects.create(
+                title=f"Статья {i}",
+                short_description="Описание",
+                full_description="Текст",
+                category=cls.child if i % 2 else cls.root,
+                status=i != 6,
+            )
+
+    def get_view(self, view_class, path, **kwargs):
+        view = view_class()
+        view.setup(RequestFactory().get(path), **kwargs)
+        return view
+
+    def get_page_queryset(self, view, cursor=None):
+        """
+        Метод получения qs страницы курсорной пагинации представления (тот же запрос, что при отображении)
+        """
+        paginator = KeysetPaginator(
+            view.get_queryset(), view.paginate_by, ordering=view.keyset_ordering
+        )
+        if cursor == "next":
+            first = paginator.page()
+            cursor = paginator.encode_cursor(first.object_list[-1], "next")
+        return paginator.get_page_queryset(cursor)[0]
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        # Полное сканирование таблицы (без индекса) в плане выглядит как "SCAN app_article" без "USING"
+        self.assertNotRegex(plan, r"SCAN app_article(?! USING)")
+        return plan
+
+    def test_articles_feed(self):
+        view = self.get_view(ArticlesView, "/blog/")
+        for cursor in (None, "next"):
+            with self.subTest(cursor=cursor):
+                plan = self.assertUsesIndex(
+                    self.get_page_queryset(view, cursor), "app_article_published_idx"
+                )
+                # Порядок индекса совпадает с сортировкой ленты
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_articles_by_category(self):
+        for category in (self.root, self.child):
+            with self.subTest(category=category.slug):
+                view = self.get_view(
+                    ArticlesByCategoryView,
+                    f"/blog/category/{category.slug}/",
+                    slug=category.slug,
+                )
+                self.assertUsesIndex(
+                    self.get_page_queryset(view), "app_article_cat_pub_idx"
+                )
+
+    def test_article(self):
+        article = Article.objects.get_queryset().filter(status=True).first()
+        view = self.get_view(ArticleView, article.get_absolute_url(), slug=article.slug)
+        queryset = view.get_queryset().filter(slug=article.slug)
+        self.assertUsesIndex(queryset, "(slug=?)")
+
+
+class FieldTrackerTests(TestCase):
+    """
+    Проверка отслеживания изменений полей статьи (FieldTrackerMixin)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Python", slug="python")
+        cls.article = Article.objects.create(
+            title="Статья",
+            short_description="Описание",
+            full_description="Текст",
+            category=cls.category,
+            thumbnail="blog/thumbnails/old.jpg",
+        )
+
+    def test_deferred_field_keeps_changes(self):
+        article = (
+            Article.objects.get_queryset()
+            .only("id", "slug", "thumbnail", "category")
+            .get(pk=self.article.pk)
+        )
+        article.thumbnail = "blog/thumbnails/new.jpg"
+        # Загрузка отложенных полей (в т.ч. отслеживаемого) не затирает изменение превью
+        self.assertEqual(article.title, "Статья")
+        self.assertEqual(article.full_description, "Текст")
+        self.assertTrue(article.has_changed("thumbnail"))
+        self.assertFalse(article.has_changed("full_description"))
+
+    def test_refresh_from_db(self):
+        article = Article.objects.get_queryset().get(pk=self.article.pk)
+        article.thumbnail = "blog/thumbnails/new.jpg"
+        article.refresh_from_db(fields=["title"])
+        self.assertTrue(article.has_changed("thumbnail"))
+        article.refresh_from_db()
+        self.assertFalse(article.has_changed("thumbnail"))
+
+
+class ArticleAdminActionTests(TestCase):
+    """
+    Проверка массовой смены статуса статей в админ-панели (update без сигналов сохранения)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Python", slug="python")
+        for i in range(2):
+            Article.objects.create(
+                title=f"Статья {i}",
+                short_description="Описание",
+                full_description="Текст",
+                category=cls.category,
+            )
+
+    def test_status_update_resets_count_cache(self):
+        model_admin = admin.site._registry[Article]
+        queryset = Article.objects.get_queryset()
+        rows = list(queryset.values_list("id", "category_id", "status"))
+        cache.set(ARTICLES_COUNT_CACHE_KEY.format("all"), len(rows))
+        queryset.update(status=Article.Status.PUBLISHED)
+        model_admin.after_status_update(rows, Article.Status.PUBLISHED, queryset.db)
+        self.assertIsNone(cache.get(ARTICLES_COUNT_CACHE_KEY.format("all")))
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.articles_total, 2)
+
+
+class CategoryCounterTests(TestCase):
+    """
+    Проверка денормализованных счетчиков статей категорий (blog/counters.py)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Дерево: root -> (a -> c), b; опубликованная статья в c
+        cls.root = Category.objects.create(title="Root", slug="root")
+        cls.a = Category.objects.create(title="A", slug="a", parent=cls.root)
+        cls.b = Category.objects.create(title="B", slug="b", parent=cls.root)
+        cls.c = Category.objects.create(title="C", slug="c", parent=cls.a)
+        cls.article = Article.objects.create(
+            title="Статья",
+            short_description="Описание",
+            full_description="Текст",
+            category=cls.c,
+            status=Article.Status.PUBLISHED,
+        )
+
+    def get_totals(self):
+        return dict(Category.objects.values_list("slug", "articles_total"))
+
+    def get_counts(self):
+        return dict(Category.objects.values_list("slug", "articles_count"))
+
+    def get_article(self):
+        return Article.objects.get_queryset().get(pk=self.article.pk)
+
+    def test_get_counter_deltas(self):
+        changes = [
+            (False, None, True, 1),  # Создана опубликованная статья
+            (True, 1, True, 2),  # Перенесена в другую категорию
+            (True, 2, False, 2),  # Снята с публикации
+            (False, 3, False, 4),  # Перенесен черновик
+            (True, 3, False, None),  # Удалена
+        ]
+        self.assertEqual(get_counter_deltas(changes), {3: -1})
+        self.assertEqual(get_counter_deltas(changes[:2]), {2: 1})
+
+    def test_apply_counter_deltas(self):
+        apply_counter_deltas({self.b.pk: 2, self.c.pk: -1})
+        self.assertEqual(self.get_counts(), {"root": 0, "a": 0, "b": 2, "c": 0})
+        self.assertEqual(self.get_totals(), {"root": 2, "a": 0, "b": 2, "c": 0})
+        self.assertEqual(recount_categories(), 4)
+
+    def test_status_change(self):
+        article = self.get_article()
+        article.status = Article.Status.DRAFT
+        article.save()
+        self.assertEqual(self.get_totals(), {"root": 0, "a": 0, "b": 0, "c": 0})
+        article.status = Article.Status.PUBLISHED
+        article.save()
+        self.assertEqual(self.get_counts(), {"root": 0, "a": 0, "b": 0, "c": 1})
+        self.assertEqual(self.get_totals(), {"root": 1, "a": 1, "b": 0, "c": 1})
+
+    def test_category_change(self):
+        article = self.get_article()
+        article.category = self.b
+        article.save()
+        self.assertEqual(self.get_counts(), {"root": 0, "a": 0, "b": 1, "c": 0})
+        self.assertEqual(self.get_totals(), {"root": 1, "a": 0, "b": 1, "c": 0})
+        self.assertEqual(recount_categories(), 0)
+
+    def test_delete(self):
+        self.get_article().delete()
+        self.assertEqual(self.get_counts(), {"root": 0, "a": 0, "b": 0, "c": 0})
+        self.assertEqual(self.get_totals(), {"root": 0, "a": 0, "b": 0, "c": 0})
+
+    def assertMoved(self):
+        self.assertEqual(self.get_totals(), {"root": 1, "a": 0, "b": 1, "c": 1})
+        # Счетчики согласованы: удаление статьи не нарушает ограничение articles_total >= 0
+        self.article.delete()
+        self.assertEqual(self.get_totals(), {"root": 0, "a": 0, "b": 0, "c": 0})
+
+    def test_move_by_parent(self):
+        # Узлы загружаются заново: lft / rght созданных в setUpTestData объектов устарели после вставки дочерних
+        category = Category.objects.get(pk=self.c.pk)
+        category.parent = Category.objects.get(pk=self.b.pk)
+        category.save()
+        self.assertMoved()
+
+    def test_move_node(self):
+        category = Category.objects.get(pk=self.c.pk)
+        Category.objects.move_node(category, Category.objects.get(pk=self.b.pk))
+        self.assertMoved()
+
+
+class PageCacheInvalidationTests(TestCase):
+    """
+    Проверка инвалидации тегов кэша страниц при изменении статей
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.python = Category.objects.create(title="Python", slug="python")
+        cls.django = Category.objects.create(
+            title="Django", slug="django", parent=cls.python
+        )
+        cls.go = Category.objects.create(title="Go", slug="go")
+        cls.article = Article.objects.create(
+            title="Статья",
+            short_description="Описание",
+            full_description="Текст",
+            category=cls.django,
+            status=Article.Status.PUBLISHED,
+        )
+
+    def test_category_change(self):
+        tags = [
+            category_tag(category.pk)
+            for category in (self.python, self.django, self.go)
+        ]
+        versions = get_tag_versions(tags)
+        article = Article.objects.get_queryset().get(pk=self.article.pk)
+        article.category = self.go
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save()
+            # До коммита версии тегов не меняются
+            self.assertEqual(get_tag_versions(tags), versions)
+        # Инвалидируются прежняя категория вместе с предками и новая категория
+        changed = get_tag_versions(tags)
+        for tag in tags:
+            with self.subTest(tag):
+                self.assertNotEqual(changed[tag], versions[tag])
+
+    def test_status_update_after_commit(self):
+        tags = [ARTICLE_LIST_TAG, article_tag(self.article.pk)]
+        versions = get_tag_versions(tags)
+        queryset = Article.objects.get_queryset()
+        rows = list(queryset.values_list("id", "category_id", "status"))
+        with self.captureOnCommitCallbacks() as callbacks:
+            queryset.update(status=Article.Status.DRAFT)
+            admin.site._registry[Article].after_status_update(
+                rows, Article.Status.DRAFT, queryset.db
+            )
+        self.assertEqual(get_tag_versions(tags), versions)
+        for callback in callbacks:
+            callback()
+        changed = get_tag_versions(tags)
+        for tag in tags:
+            with self.subTest(tag):
+                self.assertNotEqual(changed[tag], versions[tag])
+
+
+class CompressThumbnailTests(TestCase):
+    """
+    Проверка фоновой задачи сжатия превью статьи
+    """
+
+    def setUp(self):
+        super().setUp()
+        category = Category.objects.create(title="Python", slug="python")
+        self.article = Article.objects.create(
+            title="Статья",
+            short_description="Описание",
+            full_description="Текст",
+            category=category,
+            thumbnail=make_image(),
+        )
+
+    def test_thumbnail_replaced(self):
+        built = {}
+
+        def build_and_replace(image, label):
+            # Превью статьи меняется, пока задача сжимает прежнее
+            built.update(build_derivatives(image, label))
+            Article.objects.get_queryset().filter(pk=self.article.pk).update(
+                thumbnail="blog/thumbnails/other.jpg"
+            )
+            return built
+
+        with mock.patch("blog.tasks.build_derivatives", build_and_replace):
+            with self.captureOnCommitCallbacks(execute=True):
+                compress_article_thumbnail(self.article.pk)
+        article = Article.objects.get_queryset().get(pk=self.article.pk)
+        self.assertFalse(article.thumbnail_compressed)
+        self.assertEqual(article.thumbnail_variants, {})
+        names = [name for items in built["formats"].values() for _, name in items]
+        self.assertTrue(names)
+        for name in names:
+            with self.subTest(name):
+                self.assertFalse(default_storage.exists(name))
+
+
+class ArticleFilesTests(TestCase):
+    """
+    Проверка удаления файлов статьи: файлов редактора, убранных из текста, и вариантов старого превью
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Папка файлов редактора задается при импорте, поэтому подменяется на временную явно
+        patcher = mock.patch.object(
+            CkeditorCustomStorage,
+            "location",
+            os.path.join(self.media_root, "blog/uploads/"),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.category = Category.objects.create(title="Python", slug="python")
+
+    def create_article(self, **fields):
+        fields = {
+            "title": "Статья",
+            "short_description": "Описание",
+            "full_description": "Текст",
+            "category": self.category,
+            **fields,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            return Article.objects.create(**fields)
+
+    def test_shared_upload_kept(self):
+        storage = CkeditorCustomStorage()
+        with self.captureOnCommitCallbacks(execute=True):
+            name = storage.save("photo.jpg", make_image())
+        html = f'<p><img src="{storage.base_url}{name}"></p>'
+        # Картинку вставили в текст двух статей
+        articles = [self.create_article(full_description=html) for _ in range(2)]
+        for article, exists in zip(articles, (True, False)):
+            article.full_description = "Текст"
+            with self.captureOnCommitCallbacks(execute=True):
+                article.save()
+            self.assertEqual(storage.exists(name), exists)
+
+    def test_variants_kept_on_rollback(self):
+        article = self.create_article(thumbnail=make_image())
+        with self.captureOnCommitCallbacks(execute=True):
+            compress_article_thumbnail(article.pk)
+        article = Article.objects.get_queryset().get(pk=article.pk)
+        variants = article.thumbnail_variants
+        names = [name for items in variants["formats"].values() for _, name in items]
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                article.thumbnail = make_image(color="blue")
+                article.save()
+                raise RuntimeError
+        for name in names:
+            with self.subTest(name):
+                self.assertTrue(default_storage.exists(name))
+
+
+class JsonlImportTests(TestCase):
+    """
+    Проверка импорта JSON Lines с обновлением существующих объектов
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Python", slug="python")
+        cls.article = Article.objects.create(
+            title="Статья",
+            short_description="Описание",
+            full_description="Текст",
+            category=cls.category,
+            status=Article.Status.PUBLISHED,
+        )
+
+    def run_import(self, *records):
+        stream = io.StringIO("\n".join(json.dumps(record) for record in records))
+        return JsonlImporter(update=True).run(stream)
+
+    def test_partial_update(self):
+        counts = self.run_import(
+            {
+                "model": "blog.article",
+                "pk": self.article.pk,
+                "fields": {"title": "Новая"},
+            },
+            {
+                "model": "blog.article",
+                "pk": self.article.pk + 1,
+                "fields": {
+                    "title": "Другая",
+                    "slug": "drugaya",
+                    "short_description": "Описание",
+                    "full_description": "Текст",
+                    "category": self.category.pk,
+                },
+            },
+        )
+        self.assertEqual(counts, {"blog.article": 2})
+        # Поля, которых нет в строке, не сбрасываются к значениям по умолчанию
+        article = Article.objects.get_queryset().get(pk=self.article.pk)
+        self.assertEqual(article.title, "Новая")
+        self.assertEqual(article.slug, self.article.slug)
+        self.assertEqual(article.full_description, "Текст")
+        self.assertEqual(article.status, Article.Status.PUBLISHED)
+        self.assertEqual(
+            Article.objects.get_queryset().get(pk=self.article.pk + 1).title, "Другая"
+        )
+
+
+class CategoryTreeTests(TestCase):
+    """
+    Проверка HTML дерева категорий боковой панели из кэша с версией дерева
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.python = Category.objects.create(title="Python", slug="python")
+        Category.objects.create(title="Django", slug="django", parent=cls.python)
+
+    def test_cached_tree(self):
+        html = get_category_tree_html()
+        self.assertInHTML(
+            '<li><a href="/blog/category/python/">Python</a></li>'
+            '<ul><li><a href="/blog/category/django/">Django</a></li></ul>',
+            html,
+        )
+        # Повторно HTML берется из кэша без запросов к БД
+        with self.assertNumQueries(0):
+            self.assertEqual(get_category_tree_html(), html)
+
+    def test_invalidated_on_category_change(self):
+        get_category_tree_html()
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(title="Go", slug="go")
+        self.assertIn("/blog/category/go/", get_category_tree_html())
+
+
+class ImageCompressTests(SimpleTestCase):
+    """
+    Проверка сжатия изображений (utils.image_compress) и ограничения кол-ва пикселей
+    """
+
+    def test_output_size(self):
+        draft = JpegImageFile.draft
+        with mock.patch.object(
+            JpegImageFile, "draft", autospec=True, side_effect=draft
+        ) as mocked:
+            compressed = image_compress(make_image(size=(4000, 3000)), width=600)
+        # JPEG декодируется сразу в уменьшенном масштабе (не меньше целевого размера)
+        mocked.assert_called_once_with(mock.ANY, "RGB", (600, 450))
+        self.assertEqual(compressed.name, "photo_compressed.WEBP")
+        self.assertEqual(compressed.size, len(compressed.read()))
+        compressed.seek(0)
+        with Image.open(compressed) as im:
+            self.assertEqual((im.format, im.size), ("WEBP", (600, 450)))
+
+    def test_png(self):
+        compressed = image_compress(
+            make_image("logo.png", color="blue", image_format="PNG"), width=300
+        )
+        self.assertEqual(compressed.name, "logo_compressed.WEBP")
+        with Image.open(compressed) as im:
+            self.assertEqual((im.format, im.size), ("WEBP", (300, 200)))
+
+    @override_settings(IMAGE_COMPRESS_MAX_PIXELS=1000)
+    def test_pixel_limit(self):
+        with self.assertRaises(ImageTooLargeError):
+            image_compress(make_image(), width=600)
+        with self.assertRaises(ValidationError):
+            validate_image_pixels(make_image())
+        validate_image_pixels(make_image(size=(40, 25)))
+
+
+class ArticleCreateTests(TestCase):
+    """
+    Проверка создания статьи с превью одной записью в таблицу статей
+    """
+
+    def test_single_insert(self):
+        category = Category.objects.create(title="Python", slug="python")
+        with CaptureQueriesContext(connection) as queries:
+            article = Article.objects.create(
+                title="Новая статья",
+                short_description="Описание",
+                full_description="Текст",
+                category=category,
+                thumbnail=make_image(),
+            )
+        writes = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith(("INSERT", "UPDATE"))
+            and '"app_article"' in query["sql"]
+        ]
+        # Файл превью сохраняется до INSERT под окончательным именем, повторного UPDATE нет
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith('INSERT INTO "app_article"'))
+        self.assertEqual(article.slug, "novaya-statya")
+        self.assertTrue(content_storage.exists(article.thumbnail.name))
+
+
+class ConditionalGetTests(TestCase):
+    """
+    Проверка условных запросов страниц блога: ответ 304 без построения страницы
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Python", slug="python")
+        cls.article = Article.objects.create(
+            title="Статья",
+            slug="statya",
+            short_description="Описание",
+            full_description="Текст",
+            category=cls.category,
+            status=Article.Status.PUBLISHED,
+            thumbnail=make_image(),
+        )
+
+    def test_not_modified(self):
+        for url in (
+            reverse("blog"),
+            reverse("articles_by_category", kwargs={"slug": "python"}),
+            self.article.get_absolute_url(),
+        ):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("Last-Modified", response)
+                # Валидаторы проверяются одним запросом к БД, до выборки статей и шаблонов
+                with self.assertNumQueries(1):
+                    response = self.client.get(
+                        url, headers={"if-none-match": response["ETag"]}
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes(self):
+        url = self.article.get_absolute_url()
+        etag = self.client.get(url)["ETag"]
+        article = Article.objects.get_queryset().get(pk=self.article.pk)
+        article.full_description = "Новый текст"
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save()
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertContains(response, "Новый текст")
+
+
+class AsyncViewsTests(TestCase):
+    """
+    Проверка async версий страниц блога (маршруты ASGI): содержимое совпадает с синхронными представлениями
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Python", slug="python")
+        cls.article = Article.objects.create(
+            title="Статья",
+            slug="statya",
+            short_description="Описание",
+            full_description="Текст",
+            category=cls.category,
+            status=Article.Status.PUBLISHED,
+            thumbnail=make_image(),
+        )
+
+    async def test_same_content(self):
+        pages = [
+            (reverse("blog"), AsyncArticlesView),
+            (
+                reverse("articles_by_category", kwargs={"slug": "python"}),
+                AsyncArticlesByCategoryView,
+            ),
+            (self.article.get_absolute_url(), AsyncArticleView),
+            (
+                reverse("articles_by_category", kwargs={"slug": "missing"}),
+                AsyncArticlesByCategoryView,
+            ),
+        ]
+        for url, async_view in pages:
+            with self.subTest(url):
+                response = await sync_to_async(self.client.get)(url)
+                # Кэш страниц очищается: async представление строит страницу само
+                await cache.aclear()
+                with override_settings(ROOT_URLCONF="config.asgi_urls"):
+                    async_response = await self.async_client.get(url)
+                    # resolver_match вычисляется при обращении, поэтому проверяется внутри override_settings
+                    view = async_response.resolver_match.func.view_class
+                self.assertIs(view, async_view)
+                self.assertEqual(async_response.status_code, response.status_code)
+                self.assertEqual(async_response.content, response.content)
+                await cache.aclear()
+
+
+class UniqueSlugTests(TestCase):
+    """
+    Проверка выбора уникальных slug (SlugAllocator) и повторного выбора при конфликте (UniqueSlugMixin)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Python", slug="python")
+
+    def create_article(self, title="Привет мир", **kwargs):
+        return Article.objects.create(
+            title=title,
+            short_description="Описание",
+            full_description="Текст",
+            category=self.category,
+            **kwargs,
+        )
+
+    def test_duplicate_titles(self):
+        slugs = [self.create_article().slug for _ in range(3)]
+        self.assertEqual(slugs, ["privet-mir", "privet-mir-2", "privet-mir-3"])
+
+    def test_suffix_gaps(self):
+        self.create_article(slug="privet-mir")
+        self.create_article(slug="privet-mir-3")
+        # Похожий slug с другой основой не считается занятым вариантом
+        self.create_article(slug="privet-mir-drug")
+        allocator = SlugAllocator(Article)
+        self.assertEqual(allocator.allocate("Привет мир"), "privet-mir-2")
+        self.assertEqual(
+            SlugAllocator(Article).allocate_many(["Привет мир"] * 3),
+            ["privet-mir-2", "privet-mir-4", "privet-mir-5"],
+        )
+
+    def test_own_slug_not_taken(self):
+        article = self.create_article()
+        self.assertEqual(
+            SlugAllocator(Article).allocate("Привет мир", exclude_pk=article.pk),
+            "privet-mir",
+        )
+
+    def test_max_length(self):
+        max_length = Article._meta.get_field("slug").max_length
+        slugs = [self.create_article(title="Очень " * 20).slug for _ in range(3)]
+        self.assertEqual(len(set(slugs)), 3)
+        self.assertTrue(all(len(slug) <= max_length for slug in slugs))
+        self.assertTrue(slugs[1].endswith("-2"))
+
+    def test_integrity_error_retry(self):
+        self.create_article()
+        calls = []
+
+        def stale_slugify(instance, slug):
+            # Первый выбор устарел: тот же slug успел занять параллельный запрос
+            calls.append(slug)
+            return "privet-mir" if len(calls) == 1 else unique_slugify(instance, slug)
+
+        with mock.patch("utils.unique_slugify", side_effect=stale_slugify):
+            article = self.create_article()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(article.slug, "privet-mir-2")
+
+    def test_integrity_error_attempts_exhausted(self):
+        self.create_article()
+        with mock.patch("utils.unique_slugify", return_value="privet-mir"):
+            with self.assertRaises(IntegrityError):
+                self.create_article()
+        self.assertEqual(Article.objects.get_queryset().count(), 1)
+
+
+class KeysetPaginatorTests(TestCase):
+    """
+    Проверка курсорной пагинации: обход страниц вперед и назад, разбор курсоров и некорректные курсоры
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title="Python", slug="python")
+        for i in range(7):
+            Article.objects.create(
+                title=f"Статья {i}",
+                short_description="Описание",
+                full_description="Текст",
+                category=category,
+                status=Article.Status.PUBLISHED,
+            )
+        # Одинаковое время создания: порядок внутри группы определяет id
+        Article.objects.get_queryset().filter(pk__lte=4).update(
+            time_create=timezone.now()
+        )
+        cls.expected = list(
+            Article.objects.get_queryset()
+            .order_by("-time_create", "-id")
+            .values_list("pk", flat=True)
+        )
+
+    def get_paginator(self):
+        return KeysetPaginator(Article.objects.get_queryset(), 3)
+
+    def encode(self, data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+    def test_pages(self):
+        paginator = self.get_paginator()
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertFalse(pages[0].has_previous())
+        self.assertEqual([obj.pk for page in pages for obj in page], self.expected)
+        # Обратный обход по курсорам "prev" возвращает те же страницы
+        for page, previous in zip(pages[:0:-1], pages[-2::-1]):
+            back = paginator.page(page.previous_cursor)
+            self.assertEqual([obj.pk for obj in back], [obj.pk for obj in previous])
+            self.assertTrue(back.has_next())
+
+    def test_decode_cursor(self):
+        paginator = self.get_paginator()
+        obj = Article.objects.get_queryset().get(pk=self.expected[0])
+        direction, values = paginator.decode_cursor(
+            paginator.encode_cursor(obj, "prev")
+        )
+        self.assertEqual(direction, "prev")
+        # Время сохраняется с микросекундами
+        self.assertEqual(values, [obj.time_create.isoformat(), obj.pk])
+
+    def test_invalid_cursors(self):
+        paginator = self.get_paginator()
+        cursors = {
+            "не base64": "!!!",
+            "не JSON": "YWJj",
+            "не список": self.encode({"next": 1}),
+            "пустой список": self.encode([]),
+            "неизвестное направление": self.encode(["up", "2024-01-01T00:00:00", 1]),
+            "не хватает значений": self.encode(["next", "2024-01-01T00:00:00"]),
+            "некорректная дата": self.encode(["next", "вчера", 1]),
+            "некорректный id": self.encode(["next", "2024-01-01T00:00:00+00:00", "x"]),
+            "пустые значения": self.encode(["next", None, None]),
+        }
+        for name, cursor in cursors.items():
+            with self.subTest(name):
+                with self.assertRaises(InvalidCursor):
+                    paginator.page(cursor)
+
+    def test_invalid_cursor_not_found(self):
+        response = self.client.get("/blog/", {"cursor": "!!!"})
+        self.assertEqual(response.status_code, 404)
+
+
+class StemmerTests(SimpleTestCase):
+    """
+    Проверка стеммера и построения запроса FTS5 (слова запроса и индекса приводятся к одной основе)
+    """
+
+    def test_stem_word(self):
+        cases = {
+            "статья": "стат",
+            "Статьи": "стат",
+            "статьями": "стат",
+            "программирование": "программирован",
+            "программировать": "программирова",
+            "программисты": "программист",
+            "бегающими": "бега",
+            "красивейший": "красив",
+            "любовь": "любов",
+            "Ёлки": "елк",
+            "Django": "django",
+            "2024": "2024",
+        }
+        for word, stem in cases.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem_word(word), stem)
+
+    def test_normalize_text(self):
+        self.assertEqual(
+            normalize_text("Новые статьи: Django-шаблоны, 2024!"),
+            "нов стат django шаблон 2024",
+        )
+
+    def test_build_match(self):
+        backend = SqliteFTS5SearchBackend()
+        self.assertEqual(
+            backend.build_match("Django статьями"), '"django"* AND "стат"*'
+        )
+        # Операторы и спецсимволы FTS5 из запроса не попадают в выражение MATCH
+        self.assertEqual(
+            backend.build_match('"drop" OR title:* NEAR(a)'),
+            '"drop"* AND "or"* AND "title"* AND "near"* AND "a"*',
+        )
+        self.assertEqual(backend.build_match(" ,.! "), "")
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite FTS5")
+class SqliteFTS5SearchTests(TestCase):
+    """
+    Проверка поиска по индексу FTS5: словоформы и ранжирование по столбцам
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title="Python", slug="python")
+        cls.in_title = Article.objects.create(
+            title="Шаблоны Django",
+            short_description="Описание",
+            full_description="<p>Текст</p>",
+            category=category,
+        )
+        cls.in_body = Article.objects.create(
+            title="Заметка",
+            short_description="Описание",
+            full_description="<p>Про шаблон и фильтры</p>",
+            category=category,
+        )
+        cls.backend = SqliteFTS5SearchBackend()
+        cls.backend.rebuild(Article.objects.get_queryset())
+
+    def search(self, query):
+        queryset = self.backend.search(Article.objects.get_queryset(), query)
+        return list(queryset.values_list("pk", flat=True))
+
+    def test_search(self):
+        # Совпадение в заголовке весит больше, чем в тексте статьи
+        self.assertEqual(self.search("шаблонами"), [self.in_title.pk, self.in_body.pk])
+        self.assertEqual(self.search("шабл фильтр"), [self.in_body.pk])
+        # Теги HTML в индекс не попадают
+        self.assertEqual(self.search("<p>"), [])
+        self.assertEqual(self.search("!!!"), [])
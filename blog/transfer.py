@@ -0,0 +1,337 @@
+"""
+Потоковый перенос данных блога и галереи в формате JSON Lines.
+
+Каждая строка файла - один объект: {"model": "blog.article", "pk": 1, "fields": {...}} (как у dumpdata, но без
+загрузки всего файла в память). Экспорт читает таблицы итератором, импорт создает объекты пакетами bulk_create
+без сигналов сохранения; производные данные (дерево MPTT, счетчики категорий, поисковый индекс, кэш страниц)
+пересчитываются один раз после импорта. Ссылки на файлы изображений (mediafiles.Blob) пересчитываются по именам,
+которые импорт записал или перезаписал.
+"""
+
+import json
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.utils import timezone
+
+from mediafiles.references import is_content_field, recount_references
+from utils import SlugAllocator
+
+# Модели в порядке переноса (связанные модели раньше ссылающихся на них)
+MODELS = ("blog.category", "blog.article", "gallery.category", "gallery.gallery")
+
+# Поля, которые не переносятся, а пересчитываются после импорта (дерево MPTT, счетчики статей)
+SKIP_FIELDS = {
+    "blog.category": (
+        "lft",
+        "rght",
+        "tree_id",
+        "level",
+        "articles_count",
+        "articles_total",
+    ),
+}
+
+
+def encode_value(value):
+    """
+    Функция преобразования значений, не поддерживаемых JSON (дата и время - ISO формат с микросекундами)
+    """
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    raise TypeError(f"Значение типа {type(value).__name__} не сериализуется в JSON")
+
+
+def get_fields(model):
+    """
+    Функция получения переносимых полей модели (без первичного ключа и пересчитываемых полей)
+    """
+    skip = SKIP_FIELDS.get(model._meta.label_lower, ())
+    return [
+        field
+        for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in skip
+    ]
+
+
+def export_jsonl(stream, labels=MODELS, using="default", chunk_size=2000):
+    """
+    Функция потокового экспорта объектов моделей labels в поток stream. Возвращает кол-во объектов по моделям
+    """
+    counts = {}
+    for label in labels:
+        model = apps.get_model(label)
+        fields = get_fields(model)
+        queryset = model._base_manager.using(using).order_by("pk")
+        if label == "blog.category":
+            # Родительские категории раньше дочерних
+            queryset = queryset.order_by("tree_id", "lft")
+        rows = queryset.values_list("pk", *(field.attname for field in fields))
+        counts[label] = 0
+        for pk, *values in rows.iterator(chunk_size=chunk_size):
+            record = {
+                "model": label,
+                "pk": pk,
+                "fields": {field.name: value for field, value in zip(fields, values)},
+            }
+            stream.write(json.dumps(record, ensure_ascii=False, default=encode_value))
+            stream.write("\n")
+            counts[label] += 1
+    return counts
+
+
+@contextmanager
+def keep_auto_timestamps(model):
+    """
+    Контекстный менеджер, временно отключающий auto_now / auto_now_add полей модели (bulk_create иначе перезапишет
+    время создания и обновления импортируемых объектов текущим временем)
+    """
+    changed = []
+    for field in model._meta.concrete_fields:
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+            changed.append((field, field.auto_now, field.auto_now_add))
+            field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in changed:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class JsonlImporter:
+    """
+    Класс потокового импорта: объекты накапливаются по моделям и записываются пакетами bulk_create
+    (сигналы сохранения не вызываются). update=True - существующие объекты (по pk) обновляются, причем только
+    поля, указанные в строке файла: объекты пакета обновляются одним запросом, поэтому пакеты собираются
+    по модели и набору полей
+    """
+
+    def __init__(self, using="default", batch_size=1000, update=False):
+        self.using = using
+        self.batch_size = batch_size
+        self.update = update
+        # Пакеты по ключу (модель, набор полей строки или None без обновления)
+        self.batches = {}
+        self.counts = {}
+        self.fields = {}
+        self.allocators = {}  # Объекты выбора slug по моделям (общие для всех пакетов)
+        self.article_ids = (
+            []
+        )  # id импортированных статей (для инвалидации кэша их страниц)
+        # Имена файлов контентно-адресуемого хранилища, записанные или перезаписанные импортом (по хранилищам)
+        self.file_names = defaultdict(set)
+
+    def get_model_fields(self, label):
+        if label not in self.fields:
+            model = apps.get_model(label)
+            self.fields[label] = (
+                model,
+                {field.name: field for field in get_fields(model)},
+            )
+        return self.fields[label]
+
+    def add(self, record):
+        """
+        Метод добавления объекта из строки файла в пакет его модели
+        """
+        label = record["model"].lower()
+        if label not in MODELS:
+            raise ValueError(f"Модель {record['model']} не поддерживается импортом")
+        model, fields = self.get_model_fields(label)
+        # Значения приводятся к типам полей (даты и время - из ISO строк), отсутствующие в файле - по умолчанию
+        values = {
+            fields[name].attname: fields[name].to_python(value)
+            for name, value in record["fields"].items()
+            if name in fields
+        }
+        # Время создания и обновления, которого нет в строке, - текущее (как при обычном сохранении)
+        now = timezone.now()
+        for field in fields.values():
+            if field.attname not in values and (
+                getattr(field, "auto_now", False)
+                or getattr(field, "auto_now_add", False)
+            ):
+                values[field.attname] = now
+        obj = model(pk=record["pk"], **values)
+        for field in fields.values():
+            if is_content_field(field) and values.get(field.attname):
+                self.file_names[field.storage].add(values[field.attname])
+        if label == "blog.article":
+            self.article_ids.append(obj.pk)
+        names = None
+        if self.update:
+            names = frozenset(name for name in record["fields"] if name in fields)
+        batch = self.batches.setdefault((label, names), [])
+        batch.append(obj)
+        if len(batch) >= self.batch_size:
+            self.flush(label, names)
+
+    def flush(self, label, names=None):
+        """
+        Метод записи накопленного пакета модели (names - поля строк пакета, обновляемые у существующих объектов)
+        """
+        batch = self.batches.pop((label, names), [])
+        if not batch:
+            return
+        model, fields = self.get_model_fields(label)
+        if self.update:
+            missing = [field for name, field in fields.items() if name not in names]
+            if missing:
+                self.fill_missing_values(model, missing, batch)
+        # Пустые slug заполняются уникальными значениями (один запрос на пакет)
+        if "slug" in fields:
+            empty = [obj for obj in batch if not obj.slug]
+            if empty:
+                allocator = self.allocators.setdefault(
+                    label, SlugAllocator(model, using=self.using)
+                )
+                for obj, slug in zip(
+                    empty, allocator.allocate_many(obj.title for obj in empty)
+                ):
+                    obj.slug = slug
+        # Поля дерева MPTT заполняются заглушками и пересчитываются rebuild() после импорта
+        if label == "blog.category":
+            for obj in batch:
+                obj.lft = obj.rght = obj.tree_id = obj.level = 0
+        options = {}
+        if self.update:
+            # Поля, отсутствующие в строке, у существующего объекта не меняются (новый получает значения по умолчанию)
+            updated = [field for name, field in fields.items() if name in names]
+            self.collect_replaced_files(model, updated, batch)
+            if updated:
+                options = {
+                    "update_conflicts": True,
+                    "unique_fields": [model._meta.pk.name],
+                    "update_fields": [field.name for field in updated],
+                }
+            else:
+                options = {"ignore_conflicts": True}  # Обновлять нечего
+        with keep_auto_timestamps(model):
+            model._base_manager.using(self.using).bulk_create(batch, **options)
+        self.counts[label] = self.counts.get(label, 0) + len(batch)
+
+    def fill_missing_values(self, model, fields, batch):
+        """
+        Метод заполнения полей fields, которых не было в строках файла, значениями существующих объектов. Поля
+        не обновляются, но INSERT перед обновлением при конфликте pk должен пройти ограничения NOT NULL
+        """
+        attnames = [field.attname for field in fields]
+        rows = (
+            model._base_manager.using(self.using)
+            .filter(pk__in=[obj.pk for obj in batch])
+            .values_list("pk", *attnames)
+        )
+        existing = {pk: values for pk, *values in rows}
+        for obj in batch:
+            for attname, value in zip(attnames, existing.get(obj.pk, ())):
+                setattr(obj, attname, value)
+
+    def collect_replaced_files(self, model, fields, batch):
+        """
+        Метод запоминания прежних имен файлов обновляемых объектов (ссылки на них после импорта пересчитываются)
+        """
+        file_fields = [field for field in fields if is_content_field(field)]
+        if not file_fields:
+            return
+        rows = (
+            model._base_manager.using(self.using)
+            .filter(pk__in=[obj.pk for obj in batch])
+            .values_list(*(field.attname for field in file_fields))
+        )
+        for values in rows:
+            for field, name in zip(file_fields, values):
+                if name:
+                    self.file_names[field.storage].add(name)
+
+    def flush_all(self):
+        for label in MODELS:
+            for key in [key for key in self.batches if key[0] == label]:
+                self.flush(*key)
+
+    def run(self, stream):
+        """
+        Метод импорта всех строк потока в одной транзакции. Возвращает кол-во объектов по моделям
+        """
+        Category = apps.get_model("blog", "Category")
+        with ExitStack() as stack:
+            stack.enter_context(transaction.atomic(using=self.using))
+            # Обновления дерева MPTT отключаются на время импорта, дерево перестраивается один раз в конце
+            stack.enter_context(Category.objects.disable_mptt_updates())
+            for line in stream:
+                if line.strip():
+                    self.add(json.loads(line))
+            self.flush_all()
+            self.reset_sequences()
+            if "blog.category" in self.counts:
+                Category.objects.db_manager(self.using).rebuild()
+        return self.counts
+
+    def reset_sequences(self):
+        """
+        Метод сброса последовательностей первичных ключей (объекты импортируются со своими pk)
+        """
+        connection = connections[self.using]
+        models = [apps.get_model(label) for label in self.counts]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+
+def after_import(importer, derivatives=False):
+    """
+    Функция пересчета производных данных после импорта: счетчики статей в категориях, ссылки на файлы изображений,
+    поисковый индекс, кэш страниц и (по запросу) постановка в очередь генерации вариантов изображений
+    """
+    from blog.cache import (
+        ARTICLE_LIST_TAG,
+        CATEGORY_TREE_TAG,
+        article_tag,
+        category_tag,
+        invalidate_tags,
+    )
+    from blog.counters import recount_categories
+    from blog.models import ARTICLES_COUNT_CACHE_KEY
+    from blog.search import get_search_backend
+
+    Category = apps.get_model("blog", "Category")
+    Article = apps.get_model("blog", "Article")
+    counts, using = importer.counts, importer.using
+
+    if {"blog.category", "blog.article"} & set(counts):
+        recount_categories(using=using)
+    for storage, names in importer.file_names.items():
+        with transaction.atomic(using=using):
+            recount_references(storage, names, using=using)
+    if "blog.article" in counts:
+        queryset = Article.objects.get_queryset().using(using)
+        get_search_backend(using).rebuild(
+            queryset.only("pk", "title", "short_description", "full_description"),
+            using=using,
+        )
+        cache.delete(ARTICLES_COUNT_CACHE_KEY.format("all"))
+    invalidate_tags(
+        ARTICLE_LIST_TAG,
+        CATEGORY_TREE_TAG,
+        *(
+            category_tag(pk)
+            for pk in Category.objects.using(using).values_list("pk", flat=True)
+        ),
+    )
+    # Страницы новых статей еще не закэшированы, а обновленных - нужно сбросить
+    if importer.update:
+        invalidate_tags(*(article_tag(pk) for pk in importer.article_ids))
+    if derivatives:
+        from django.core.management import call_command
+
+        call_command("build_image_derivatives")
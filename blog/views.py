@@ -1,21 +1,44 @@
-from django.db.models import Q
+from django.db.models import Max
+from django.http import Http404
 from django.shortcuts import render
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView, UpdateView, CreateView
 
-from utils import DataMixin
-from .models import Article, Category
+from utils import DataMixin, KeysetPaginationMixin
+from .models import Article, Category, ARTICLES_COUNT_CACHE_KEY
 from .forms import ArticleCreateForm, ArticleUpdateForm
+from .cache import (
+    CachedPageMixin,
+    ARTICLE_LIST_TAG,
+    CATEGORY_TREE_TAG,
+    article_tag,
+    category_tag,
+    get_category_node,
+)
+from .search import get_search_backend
+
+
+def get_subtree_ids(category):
+    """
+    Функция получения подзапроса id категории и всех ее подкатегорий (узлы того же дерева MPTT с lft
+    в диапазоне [lft, rght] категории)
+    """
+    return Category.objects.filter(
+        tree_id=category.tree_id,
+        lft__range=(category.lft, category.rght),
+    ).values("pk")
 
 
 def gallery_post(request):
-    posts = Article.objects.all()
+    posts = Article.objects.summary()
     return render(request, "blog/gallery_post.html", {"posts": posts})
 
 
+# CachedPageMixin - миксин кэширования страницы целиком для анонимных пользователей
 # DataMixin - миксин с данными для панели навигации
-class ArticlesView(DataMixin, ListView):
+# KeysetPaginationMixin - миксин курсорной пагинации (без COUNT(*) и OFFSET на каждой странице)
+class ArticlesView(CachedPageMixin, DataMixin, KeysetPaginationMixin, ListView):
     """
     Представление: отображение статей в блоге
     """
@@ -30,19 +53,48 @@ class ArticlesView(DataMixin, ListView):
     def get_queryset(self):
         """
         Переопределение метода get_queryset: получаем qs, возвращаем же qs упорядоченный по дате создания поста
-        (от новых к старым), дополнительно отфильтровав по содержимому "поиска"
+        (от новых к старым). При наличии "поиска" - qs результатов поиска, упорядоченный по релевантности
         """
         # Получение значения по ключу search из request.GET (QueryDict)
-        search_query = self.request.GET.get("search", "")
-        # Возврат упорядоченного qs + отфильтрованному по совпадению из search_query
+        search_query = self.request.GET.get("search", "").strip()
+        # Облегченный qs: для карточек статей тело статьи не загружается
+        queryset = Article.objects.summary()
+        # Если задан поисковый запрос - возврат qs, отфильтрованного поисковым бэкендом и упорядоченного по релевантности
+        if search_query:
+            return get_search_backend(queryset.db).search(queryset, search_query)
+        # Иначе возврат упорядоченного qs
+        return queryset.order_by("-time_create")
+
+    def get_keyset_pagination(self):
+        """
+        Курсорная пагинация для ленты статей. Результаты поиска упорядочены по релевантности (их кол-во ограничено
+        BLOG_SEARCH_LIMIT), поэтому для них остается стандартная постраничная пагинация
+        """
+        return not self.request.GET.get("search", "").strip()
+
+    def get_count_cache_key(self):
+        """
+        Ключ кэша общего кол-ва опубликованных статей
+        """
+        return ARTICLES_COUNT_CACHE_KEY.format("all")
+
+    def get_cache_tags(self):
+        """
+        Теги кэша страницы: лента статей и дерево категорий в боковой панели
+        """
+        return [ARTICLE_LIST_TAG, CATEGORY_TREE_TAG]
+
+    def get_last_modified(self):
+        """
+        Время последнего изменения опубликованных статей (MAX по индексу статуса и времени обновления). Для
+        результатов поиска условные запросы не поддерживаются
+        """
+        if self.request.GET.get("search", "").strip():
+            return None
         return (
-            Article.objects.all()
-            .order_by("-time_create")
-            .filter(
-                Q(title__icontains=search_query)
-                | Q(slug__icontains=search_query)
-                | Q(full_description__icontains=search_query)
-            )
+            Article.objects.get_queryset()
+            .filter(status=Article.Status.PUBLISHED)
+            .aggregate(last_modified=Max("time_update"))["last_modified"]
         )
 
     def get_context_data(self, *args, object_list=None, **kwargs):
@@ -60,8 +112,12 @@ class ArticlesView(DataMixin, ListView):
         )  # Возвращение итогового словаря с контекстом
 
 
+# CachedPageMixin - миксин кэширования страницы целиком для анонимных пользователей
 # DataMixin - миксин с данными для панели навигации
-class ArticlesByCategoryView(DataMixin, ListView):
+# KeysetPaginationMixin - миксин курсорной пагинации (без COUNT(*) и OFFSET на каждой странице)
+class ArticlesByCategoryView(
+    CachedPageMixin, DataMixin, KeysetPaginationMixin, ListView
+):
     """
     Представление: отображение статей, сгруппированных по полю "категория"
     """
@@ -75,17 +131,56 @@ class ArticlesByCategoryView(DataMixin, ListView):
 
     def get_queryset(self):
         """
-        Переопределение метода get_queryset: получаем категорию по определенному slug, после чего фильтруем qs статей по
-        категории и возвращаем qs.
+        Переопределение метода get_queryset: получаем категорию по определенному slug (из кэша), после чего фильтруем
+        qs статей по категории и всем ее подкатегориям и возвращаем qs.
         """
-        self.category = Category.objects.get(
-            slug=self.kwargs["slug"]
-        )  # Получение объекта категории по slug
-        queryset = Article.objects.all().filter(
-            category__slug=self.category.slug
-        )  # Фильтр статей по slug категории
+        # Получение категории (id, название, положение в дереве) по slug из кэша
+        self.category = get_category_node(self.kwargs["slug"])
+        if self.category is None:
+            raise Http404("Категория не найдена")
+        # Фильтр статей по категории и ее подкатегориям: в дереве MPTT потомки категории - это узлы того же дерева
+        # с lft в диапазоне [lft, rght] категории (облегченный qs без тела статьи, один запрос с подзапросом)
+        queryset = Article.objects.summary().filter(category__in=self.get_subtree_ids())
         return queryset
 
+    def get_subtree_ids(self):
+        """
+        Подзапрос id категории и всех ее подкатегорий
+        """
+        return get_subtree_ids(self.category)
+
+    def get_count_function(self):
+        """
+        Кол-во опубликованных статей категории вместе с подкатегориями берется из денормализованного счетчика
+        """
+        return lambda: (
+            Category.objects.filter(pk=self.category.pk)
+            .values_list("articles_total", flat=True)
+            .first()
+        )
+
+    def get_cache_tags(self):
+        """
+        Теги кэша страницы: статьи категории и дерево категорий в боковой панели
+        """
+        return [category_tag(self.category.pk), CATEGORY_TREE_TAG]
+
+    def get_last_modified(self):
+        """
+        Время последнего изменения опубликованных статей категории и ее подкатегорий
+        """
+        self.category = get_category_node(self.kwargs["slug"])
+        if self.category is None:
+            return None
+        return (
+            Article.objects.get_queryset()
+            .filter(
+                status=Article.Status.PUBLISHED,
+                category__in=self.get_subtree_ids(),
+            )
+            .aggregate(last_modified=Max("time_update"))["last_modified"]
+        )
+
     def get_context_data(self, **kwargs):
         """
         Функция получения контекста
@@ -101,8 +196,9 @@ class ArticlesByCategoryView(DataMixin, ListView):
         )  # Возвращение итогового словаря с контекстом
 
 
+# CachedPageMixin - миксин кэширования страницы целиком для анонимных пользователей
 # DataMixin - миксин с данными для панели навигации
-class ArticleView(DataMixin, DetailView):
+class ArticleView(CachedPageMixin, DataMixin, DetailView):
     """
     Представление: отображение отдельной статьи
     """
@@ -111,6 +207,33 @@ class ArticleView(DataMixin, DetailView):
     template_name = "blog/article.html"  # Путь к шаблону html ("blog(название приложения)/article.html")
     context_object_name = "article"  # Название переменной из модели Article (вместо стандартного "object_list")
 
+    def get_cache_tags(self):
+        """
+        Теги кэша страницы: сама статья
+        """
+        return [article_tag(self.object.pk)]
+
+    def get_last_modified(self):
+        """
+        Время последнего изменения статьи (запрос только id и времени обновления по уникальному slug)
+        """
+        row = (
+            Article.objects.get_queryset()
+            .filter(slug=self.kwargs["slug"], status=Article.Status.PUBLISHED)
+            .values_list("pk", "time_update")
+            .first()
+        )
+        if row is None:
+            return None
+        self.article_pk, last_modified = row
+        return last_modified
+
+    def get_conditional_tags(self):
+        """
+        Теги страницы для ETag: статья (например, ее превью меняет фоновая задача без изменения времени обновления)
+        """
+        return [article_tag(self.article_pk)]
+
     def get_context_data(self, **kwargs):
         """
         Функция получения контекста
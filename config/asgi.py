@@ -9,8 +9,26 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+
+class AsyncViewsASGIHandler(ASGIHandler):
+    """
+    Обработчик ASGI, разрешающий запросы по маршрутам ASGI_URLCONF (async версии представлений только для чтения).
+    Маршруты WSGI (ROOT_URLCONF) не меняются
+    """
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None and settings.ASGI_URLCONF:
+            request.urlconf = settings.ASGI_URLCONF
+        return request, error_response
+
+
+application = AsyncViewsASGIHandler()
@@ -0,0 +1,28 @@
+"""
+URL configuration for the ASGI entry point (config/asgi.py, setting ASGI_URLCONF).
+
+Те же маршруты, что и в config/urls.py, но страницы блога, галереи и главная страница обслуживаются
+async представлениями (без перехода в поток на каждый запрос). Остальные маршруты (админ-панель, формы
+статей, media) остаются синхронными.
+"""
+
+from django.urls import path, include
+
+from main.views import pageNotFound
+from .urls import urlpatterns as sync_urlpatterns
+
+# Обработка исключения 404
+handler404 = pageNotFound
+
+
+urlpatterns = [
+    path("", include("main.async_urls")),
+    path("gallery/", include("gallery.async_urls", namespace="gallery")),
+    path("blog/", include("blog.async_urls")),
+] + [
+    pattern
+    for pattern in sync_urlpatterns
+    # include() подставляет вместо пути модуля сам модуль
+    if getattr(getattr(pattern, "urlconf_name", None), "__name__", None)
+    not in ("main.urls", "gallery.urls", "blog.urls")
+]
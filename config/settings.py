@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -34,6 +35,8 @@ INSTALLED_APPS = [
     "blog.apps.BlogConfig",
     "main.apps.MainConfig",
     "gallery.apps.GalleryConfig",
+    "jobs.apps.JobsConfig",
+    "mediafiles.apps.MediafilesConfig",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -47,6 +50,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Маршрутизация чтения на реплики БД (включается настройкой DATABASE_REPLICAS); до сессий, чтобы запись
+    # сессии закрепляла клиента за основной БД
+    "main.middleware.replica_routing_middleware",
+    # Очередь записи SQLite (включается настройкой SQLITE_WRITE_LOCK); до сессий, т.к. они тоже пишут в БД
+    "main.middleware.serialized_writes_middleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -57,6 +65,10 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "config.urls"
 
+# Маршруты для запросов через ASGI (config/asgi.py): страницы только для чтения обслуживают async представления.
+# None - те же маршруты, что и для WSGI (ROOT_URLCONF)
+ASGI_URLCONF = "config.asgi_urls"
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -85,9 +97,51 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Постоянные соединения (сек.): PRAGMA и кэш страниц SQLite не создаются заново на каждый запрос
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # Транзакции сразу берут блокировку записи (BEGIN IMMEDIATE): при конфликте писатель ждет
+            # busy_timeout, а не получает "database is locked" при попытке записи внутри начатой транзакции
+            "transaction_mode": "IMMEDIATE",
+        },
     }
 }
 
+# Параметры соединений SQLite (main/sqlite.py, применяются к каждому новому соединению)
+SQLITE_PRAGMAS = {
+    # Журнал WAL: чтение не блокируется записью (режим сохраняется в файле БД)
+    "journal_mode": "wal",
+    # В режиме WAL NORMAL не теряет целостность БД, fsync только при контрольных точках
+    "synchronous": "normal",
+    # Чтение файла БД через mmap (байт)
+    "mmap_size": 256 * 1024 * 1024,
+    # Кэш страниц на соединение (отрицательное значение - в КиБ)
+    "cache_size": -20000,
+    # Ожидание освобождения блокировки записи (мс)
+    "busy_timeout": 5000,
+}
+# Файл блокировки очереди записи (main.middleware.serialized_writes_middleware): небезопасные запросы всех
+# процессов веб-сервера выполняются по одному. None - очередь отключена
+SQLITE_WRITE_LOCK = None
+
+# Реплики БД только для чтения (main/routers.py): алиасы DATABASES, с которых читают публичные страницы.
+# Локально реплику заменяет копия файла SQLite, обновляемая командой sync_replicas, например:
+# DATABASES["replica"] = {
+#     **DATABASES["default"],
+#     "NAME": BASE_DIR / "db.replica.sqlite3",
+#     "TEST": {"MIRROR": "default"},
+# }
+# DATABASE_REPLICAS = ["replica"]
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ["main.routers.PrimaryReplicaRouter"]
+# Приложения, модели которых всегда читаются из основной БД (сессии и пользователи не должны отставать)
+DATABASE_PRIMARY_APPS = ("admin", "auth", "sessions")
+# Пространства имен URL, страницы которых всегда читают основную БД
+DATABASE_PRIMARY_NAMESPACES = ("admin",)
+# Сколько секунд после записи запросы клиента читают основную БД (реплики могут отставать)
+DATABASE_REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -128,6 +182,96 @@ STATIC_ROOT = BASE_DIR / "static"
 
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "/media/"
+# Время кэширования в браузере файлов media, содержимое которых не меняется (имя - хэш содержимого), сек.
+MEDIA_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+# Отдача файлов media (mediafiles.views.serve_media): None - файл отдает Django (FileResponse), "x-accel-redirect" -
+# nginx (заголовок X-Accel-Redirect на internal location MEDIA_ACCEL_REDIRECT_PREFIX с alias на MEDIA_ROOT),
+# "x-sendfile" - Apache mod_xsendfile / lighttpd (заголовок X-Sendfile с путем к файлу)
+MEDIA_SERVE_BACKEND = None
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+# Кол-во уровней подпапок по префиксу хэша для файлов media ("gallery/ab/cd/<хэш>.jpg"), см. mediafiles/storage.py
+MEDIA_SHARD_DEPTH = 2
+
+# Варианты изображений для srcset / <picture> (приложение mediafiles, см. mediafiles/derivatives.py)
+# Ключ - поле изображения "app.Model.field"; форматы перечисляются в порядке предпочтения (AVIF пропускается,
+# если установленный Pillow его не поддерживает, JPEG - запасной вариант для <img>); variants_field - JSON поле
+# модели с описанием вариантов; placeholder_field - поле превью-заглушки (заполняется той же задачей);
+# task - фоновая задача, создающая варианты (для команды build_image_derivatives)
+IMAGE_DERIVATIVES = {
+    "blog.Article.thumbnail": {
+        "widths": (320, 600, 960),
+        "formats": ("avif", "webp", "jpeg"),
+        "variants_field": "thumbnail_variants",
+        "placeholder_field": "thumbnail_placeholder",
+        "task": "blog.tasks.compress_article_thumbnail",
+    },
+    "gallery.Gallery.photo_full": {
+        "widths": (360, 700, 1400),
+        "formats": ("avif", "webp", "jpeg"),
+        "variants_field": "photo_variants",
+        "placeholder_field": "photo_placeholder",
+        "task": "gallery.tasks.compress_gallery_photo",
+    },
+}
+# Качество сжатия вариантов по умолчанию
+IMAGE_DERIVATIVES_QUALITY = 80
+# Папка вариантов в media
+IMAGE_DERIVATIVES_ROOT = "derivatives"
+# Превью-заглушка изображения (LQIP, см. mediafiles/placeholders.py): наибольшая сторона (пикс.) и качество WEBP
+IMAGE_PLACEHOLDER_SIZE = 16
+IMAGE_PLACEHOLDER_QUALITY = 40
+
+# Сжатие загруженных фото (utils.image_compress)
+# Профили сжатия WEBP: quality - качество (0-100), method - трудоемкость сжатия (0 - быстро, 6 - медленно и меньше)
+IMAGE_COMPRESS_PROFILES = {
+    "default": {"quality": 85, "method": 4},
+}
+# Максимальный размер изображения в пикселях (50 Мп); большие изображения отклоняются при загрузке
+IMAGE_COMPRESS_MAX_PIXELS = 50_000_000
+# Размер результата сжатия, до которого он хранится в памяти, а не во временном файле на диске (байт)
+IMAGE_COMPRESS_SPOOL_SIZE = 2 * 1024 * 1024
+
+# Кэш
+# Файловый кэш общий для всех процессов веб-сервера (в отличие от LocMemCache), поэтому инвалидация страниц
+# из одного процесса видна остальным
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
+    }
+}
+
+# Время хранения в кэше готовых страниц блога для анонимных пользователей (сек.)
+BLOG_PAGE_CACHE_TIMEOUT = 60 * 15
+
+# Пространства имен URL, для шаблонов которых контекст категорий блога не формируется
+BLOG_CATEGORIES_CONTEXT_EXCLUDE_NAMESPACES = ("admin",)
+
+# Поиск по блогу
+# Путь к классу поискового бэкенда (None - выбор по типу БД: SQLite FTS5 или icontains)
+BLOG_SEARCH_BACKEND = None
+# Максимальное кол-во результатов поиска
+BLOG_SEARCH_LIMIT = 200
+
+# Ошибка (вместо предупреждения в лог) при обращении шаблона к полю статьи, не загруженному для списка
+BLOG_STRICT_DEFERRED_FIELDS = DEBUG
+
+# Время хранения в кэше общего кол-ва объектов для курсорной пагинации (сек.)
+PAGINATION_COUNT_CACHE_TIMEOUT = 60 * 5
+
+# Фоновые задачи (приложение jobs, обработчик - команда run_jobs)
+# Выполнять задачи сразу после коммита транзакции в текущем процессе (без обработчика)
+JOBS_EAGER = False
+# Кол-во процессов пула обработчика
+JOBS_WORKERS = os.cpu_count() or 1
+# Максимальное кол-во попыток выполнения задачи
+JOBS_MAX_ATTEMPTS = 3
+# Задержка перед повтором задачи после ошибки (сек., умножается на номер попытки)
+JOBS_RETRY_DELAY = 60
+# Время, после которого выполняющаяся задача считается зависшей и возвращается в очередь (сек.)
+JOBS_STALE_TIMEOUT = 60 * 10
+# Интервал опроса очереди обработчиком (сек.)
+JOBS_POLL_INTERVAL = 1
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
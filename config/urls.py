@@ -14,13 +14,13 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 
 from main.views import pageNotFound
-
+from mediafiles.views import serve_media
 
 # Обработка исключения 404
 handler404 = pageNotFound
@@ -34,5 +34,7 @@ urlpatterns = [
     path("blog/", include("blog.urls")),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Отдача media с условными запросами и диапазонами байтов (в production - через фронт-сервер, см. MEDIA_SERVE_BACKEND)
+urlpatterns += [
+    re_path(r"^%s(?P<path>.*)$" % settings.MEDIA_URL.lstrip("/"), serve_media),
+]
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.safestring import mark_safe
 
+from mediafiles.derivatives import get_variant_url
 from .models import Gallery, Category
 
 
@@ -32,8 +33,10 @@ class GalleryAdmin(admin.ModelAdmin):
         Метод, возвращающий эскиз фотографии (поле photo_full)
         """
         # Если поле photo_full объекта модели существует, вернуть html тег img высотой 75px
-        if object.photo_compressed:
-            return mark_safe(f'<img src="{object.photo_full.url}" height=75>')
+        if object.photo_full:
+            # Наименьший вариант фото (если варианты еще не созданы - сжатое фото или оригинал)
+            url = get_variant_url(object.photo_variants, 0) or object.photo_preview.url
+            return mark_safe(f'<img src="{url}" height=75>')
 
     # Определение понятного названия метода, которое будет отображаться в админ-панели
     get_html_photo_full.short_description = "Миниатюра (HD)"
@@ -0,0 +1,15 @@
+from utils import replace_views
+from .async_views import AsyncGalleryCategoryView, AsyncGalleryView, agallery_feed
+from .urls import urlpatterns as sync_urlpatterns
+
+app_name = "gallery"
+
+# Маршруты галереи для ASGI (async представления)
+urlpatterns = replace_views(
+    sync_urlpatterns,
+    {
+        "gallery": AsyncGalleryView.as_view(),
+        "category": AsyncGalleryCategoryView.as_view(),
+        "feed": agallery_feed,
+    },
+)
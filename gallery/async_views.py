@@ -0,0 +1,86 @@
+"""
+Асинхронные версии представлений галереи (для ASGI, см. config/asgi_urls.py). Синхронные версии (gallery/views.py)
+остаются для WSGI
+"""
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+from django.views import View
+
+from .models import Category
+from .views import (
+    GALLERY_PAGE_SIZE,
+    get_feed_category,
+    get_feed_items,
+    get_feed_url,
+    get_photos,
+)
+from utils import DataMixin, InvalidCursor, KeysetPaginationMixin, KeysetPaginator
+
+
+# DataMixin - миксин с данными для панели навигации
+# KeysetPaginationMixin - миксин курсорной пагинации (следующие порции фото подгружает JSON лента)
+class AsyncGalleryView(DataMixin, KeysetPaginationMixin, View):
+    """
+    Представление: отображение галереи (асинхронная версия GalleryView)
+    """
+
+    categories_context = False  # Категории блога в шаблонах галереи не используются
+    paginate_by = GALLERY_PAGE_SIZE  # Настройка пагинации (12 фото на странице)
+    keyset_ordering = ("-id",)  # Сортировка от новых фото к старым
+    template_name = "gallery/gallery_post.html"  # Путь к шаблону html
+
+    def get_category_pk(self):
+        """
+        Метод получения категории фото (None - все фото)
+        """
+        return None
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Метод, выполняющийся при GET запросе
+        """
+        category_pk = self.get_category_pk()
+        paginator, page = await self.apaginate_queryset(
+            get_photos(category_pk), self.paginate_by
+        )
+        context = await self.aget_mixin_context(
+            title="AM | Фото",
+            photos=page.object_list,
+            paginator=paginator,
+            page_obj=page,
+            is_paginated=page.has_other_pages(),
+            feed_url=get_feed_url(page, category_pk),
+            # Категории для панели навигации галереи (тег show_categories)
+            gallery_categories=[category async for category in Category.objects.all()],
+        )
+        return render(request, self.template_name, context=context)
+
+
+class AsyncGalleryCategoryView(AsyncGalleryView):
+    """
+    Представление: отображение фото галереи одной категории (асинхронная версия GalleryCategoryView)
+    """
+
+    def get_category_pk(self):
+        return self.kwargs["pk"]
+
+
+async def agallery_feed(request):
+    """
+    Представление: JSON лента фото галереи (асинхронная версия gallery_feed)
+    """
+    category_pk = get_feed_category(request)
+    paginator = KeysetPaginator(
+        get_photos(category_pk),
+        GALLERY_PAGE_SIZE,
+        ordering=AsyncGalleryView.keyset_ordering,
+    )
+    try:
+        page = await paginator.apage(request.GET.get("cursor"))
+    except InvalidCursor:
+        raise Http404("Некорректный курсор пагинации")
+
+    return JsonResponse(
+        {"items": get_feed_items(page), "next": get_feed_url(page, category_pk)}
+    )
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("gallery", "0002_category_gallery_category"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gallery",
+            name="photo_variants",
+            field=models.JSONField(
+                blank=True, default=dict, editable=False, verbose_name="Варианты фото"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:17
+
+import django.core.validators
+import utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("gallery", "0003_gallery_photo_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="gallery",
+            name="photo_full",
+            field=models.ImageField(
+                upload_to="gallery",
+                validators=[
+                    django.core.validators.FileExtensionValidator(
+                        allowed_extensions=("png", "jpg", "jpeg")
+                    ),
+                    utils.validate_image_pixels,
+                ],
+                verbose_name="Фото (HD)",
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("gallery", "0004_alter_gallery_photo_full"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gallery",
+            name="photo_color",
+            field=models.CharField(
+                blank=True, editable=False, max_length=7, verbose_name="Цвет фото"
+            ),
+        ),
+        migrations.AddField(
+            model_name="gallery",
+            name="photo_height",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Высота фото"
+            ),
+        ),
+        migrations.AddField(
+            model_name="gallery",
+            name="photo_placeholder",
+            field=models.TextField(
+                blank=True, editable=False, verbose_name="Заглушка фото"
+            ),
+        ),
+        migrations.AddField(
+            model_name="gallery",
+            name="photo_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Ширина фото"
+            ),
+        ),
+    ]
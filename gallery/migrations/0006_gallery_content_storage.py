@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:33
+
+import django.core.validators
+import mediafiles.storage
+import utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("gallery", "0005_gallery_photo_info"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="gallery",
+            name="photo_compressed",
+            field=models.ImageField(
+                blank=True,
+                storage=mediafiles.storage.ContentAddressedStorage(),
+                upload_to="gallery",
+                validators=[
+                    django.core.validators.FileExtensionValidator(
+                        allowed_extensions=("png", "jpg", "jpeg")
+                    )
+                ],
+                verbose_name="Фото (сжатое)",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="gallery",
+            name="photo_full",
+            field=models.ImageField(
+                storage=mediafiles.storage.ContentAddressedStorage(),
+                upload_to="gallery",
+                validators=[
+                    django.core.validators.FileExtensionValidator(
+                        allowed_extensions=("png", "jpg", "jpeg")
+                    ),
+                    utils.validate_image_pixels,
+                ],
+                verbose_name="Фото (HD)",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-17 23:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("gallery", "0006_gallery_content_storage"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="gallery",
+            index=models.Index(fields=["category", "-id"], name="gallery_cat_id_idx"),
+        ),
+        migrations.AlterField(
+            model_name="gallery",
+            name="category",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="gallery.category",
+            ),
+        ),
+    ]
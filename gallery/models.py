@@ -6,10 +6,13 @@ from django.core.files import File
 from django.db import models
 from django.urls import reverse
 from django.core.validators import FileExtensionValidator
-from django.db.models.signals import pre_save, pre_delete
+from django.db.models.signals import pre_save, pre_delete, post_save
 from django.dispatch import receiver
 
-from utils import image_compress
+from jobs.queue import enqueue
+from mediafiles.derivatives import release_derivatives
+from mediafiles.storage import content_storage
+from utils import FieldTrackerMixin, validate_image_pixels
 
 
 class Category(models.Model):
@@ -28,7 +31,7 @@ class Category(models.Model):
         ordering = ["title"]
 
 
-class Gallery(models.Model):
+class Gallery(FieldTrackerMixin, models.Model):
     """
     Модель галереи для сайта
     """
@@ -37,9 +40,10 @@ class Gallery(models.Model):
     title = models.CharField(max_length=25, verbose_name="Заголовок")
     # Поле описания. CharField для короткого и точного текстового описания (50 символов)
     content = models.CharField(max_length=50, verbose_name="Описание")
-    # Поле превью (сжатое фото). ImageField для валидации и загрузки изображения
+    # Поле превью (сжатое фото). Заполняется фоновой задачей gallery.tasks.compress_gallery_photo
     photo_compressed = models.ImageField(
         upload_to="gallery",  # Путь сохранения
+        storage=content_storage,  # Имя файла - хэш содержимого (одинаковые файлы хранятся один раз)
         verbose_name="Фото (сжатое)",  # Имя (для админ-панели)
         validators=[
             FileExtensionValidator(allowed_extensions=("png", "jpg", "jpeg"))
@@ -49,22 +53,51 @@ class Gallery(models.Model):
     # Поле фото (в полном разрешении). ImageField для валидации и загрузки изображения
     photo_full = models.ImageField(
         upload_to="gallery",  # Путь сохранения
+        storage=content_storage,  # Имя файла - хэш содержимого (одинаковые файлы хранятся один раз)
         verbose_name="Фото (HD)",  # Имя (для админ-панели)
         validators=[
-            FileExtensionValidator(allowed_extensions=("png", "jpg", "jpeg"))
-        ],  # Валидация допустимых форматов
+            FileExtensionValidator(allowed_extensions=("png", "jpg", "jpeg")),
+            validate_image_pixels,
+        ],  # Валидация допустимых форматов и размера изображения
+    )
+    # Поле вариантов фото разной ширины и формата (для srcset). Заполняется фоновой задачей сжатия фото
+    photo_variants = models.JSONField(
+        default=dict, blank=True, editable=False, verbose_name="Варианты фото"
+    )
+    # Поля размера фото, превью-заглушки (data: URI крошечного WEBP) и преобладающего цвета для резервирования
+    # места в сетке карточек и отображения до загрузки фото. Заполняются той же фоновой задачей
+    photo_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name="Ширина фото"
+    )
+    photo_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name="Высота фото"
+    )
+    photo_placeholder = models.TextField(
+        blank=True, editable=False, verbose_name="Заглушка фото"
+    )
+    photo_color = models.CharField(
+        max_length=7, blank=True, editable=False, verbose_name="Цвет фото"
     )
 
+    # Отдельный индекс внешнего ключа не нужен: category - первое поле индекса gallery_cat_id_idx
     category = models.ForeignKey(
-        Category, on_delete=models.PROTECT, null=True, blank=True
+        Category, on_delete=models.PROTECT, null=True, blank=True, db_index=False
     )
 
+    # Поля, значения которых запоминаются при загрузке объекта (для проверки изменения фото без запроса к БД)
+    tracked_fields = ("photo_full",)
+
     class Meta:
         """
-        Метамодель: сортировка, названия полей в админ-панели
+        Метамодель: сортировка, индексы, названия полей в админ-панели
         """
 
         ordering = ["-pk"]  # Сортировка по id (от новых к старым)
+        indexes = [
+            # Индекс фото категории: фильтр по категории и сортировка по id (курсорная пагинация галереи),
+            # заменяет индекс внешнего ключа
+            models.Index(fields=["category", "-id"], name="gallery_cat_id_idx"),
+        ]
         verbose_name = "Фотографии"  # Имя в единственном числе (для админ-панели)
         verbose_name_plural = (
             "Фотографии"  # Имя во множественном числе (для админ-панели)
@@ -81,33 +114,57 @@ class Gallery(models.Model):
         """
         return self.title
 
+    @property
+    def photo_preview(self):
+        """
+        Свойство, возвращающее фото для отображения: сжатое, если фоновая задача уже выполнена, иначе оригинал
+        """
+        return self.photo_compressed or self.photo_full
+
 
 @receiver(pre_save, sender=Gallery)
 def gallery_photo_update(sender, instance, **kwargs):
     """
-    Функция добавления в объект модели фото и сжатого фото, а также удаления старых, если они есть
+    Функция удаления старых фото (оригинала и сжатого), если загружено новое. Изменение фото определяется
+    по запомненному при загрузке объекта имени файла (без запроса к БД). Сжатие фото выполняется фоновой задачей
+    после сохранения (см. gallery_enqueue_photo_compress)
     """
+    if instance._state.adding:  # Если объект еще не создан - фото нужно сжать
+        instance._photo_changed = True
+        return False
 
-    try:  # Попробовать получить файлы со старыми фото по ключу объекта
-        photo_old = sender.objects.get(pk=instance.pk).photo_full
-        photo_compressed_old = sender.objects.get(pk=instance.pk).photo_compressed
-    except sender.DoesNotExist:  # Если объект еще не создан - передать сжатое фото
-        instance.photo_compressed = image_compress(instance.photo_full, width=700)
+    if not instance.has_changed(
+        "photo_full"
+    ):  # Если фото не менялось - ничего не делаем
         return False
 
-    photo_new = instance.photo_full  # Новое фото = загруженное фото (full)
-    if not photo_old == photo_new:  # Если новое фото отличается от старого
-        instance.photo_compressed = image_compress(instance.photo_full, width=700)
-        if photo_old and os.path.isfile(
-            photo_old.path
-        ):  # Если путь к файлу старого фото (full) существует
-            os.remove(photo_old.path)  # Удалить путь к файлу старого фото (full)
-        if photo_compressed_old and os.path.isfile(
-            photo_compressed_old.path
-        ):  # Если путь к файлу старого фото (full) существует
-            os.remove(
-                photo_compressed_old.path
-            )  # Удалить путь к файлу старого фото (full)
+    photo_old = instance.get_previous_values("photo_full")["photo_full"]
+    # Сжатое фото и варианты заполняет фоновая задача, поэтому их актуальные значения берутся из БД
+    derived_old = (
+        sender.objects.filter(pk=instance.pk)
+        .values("photo_compressed", "photo_variants")
+        .first()
+        or {}
+    )
+    instance._photo_changed = True  # Новое фото нужно сжать
+    instance.photo_compressed = ""  # Сжатая копия старого фото больше не актуальна
+    instance.photo_variants = {}  # Как и варианты старого фото
+    instance.photo_width = instance.photo_height = None  # И сведения о нем
+    instance.photo_placeholder = instance.photo_color = ""
+    release_derivatives(instance, "photo_variants", derived_old.get("photo_variants"))
+    storage = instance.photo_full.storage
+    for name in (photo_old, derived_old.get("photo_compressed")):
+        if name:  # Удалить файлы старого фото (full и сжатого)
+            storage.delete(name)
+
+
+@receiver(post_save, sender=Gallery)
+def gallery_enqueue_photo_compress(sender, instance, **kwargs):
+    """
+    Функция постановки в очередь задачи сжатия нового фото
+    """
+    if instance.__dict__.pop("_photo_changed", False):
+        enqueue("gallery.tasks.compress_gallery_photo", instance.pk)
 
 
 @receiver(pre_delete, sender=Gallery)
@@ -120,3 +177,4 @@ def gallery_delete(sender, instance, **kwargs):
         instance.photo_compressed.delete(False)  # Удалить
     if instance.photo_full:  # Если фото (full) существует
         instance.photo_full.delete(False)  # Удалить
+    release_derivatives(instance, "photo_variants")  # Удалить варианты фото
@@ -0,0 +1,55 @@
+// Бесконечная прокрутка галереи: когда кнопка "Показать еще" появляется в области просмотра,
+// следующая порция фото загружается из JSON ленты (gallery:feed) и добавляется в конец списка
+(function () {
+    var more = document.getElementById("gallery-more");
+    var cards = document.getElementById("gallery-cards");
+    if (!more || !cards || !("IntersectionObserver" in window)) {
+        return;
+    }
+
+    var loading = false;
+
+    function load() {
+        var url = more.dataset.feed;
+        if (loading || !url) {
+            return;
+        }
+        loading = true;
+        fetch(url, {headers: {"Accept": "application/json"}})
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.status);
+                }
+                return response.json();
+            })
+            .then(function (data) {
+                data.items.forEach(function (item) {
+                    cards.insertAdjacentHTML("beforeend", item.html);
+                });
+                loading = false;
+                if (data.next) {
+                    more.dataset.feed = data.next;
+                    more.href = "?" + data.next.split("?")[1];
+                    // Если после добавления фото кнопка все еще видна, наблюдатель не сработает повторно
+                    if (more.getBoundingClientRect().top < window.innerHeight + 600) {
+                        load();
+                    }
+                } else {
+                    observer.disconnect();
+                    more.parentNode.removeChild(more);
+                }
+            })
+            .catch(function () {
+                // При ошибке остается обычная ссылка на следующую страницу
+                loading = false;
+                observer.disconnect();
+            });
+    }
+
+    var observer = new IntersectionObserver(function (entries) {
+        if (entries[0].isIntersecting) {
+            load();
+        }
+    }, {rootMargin: "600px"});
+    observer.observe(more);
+})();
@@ -0,0 +1,59 @@
+"""
+Фоновые задачи галереи (выполняются обработчиком очереди jobs, см. команду run_jobs)
+"""
+
+import os
+
+from django.apps import apps
+
+from mediafiles.derivatives import build_derivatives, release_derivatives
+from mediafiles.placeholders import get_image_info
+from utils import image_compress
+
+
+def compress_gallery_photo(gallery_id):
+    """
+    Задача сжатия фото галереи (конвертация в webp шириной 700px), генерации его вариантов для srcset и сведений
+    о фото (размер, превью-заглушка, цвет). Результаты сохраняются в поля модели, только если фото не изменилось
+    за время выполнения задачи
+    """
+    Gallery = apps.get_model("gallery", "Gallery")
+    gallery = (
+        Gallery.objects.only("photo_full", "photo_compressed", "photo_variants")
+        .filter(pk=gallery_id)
+        .first()
+    )
+    if gallery is None or not gallery.photo_full:
+        return
+
+    source = gallery.photo_full.name
+    with gallery.photo_full.open("rb") as image:
+        compressed = image_compress(image, width=700)
+    variants = build_derivatives(gallery.photo_full, "gallery.Gallery.photo_full")
+    info = get_image_info(gallery.photo_full)
+
+    field = gallery.photo_compressed
+    name = field.storage.save(
+        field.field.generate_filename(gallery, os.path.basename(compressed.name)),
+        compressed,
+    )
+    compressed.close()
+    # Обновление через UPDATE (без сигналов сохранения модели) и только для того же исходного фото
+    updated = Gallery.objects.filter(pk=gallery_id, photo_full=source).update(
+        photo_compressed=name,
+        photo_variants=variants,
+        photo_width=info["width"],
+        photo_height=info["height"],
+        photo_placeholder=info["placeholder"],
+        photo_color=info["color"],
+    )
+    if not updated:
+        # Результаты не записаны - удаляются сжатая копия и варианты (если они не общие с другими объектами)
+        field.storage.delete(name)
+        release_derivatives(gallery, "photo_variants", variants)
+        return
+
+    # Прежняя сжатая копия больше не используется (при том же содержимом имя совпадает, но ссылка на файл
+    # в хранилище добавлена новым сохранением, поэтому прежняя ссылка все равно удаляется)
+    if field:
+        field.storage.delete(field.name)
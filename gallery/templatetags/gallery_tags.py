@@ -7,7 +7,12 @@ register = template.Library()
 def get_categories():
     return Category.objects.all()
 
-@register.inclusion_tag('gallery/nav_bar.html')
-def show_categories():
-    cats = Category.objects.all()
+@register.inclusion_tag('gallery/nav_bar.html', takes_context=True)
+def show_categories(context):
+    """
+    Тег панели категорий галереи (категории из контекста, если их заранее загрузило представление)
+    """
+    cats = context.get("gallery_categories")
+    if cats is None:
+        cats = Category.objects.all()
     return {"cats": cats}
\ No newline at end of file
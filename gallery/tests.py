@@ -1,3 +1,166 @@
-from django.test import TestCase
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from main.testing import TestCase, make_image
+from mediafiles.derivatives import build_derivatives
+from utils import KeysetPaginator
+from .async_views import AsyncGalleryCategoryView, AsyncGalleryView, agallery_feed
+from .models import Category, Gallery
+from .tasks import compress_gallery_photo
+from .views import GALLERY_PAGE_SIZE, GalleryView, get_photos
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN SQLite")
+class PublicQueryPlanTests(TestCase):
+    """
+    Проверка планов запросов страниц галереи: фото выбираются в порядке индекса, без сортировки всей таблицы
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Природа")
+        Gallery.objects.bulk_create(
+            Gallery(title=f"Фото {i}", content="Описание", category=cls.category)
+            for i in range(3)
+        )
+
+    def get_page_queryset(self, category_pk=None):
+        paginator = KeysetPaginator(
+            get_photos(category_pk),
+            GALLERY_PAGE_SIZE,
+            ordering=GalleryView.keyset_ordering,
+        )
+        return paginator.get_page_queryset()[0]
+
+    def test_gallery(self):
+        # Таблица хранится в порядке id (rowid), поэтому первые фото читаются с конца таблицы без сортировки
+        plan = self.get_page_queryset().explain()
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_gallery_category(self):
+        plan = self.get_page_queryset(self.category.pk).explain()
+        self.assertIn("gallery_cat_id_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+class GalleryFeedTests(TestCase):
+    """
+    Проверка JSON ленты галереи: порции фото по курсору и некорректные параметры
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Природа")
+        Gallery.objects.bulk_create(
+            Gallery(
+                title=f"Фото {i}",
+                content="Описание",
+                category=cls.category if i % 2 else None,
+                photo_full=f"gallery/{i}.jpg",
+            )
+            for i in range(GALLERY_PAGE_SIZE + 2)
+        )
+
+    def get_all_ids(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids.extend(item["id"] for item in data["items"])
+            url = data["next"]
+        return ids
+
+    def test_feed(self):
+        ids = self.get_all_ids(reverse("gallery:feed"))
+        self.assertEqual(ids, list(get_photos().values_list("pk", flat=True)))
+
+    def test_feed_category(self):
+        ids = self.get_all_ids(f"{reverse('gallery:feed')}?category={self.category.pk}")
+        self.assertEqual(
+            ids, list(get_photos(self.category.pk).values_list("pk", flat=True))
+        )
+
+    def test_invalid_params(self):
+        for params in ({"cursor": "!!!"}, {"category": "x"}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse("gallery:feed"), params)
+                self.assertEqual(response.status_code, 404)
+
+
+class CompressPhotoTests(TestCase):
+    """
+    Проверка фоновой задачи сжатия фото галереи
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.gallery = Gallery.objects.create(
+            title="Фото", content="Описание", photo_full=make_image()
+        )
+
+    def test_photo_replaced(self):
+        built = {}
+
+        def build_and_replace(image, label):
+            # Фото меняется, пока задача сжимает прежнее
+            built.update(build_derivatives(image, label))
+            Gallery.objects.filter(pk=self.gallery.pk).update(
+                photo_full="gallery/other.jpg"
+            )
+            return built
+
+        with mock.patch("gallery.tasks.build_derivatives", build_and_replace):
+            with self.captureOnCommitCallbacks(execute=True):
+                compress_gallery_photo(self.gallery.pk)
+        gallery = Gallery.objects.get(pk=self.gallery.pk)
+        self.assertFalse(gallery.photo_compressed)
+        self.assertEqual(gallery.photo_variants, {})
+        names = [name for items in built["formats"].values() for _, name in items]
+        self.assertTrue(names)
+        for name in names:
+            with self.subTest(name):
+                self.assertFalse(default_storage.exists(name))
+
+
+class AsyncViewsTests(TestCase):
+    """
+    Проверка async версий страниц галереи (маршруты ASGI): содержимое совпадает с синхронными представлениями
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title="Природа")
+        Gallery.objects.bulk_create(
+            Gallery(
+                title=f"Фото {i}",
+                content="Описание",
+                category=cls.category if i % 2 else None,
+                photo_full=f"gallery/{i}.jpg",
+            )
+            for i in range(GALLERY_PAGE_SIZE + 2)
+        )
+
+    async def test_same_content(self):
+        pages = {
+            reverse("gallery:gallery"): AsyncGalleryView,
+            reverse("gallery:category", kwargs={"pk": self.category.pk}): (
+                AsyncGalleryCategoryView
+            ),
+            reverse("gallery:feed"): agallery_feed,
+        }
+        for url, async_view in pages.items():
+            with self.subTest(url):
+                response = await sync_to_async(self.client.get)(url)
+                with override_settings(ROOT_URLCONF="config.asgi_urls"):
+                    async_response = await self.async_client.get(url)
+                    # resolver_match вычисляется при обращении, поэтому проверяется внутри override_settings
+                    view = async_response.resolver_match.func
+                self.assertIs(getattr(view, "view_class", view), async_view)
+                self.assertEqual(async_response.status_code, response.status_code)
+                self.assertEqual(async_response.content, response.content)
@@ -5,5 +5,6 @@ app_name = "gallery"
 
 urlpatterns = [
     path("", GalleryView.as_view(), name="gallery"),
-    path("category/<int:pk>/", get_category, name="category"),
+    path("category/<int:pk>/", GalleryCategoryView.as_view(), name="category"),
+    path("feed/", gallery_feed, name="feed"),
 ]
@@ -1,20 +1,105 @@
-from django.shortcuts import render
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.http import urlencode
 from django.views.generic import ListView
 
 from .models import *
-from utils import DataMixin
+from mediafiles.derivatives import get_srcset
+from utils import DataMixin, InvalidCursor, KeysetPaginationMixin, KeysetPaginator
+
+# Кол-во фото на странице галереи и в одной порции JSON ленты
+GALLERY_PAGE_SIZE = 12
+
+
+def get_photos(category_pk=None):
+    """
+    Функция получения qs фото галереи (только поля, нужные карточке фото) с фильтром по категории
+    """
+    queryset = Gallery.objects.only(
+        "id",
+        "title",
+        "content",
+        "photo_full",
+        "photo_compressed",
+        "photo_variants",
+        "photo_width",
+        "photo_height",
+        "photo_placeholder",
+        "photo_color",
+    )
+    if category_pk is not None:
+        queryset = queryset.filter(category_id=category_pk)
+    return queryset
+
+
+def get_feed_url(page, category_pk=None):
+    """
+    Функция формирования URL JSON ленты со следующей порцией фото (None - фото больше нет)
+    """
+    if not page.has_next():
+        return None
+    params = {"cursor": page.next_cursor}
+    if category_pk is not None:
+        params["category"] = category_pk
+    return f"{reverse('gallery:feed')}?{urlencode(params)}"
+
+
+def get_feed_category(request):
+    """
+    Функция получения категории JSON ленты из request.GET (None - все фото)
+    """
+    category_pk = request.GET.get("category")
+    if category_pk is not None and not category_pk.isdigit():
+        raise Http404("Некорректная категория")
+    return category_pk
+
+
+def get_feed_items(page):
+    """
+    Функция формирования элементов JSON ленты для страницы фото (данные карточки и ее готовый HTML)
+    """
+    items = []
+    for photo in page:
+        variants = photo.photo_variants or {}
+        items.append(
+            {
+                "id": photo.pk,
+                "title": photo.title,
+                "content": photo.content,
+                "url": photo.photo_full.url,
+                "preview": photo.photo_preview.url,
+                "srcset": {
+                    format_name: get_srcset(variants, format_name)
+                    for format_name in variants.get("formats", {})
+                },
+                "width": photo.photo_width,
+                "height": photo.photo_height,
+                "placeholder": photo.photo_placeholder,
+                "color": photo.photo_color,
+                "html": render_to_string("gallery/gallery_card.html", {"p": photo}),
+            }
+        )
+    return items
 
 
 # DataMixin - миксин с данными для панели навигации
-class GalleryView(DataMixin, ListView):
+# KeysetPaginationMixin - миксин курсорной пагинации (следующие порции фото подгружает JSON лента)
+class GalleryView(DataMixin, KeysetPaginationMixin, ListView):
     """
     Представление: отображение галереи
     """
 
-    # paginate_by = 6  # Настройка пагинации (9 фото на странице)
+    categories_context = False  # Категории блога в шаблонах галереи не используются
+    paginate_by = GALLERY_PAGE_SIZE  # Настройка пагинации (12 фото на странице)
+    keyset_ordering = ("-id",)  # Сортировка от новых фото к старым
     model = Gallery  # Указание модели для ListView
     template_name = "gallery/gallery_post.html"  # Путь к шаблону html ("<название приложения>/photos.html")
     context_object_name = "photos"  # Название переменной из модели Gallery (вместо стандартного "object_list")
+    category_pk = None  # Категория фото (None - все фото)
+
+    def get_queryset(self):
+        return get_photos(self.category_pk)
 
     def get_context_data(self, *args, object_list=None, **kwargs):
         """
@@ -24,13 +109,37 @@ class GalleryView(DataMixin, ListView):
             **kwargs
         )  # Получение словаря с контекстом (в т.ч. навигацией из DataMixin)
         c_def = self.get_mixin_context(
-            title="AM | Фото"
-        )  # Добавление ключа title в контекст
+            title="AM | Фото",
+            feed_url=get_feed_url(context["page_obj"], self.category_pk),
+        )  # Добавление ключей title и feed_url (следующая порция фото) в контекст
         return dict(
             list(context.items()) + list(c_def.items())
         )  # Возвращение итогового словаря с контекстом
 
 
-def get_category(request, pk):
-    photos = Gallery.objects.filter(category__pk=pk)
-    return render(request, "gallery/gallery_post.html", {"photos": photos})
+class GalleryCategoryView(GalleryView):
+    """
+    Представление: отображение фото галереи одной категории
+    """
+
+    def get_queryset(self):
+        self.category_pk = self.kwargs["pk"]
+        return super().get_queryset()
+
+
+def gallery_feed(request):
+    """
+    Представление: JSON лента фото галереи (следующая порция по курсору) для бесконечной прокрутки
+    """
+    category_pk = get_feed_category(request)
+    paginator = KeysetPaginator(
+        get_photos(category_pk), GALLERY_PAGE_SIZE, ordering=GalleryView.keyset_ordering
+    )
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor:
+        raise Http404("Некорректный курсор пагинации")
+
+    return JsonResponse(
+        {"items": get_feed_items(page), "next": get_feed_url(page, category_pk)}
+    )
@@ -0,0 +1,42 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Админ-панель фоновых задач
+    """
+
+    # Отображаемые в админ-панели поля модели
+    list_display = (
+        "id",
+        "task",
+        "args",
+        "status",
+        "attempts",
+        "run_after",
+        "time_update",
+    )
+    # Добавление фильтрации по полям
+    list_filter = ("status", "task")
+    # Поля только для чтения (задачи создаются и меняются только очередью)
+    readonly_fields = (
+        "task",
+        "args",
+        "attempts",
+        "error",
+        "time_create",
+        "time_update",
+    )
+    # Добавление "действия" в админ-панели
+    actions = ["retry_jobs"]
+
+    @admin.action(description="Повторить выбранные задачи")
+    def retry_jobs(self, request, queryset):
+        count = queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.PENDING, attempts=0, error="", run_after=timezone.now()
+        )
+        self.message_user(request, f"{count} задач(и) поставлены в очередь")
@@ -0,0 +1,101 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import claim_jobs, release_job, requeue_stale_jobs, run_job
+
+
+def init_worker(settings_module):
+    """
+    Инициализация процесса пула (при запуске процессов через spawn Django нужно настроить заново)
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+
+class Command(BaseCommand):
+    """
+    Команда запуска обработчика фоновых задач: захватывает задачи из очереди в БД и выполняет их в пуле процессов
+    """
+
+    help = "Выполняет фоновые задачи из очереди в пуле процессов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.JOBS_WORKERS,
+            help="Кол-во процессов пула",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить задачи, готовые на момент запуска, и завершиться",
+        )
+
+    def create_pool(self, workers):
+        """
+        Метод создания пула процессов (соединения с БД не должны наследоваться процессами пула)
+        """
+        connections.close_all()
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(os.environ["DJANGO_SETTINGS_MODULE"],),
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Возвращено в очередь зависших задач: {requeued}")
+
+        futures = {}  # Выполняемые задачи: {future: id задачи}
+        pool = self.create_pool(workers)
+        try:
+            while True:
+                # В пуле держим не больше двух задач на процесс, остальные остаются в очереди для других обработчиков
+                free = workers * 2 - len(futures)
+                if free > 0:
+                    for pk in claim_jobs(free):
+                        futures[pool.submit(run_job, pk)] = pk
+
+                if not futures:
+                    if options["once"]:
+                        break
+                    time.sleep(settings.JOBS_POLL_INTERVAL)
+                    continue
+
+                done, _ = wait(
+                    futures,
+                    timeout=settings.JOBS_POLL_INTERVAL,
+                    return_when=FIRST_COMPLETED,
+                )
+                broken = False
+                for future in done:
+                    pk = futures.pop(future)
+                    try:
+                        self.stdout.write(f"Задача {pk} завершена: {future.result()}")
+                    except Exception as error:
+                        # Итог задачи не сохранен (процесс пула аварийно завершился или не передал результат)
+                        status = release_job(pk, error)
+                        self.stderr.write(
+                            f"Сбой выполнения задачи {pk} ({status}): {error!r}"
+                        )
+                        broken = broken or isinstance(error, BrokenProcessPool)
+                if broken:
+                    # Сломанный пул не принимает новые задачи: остальные задачи пула возвращаются в очередь,
+                    # а пул создается заново
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    for pk in futures.values():
+                        release_job(pk, BrokenProcessPool("Пул процессов пересоздан"))
+                    futures.clear()
+                    pool = self.create_pool(workers)
+        finally:
+            pool.shutdown()
@@ -0,0 +1,60 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Модель фоновой задачи. Очередь хранится в БД, задачи выполняет команда run_jobs (пул процессов)
+    """
+
+    class Status(models.TextChoices):
+        """
+        Класс статусов задачи
+        """
+
+        PENDING = ("pending", "В очереди")
+        RUNNING = ("running", "Выполняется")
+        DONE = ("done", "Выполнена")
+        FAILED = ("failed", "Ошибка")
+
+    # Поле задачи. Путь к функции задачи (например, "gallery.tasks.compress_gallery_photo")
+    task = models.CharField(max_length=255, verbose_name="Задача")
+    # Поле аргументов. JSON список позиционных аргументов функции задачи
+    args = models.JSONField(default=list, blank=True, verbose_name="Аргументы")
+    # Поле статуса задачи
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name="Статус",
+    )
+    # Поле кол-ва попыток выполнения
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Попыток")
+    # Поле текста последней ошибки
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    # Поле времени, не раньше которого задачу можно выполнять (для повтора с задержкой)
+    run_after = models.DateTimeField(
+        default=timezone.now, verbose_name="Выполнить после"
+    )
+    # Поле даты создания задачи
+    time_create = models.DateTimeField(
+        auto_now_add=True, verbose_name="Время добавления"
+    )
+    # Поле даты обновления задачи (для выполняющейся задачи - время захвата обработчиком)
+    time_update = models.DateTimeField(auto_now=True, verbose_name="Время обновления")
+
+    class Meta:
+        """
+        Метамодель: сортировка, индексы, названия полей в админ-панели
+        """
+
+        ordering = ["id"]  # Задачи выполняются в порядке добавления
+        indexes = [
+            # Индекс для выборки готовых к выполнению задач
+            models.Index(fields=["status", "run_after"], name="jobs_job_queue_idx"),
+        ]
+        verbose_name = "Задача"  # Имя в единственном числе (для админ-панели)
+        verbose_name_plural = "Задачи"  # Имя во множественном числе (для админ-панели)
+
+    def __str__(self):
+        return f"{self.task}({', '.join(map(str, self.args))})"
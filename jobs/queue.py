@@ -0,0 +1,114 @@
+"""
+Очередь фоновых задач в БД (без внешнего брокера).
+
+Задача - это функция, доступная по пути импорта, и список JSON-сериализуемых аргументов. enqueue() добавляет задачу
+в очередь (в той же транзакции, что и вызывающий код), команда run_jobs захватывает задачи и выполняет их в пуле
+процессов, а при JOBS_EAGER задача выполняется сразу после коммита транзакции в текущем процессе.
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from mediafiles.storage import discard_uncommitted_files
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(task, *args):
+    """
+    Функция добавления задачи в очередь. Одинаковая задача, уже ожидающая выполнения, повторно не добавляется
+    """
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: import_string(task)(*args))
+        return None
+
+    job, _ = Job.objects.get_or_create(
+        task=task, args=list(args), status=Job.Status.PENDING
+    )
+    return job
+
+
+def claim_jobs(limit):
+    """
+    Функция захвата до limit готовых к выполнению задач. Захват - условный UPDATE по статусу, поэтому одну задачу
+    не выполнят два обработчика, даже если запущено несколько команд run_jobs
+    """
+    now = timezone.now()
+    pending = Job.objects.filter(status=Job.Status.PENDING, run_after__lte=now)
+    claimed = []
+    for pk in pending.values_list("pk", flat=True)[:limit]:
+        if pending.filter(pk=pk).update(status=Job.Status.RUNNING, time_update=now):
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale_jobs():
+    """
+    Функция возврата в очередь задач, "зависших" в статусе выполнения (например, после падения обработчика)
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS_STALE_TIMEOUT)
+    return Job.objects.filter(
+        status=Job.Status.RUNNING, time_update__lt=deadline
+    ).update(status=Job.Status.PENDING)
+
+
+def retry_or_fail(job):
+    """
+    Функция возврата задачи после ошибки в очередь с задержкой (пока не исчерпано JOBS_MAX_ATTEMPTS попыток)
+    или отметки ее как завершенной с ошибкой
+    """
+    if job.attempts < settings.JOBS_MAX_ATTEMPTS:
+        job.status = Job.Status.PENDING
+        job.run_after = timezone.now() + timedelta(
+            seconds=settings.JOBS_RETRY_DELAY * job.attempts
+        )
+    else:
+        job.status = Job.Status.FAILED
+
+
+def run_job(pk):
+    """
+    Функция выполнения захваченной задачи (вызывается в процессе пула). При ошибке задача возвращается в очередь
+    с задержкой, пока не исчерпано JOBS_MAX_ATTEMPTS попыток
+    """
+    close_old_connections()
+    # Попытка сохраняется до выполнения: если процесс пула аварийно завершится, задача уже будет учтена как начатая
+    Job.objects.filter(pk=pk).update(attempts=F("attempts") + 1)
+    job = Job.objects.get(pk=pk)
+    try:
+        import_string(job.task)(*job.args)
+    except Exception:
+        job.error = traceback.format_exc()
+        retry_or_fail(job)
+        logger.exception("Ошибка выполнения задачи %s", job)
+    else:
+        job.status = Job.Status.DONE
+        job.error = ""
+    discard_uncommitted_files()  # Файлы, записанные в откаченных транзакциях задачи
+    job.save(update_fields=["status", "attempts", "error", "run_after", "time_update"])
+    return job.status
+
+
+def release_job(pk, error):
+    """
+    Функция обработки задачи, итог которой не сохранил процесс пула (например, процесс аварийно завершился): задача
+    возвращается в очередь или отмечается как завершенная с ошибкой. Попытка засчитывается, только если run_job
+    успел начать задачу, поэтому задачи, ожидавшие в сломанном пуле, просто возвращаются в очередь.
+    Задачи не в статусе выполнения не меняются
+    """
+    job = Job.objects.filter(pk=pk, status=Job.Status.RUNNING).first()
+    if job is None:
+        return None
+    job.error = "".join(traceback.format_exception(error))
+    retry_or_fail(job)
+    logger.error("Сбой процесса пула при выполнении задачи %s: %r", job, error)
+    job.save(update_fields=["status", "attempts", "error", "run_after", "time_update"])
+    return job.status
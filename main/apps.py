@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "main"
+
+    def ready(self):
+        # Настройка каждого нового соединения SQLite (WAL, mmap, busy_timeout и т.д., см. SQLITE_PRAGMAS)
+        from django.db.backends.signals import connection_created
+
+        from .sqlite import configure_connection
+
+        connection_created.connect(configure_connection)
@@ -0,0 +1,6 @@
+from utils import replace_views
+from .async_views import AsyncMainView
+from .urls import urlpatterns as sync_urlpatterns
+
+# Маршруты главной страницы для ASGI (async представление)
+urlpatterns = replace_views(sync_urlpatterns, {"main": AsyncMainView.as_view()})
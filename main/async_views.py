@@ -0,0 +1,26 @@
+from django.shortcuts import render
+from django.views import View
+
+from utils import DataMixin
+
+
+# DataMixin - миксин с данными для панели навигации
+class AsyncMainView(DataMixin, View):
+    """
+    Представление: отображение основной страницы сайта (асинхронная версия MainView для ASGI)
+    """
+
+    categories_context = (
+        False  # Категории блога в шаблоне главной страницы не используются
+    )
+
+    async def get(self, request):
+        """
+        Метод, выполняющийся при GET запросе
+        """
+        context = await self.aget_mixin_context(
+            title="Александр Донцов"
+        )  # Добавление ключа title в контекст (пользователь загружается асинхронно)
+        return render(
+            request, "main/main.html", context=context
+        )  # Рендер шаблона с необходимым контекстом
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    """
+    Команда обновления локальных реплик SQLite (DATABASE_REPLICAS): согласованный снимок основной БД
+    (backup API SQLite, в т.ч. во время записи в режиме WAL) сохраняется во временный файл, который атомарно
+    заменяет файл реплики. Открытые соединения читают прежнюю копию до переподключения (CONN_MAX_AGE)
+    """
+
+    help = "Копирует основную БД SQLite в файлы реплик (DATABASE_REPLICAS)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            action="append",
+            dest="aliases",
+            help="Алиас реплики (по умолчанию - все реплики)",
+        )
+
+    def handle(self, *args, **options):
+        aliases = options["aliases"] or settings.DATABASE_REPLICAS
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError("Основная БД - не SQLite")
+        for alias in aliases:
+            if alias not in settings.DATABASE_REPLICAS:
+                raise CommandError(f"{alias} нет в DATABASE_REPLICAS")
+            if connections[alias].vendor != "sqlite":
+                raise CommandError(f"Реплика {alias} - не SQLite")
+            self.copy(
+                primary.settings_dict["NAME"], connections[alias].settings_dict["NAME"]
+            )
+            self.stdout.write(self.style.SUCCESS(f"{alias}: реплика обновлена"))
+
+    def copy(self, source, target):
+        """
+        Метод копирования файла БД source в target через временный файл
+        """
+        temporary = f"{target}.tmp"
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(temporary)
+        try:
+            src.backup(dst)
+            # Реплика только читается, поэтому ей не нужен журнал WAL (его файлы не переживут замену БД)
+            dst.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            dst.close()
+            src.close()
+        os.replace(temporary, target)
@@ -0,0 +1,101 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.decorators import sync_and_async_middleware
+
+from .routers import ReplicaState, replica_state
+from .sqlite import WriteLock
+
+# Методы запросов, которые не изменяют данные (не сериализуются)
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+# Cookie, закрепляющий чтение клиента за основной БД после записи (см. DATABASE_REPLICA_PIN_SECONDS)
+PRIMARY_PIN_COOKIE = "db_primary"
+
+
+@sync_and_async_middleware
+def serialized_writes_middleware(get_response):
+    """
+    Middleware очереди записи: небезопасные запросы (POST и т.п. - сохранение в админ-панели, создание статьи)
+    выполняются по одному на все процессы веб-сервера (файловая блокировка SQLITE_WRITE_LOCK) и ждут своей
+    очереди вместо ошибки "database is locked". Запросы на чтение не блокируются. Без SQLITE_WRITE_LOCK
+    middleware отключается
+    """
+    if not settings.SQLITE_WRITE_LOCK:
+        raise MiddlewareNotUsed
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            if request.method in SAFE_METHODS:
+                return await get_response(request)
+            lock = WriteLock(settings.SQLITE_WRITE_LOCK)
+            # Ожидание блокировки в отдельном потоке (не в общем потоке синхронного кода: его может занимать
+            # запрос, держащий блокировку)
+            await sync_to_async(lock.acquire, thread_sensitive=False)()
+            try:
+                return await get_response(request)
+            finally:
+                lock.release()
+
+    else:
+
+        def middleware(request):
+            if request.method in SAFE_METHODS:
+                return get_response(request)
+            with WriteLock(settings.SQLITE_WRITE_LOCK):
+                return get_response(request)
+
+    return middleware
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    """
+    Middleware маршрутизации чтения на реплики БД (main.routers.PrimaryReplicaRouter): чтение с реплик разрешается
+    GET / HEAD запросам клиентов без cookie недавней записи. Если запрос что-то записал в БД (в т.ч. сессию) или
+    изменяет данные, клиент получает cookie, и его запросы DATABASE_REPLICA_PIN_SECONDS читают основную БД.
+    Без DATABASE_REPLICAS middleware отключается
+    """
+    if not settings.DATABASE_REPLICAS:
+        raise MiddlewareNotUsed
+
+    def start(request):
+        state = ReplicaState(
+            request,
+            use_replicas=request.method in ("GET", "HEAD")
+            and PRIMARY_PIN_COOKIE not in request.COOKIES,
+        )
+        return state, replica_state.set(state)
+
+    def pin_primary(request, response, state):
+        if state.pinned or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE,
+                "1",
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            state, token = start(request)
+            try:
+                response = await get_response(request)
+            finally:
+                replica_state.reset(token)
+            return pin_primary(request, response, state)
+
+    else:
+
+        def middleware(request):
+            state, token = start(request)
+            try:
+                response = get_response(request)
+            finally:
+                replica_state.reset(token)
+            return pin_primary(request, response, state)
+
+    return middleware
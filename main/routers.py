@@ -0,0 +1,90 @@
+"""
+Маршрутизация запросов к БД между основной БД и репликами только для чтения.
+
+Чтение уходит на реплику (DATABASE_REPLICAS) только внутри обработки веб-запроса, для которого его разрешил
+main.middleware.replica_routing_middleware: GET / HEAD запросы публичных страниц без недавней записи.
+Запись, админ-панель, модели DATABASE_PRIMARY_APPS, транзакции, команды управления и фоновые задачи
+работают с основной БД. После первой записи в запросе остальное чтение этого запроса тоже идет в основную БД
+(чтение своих записей), а следующие запросы клиента - еще DATABASE_REPLICA_PIN_SECONDS (cookie).
+
+Данные, которые сохраняются в кэш с текущими версиями тегов (страницы, дерево категорий), читаются из основной БД
+(primary_reads): реплика может отставать, и устаревшие данные попали бы в кэш под новой версией тега.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Состояние маршрутизации текущего веб-запроса (None - вне запроса: только основная БД)
+replica_state = ContextVar("replica_state", default=None)
+
+
+class ReplicaState:
+    """
+    Класс состояния маршрутизации веб-запроса. Объект общий для потоков, в которых выполняется запрос
+    (sync_to_async копирует контекст, но не сам объект), поэтому запись из любого потока закрепляет основную БД
+    """
+
+    def __init__(self, request, use_replicas):
+        self.request = request
+        self.use_replicas = use_replicas  # Чтение с реплик разрешено
+        self.pinned = False  # В запросе была запись: дальнейшее чтение - из основной БД
+
+    def can_read_replica(self, model):
+        if not self.use_replicas or self.pinned:
+            return False
+        if model._meta.app_label in settings.DATABASE_PRIMARY_APPS:
+            return False
+        match = getattr(self.request, "resolver_match", None)
+        if match is not None and set(match.namespaces) & set(
+            settings.DATABASE_PRIMARY_NAMESPACES
+        ):
+            return False
+        # Внутри транзакции читаются данные, которые она же может изменить
+        return not connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+@contextmanager
+def primary_reads():
+    """
+    Контекстный менеджер чтения только из основной БД внутри веб-запроса (например, для данных, которые сохраняются
+    в кэш). Действует и в async коде: значение ContextVar видно коду, вызванному через sync_to_async
+    """
+    token = replica_state.set(None)
+    try:
+        yield
+    finally:
+        replica_state.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Роутер БД: чтение публичных страниц - со случайной реплики DATABASE_REPLICAS, остальное - основная БД
+    """
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS:
+            return None
+        state = replica_state.get()
+        if state is None or not state.can_read_replica(model):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = replica_state.get()
+        if state is not None:
+            state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной БД, поэтому связи между объектами из разных алиасов допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик повторяет основную БД (копируется вместе с данными)
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
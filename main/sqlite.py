@@ -0,0 +1,100 @@
+"""
+Настройка соединений SQLite для production.
+
+Параметры SQLITE_PRAGMAS применяются к каждому новому соединению (сигнал connection_created): журнал WAL
+(читатели не блокируют писателя и наоборот), synchronous, mmap_size, cache_size и busy_timeout (сколько
+ждать освобождения блокировки записи вместо ошибки "database is locked").
+
+Запись в SQLite всегда выполняется одним писателем. Чтобы одновременные сохранения из разных процессов
+веб-сервера (админ-панель, создание статьи) выполнялись по очереди, а не завершались ошибкой после
+busy_timeout, небезопасные запросы можно сериализовать файловой блокировкой SQLITE_WRITE_LOCK
+(см. main.middleware.serialized_writes_middleware).
+"""
+
+import re
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка действует только внутри процесса
+    fcntl = None
+
+# Допустимые имя и значение PRAGMA (значения подставляются в SQL, параметры PRAGMA не поддерживает)
+PRAGMA_NAME_RE = re.compile(r"^[a-z_]+$")
+PRAGMA_VALUE_RE = re.compile(r"^-?\w+$")
+
+
+def get_pragma_statements(pragmas):
+    """
+    Функция формирования команд PRAGMA из словаря {название: значение}
+    """
+    statements = []
+    for name, value in pragmas.items():
+        value = str(value)
+        if not PRAGMA_NAME_RE.match(name) or not PRAGMA_VALUE_RE.match(value):
+            raise ImproperlyConfigured(
+                f"Некорректный параметр SQLITE_PRAGMAS: {name} = {value}"
+            )
+        statements.append(f"PRAGMA {name} = {value}")
+    return statements
+
+
+def configure_connection(sender, connection, **kwargs):
+    """
+    Приемник сигнала connection_created: применение SQLITE_PRAGMAS к новому соединению SQLite
+    """
+    if connection.vendor != "sqlite":
+        return
+    pragmas = dict(settings.SQLITE_PRAGMAS)
+    if connection.alias in settings.DATABASE_REPLICAS:
+        # Копия БД для чтения (см. команду sync_replicas): журнал не переключается, запись запрещена
+        pragmas.pop("journal_mode", None)
+        pragmas["query_only"] = 1
+    with connection.cursor() as cursor:
+        for statement in get_pragma_statements(pragmas):
+            cursor.execute(statement)
+
+
+class WriteLock:
+    """
+    Класс межпроцессной блокировки записи (flock на файле path). Каждый захват открывает файл заново,
+    поэтому блокировка разделяет и потоки одного процесса. Без fcntl используется блокировка потоков
+    """
+
+    _thread_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def acquire(self):
+        if fcntl is None:
+            self._thread_lock.acquire()
+            return
+        self.file = open(self.path, "a")
+        try:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            self.file.close()
+            self.file = None
+            raise
+
+    def release(self):
+        if fcntl is None:
+            self._thread_lock.release()
+            return
+        try:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
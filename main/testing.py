@@ -0,0 +1,65 @@
+"""
+Общие базовые классы тестов приложений.
+
+Тесты работают с кэшем в памяти процесса (а не с файловым кэшем из настроек) и с временной папкой MEDIA_ROOT,
+поэтому не видят и не меняют кэш и медиафайлы сайта. Кэш очищается перед каждым тестом.
+"""
+
+import io
+import shutil
+import tempfile
+
+from PIL import Image
+from django import test
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+# Кэш тестов
+TEST_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class IsolatedTestMixin:
+    """
+    Класс миксина теста: кэш в памяти процесса и временная папка MEDIA_ROOT на время класса тестов (в т.ч. для
+    данных setUpTestData)
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            CACHES=TEST_CACHES, MEDIA_ROOT=cls.media_root
+        )
+        settings_override.enable()
+        cls.addClassCleanup(settings_override.disable)
+        super().setUpClass()
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+
+class SimpleTestCase(IsolatedTestMixin, test.SimpleTestCase):
+    pass
+
+
+class TestCase(IsolatedTestMixin, test.TestCase):
+    pass
+
+
+class TransactionTestCase(IsolatedTestMixin, test.TransactionTestCase):
+    pass
+
+
+def make_image(
+    name="photo.jpg", size=(1200, 800), color="red", image_format="JPEG", **options
+):
+    """
+    Функция создания загружаемого файла изображения (как из формы) заданного размера, цвета и формата
+    """
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, image_format, **options)
+    content_type = Image.MIME.get(image_format, "application/octet-stream")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=content_type)
@@ -1,3 +1,155 @@
-from django.test import TestCase
+import os
+import threading
+import time
+from unittest import skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from blog.models import Category
+from .middleware import PRIMARY_PIN_COOKIE, replica_routing_middleware
+from .routers import PrimaryReplicaRouter, ReplicaState, primary_reads, replica_state
+from .sqlite import WriteLock, get_pragma_statements
+from .testing import SimpleTestCase, TestCase
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class PrimaryReadsTests(SimpleTestCase):
+    """
+    Проверка чтения из основной БД внутри primary_reads (данные для кэша не читаются с реплики)
+    """
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        state = ReplicaState(RequestFactory().get("/blog/"), use_replicas=True)
+        token = replica_state.set(state)
+        self.addCleanup(replica_state.reset, token)
+
+    def test_primary_reads(self):
+        self.assertEqual(self.router.db_for_read(Category), "replica")
+        with primary_reads():
+            self.assertEqual(self.router.db_for_read(Category), "default")
+        self.assertEqual(self.router.db_for_read(Category), "replica")
+
+    def test_primary_reads_async(self):
+        async def read():
+            with primary_reads():
+                return await sync_to_async(self.router.db_for_read)(Category)
+
+        self.assertEqual(async_to_sync(read)(), "default")
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(SimpleTestCase):
+    """
+    Проверка маршрутизации чтения на реплики: публичные GET запросы читают реплику, запись закрепляет основную БД
+    """
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, write=False):
+        """
+        Выполнение запроса через middleware: представление возвращает БД чтения до и после записи
+        """
+        databases = []
+
+        def view(request):
+            databases.append(self.router.db_for_read(Category))
+            if write:
+                self.router.db_for_write(Category)
+                databases.append(self.router.db_for_read(Category))
+            return HttpResponse()
+
+        response = replica_routing_middleware(view)(request)
+        return databases, response
+
+    def test_read_from_replica(self):
+        databases, response = self.route(self.factory.get("/blog/"))
+        self.assertEqual(databases, ["replica"])
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
+        # Вне веб-запроса - основная БД
+        self.assertEqual(self.router.db_for_read(Category), "default")
+
+    def test_pinned_after_write(self):
+        databases, response = self.route(self.factory.get("/blog/"), write=True)
+        self.assertEqual(databases, ["replica", "default"])
+        self.assertIn(PRIMARY_PIN_COOKIE, response.cookies)
+        # Следующие запросы клиента с cookie читают основную БД
+        request = self.factory.get("/blog/")
+        request.COOKIES[PRIMARY_PIN_COOKIE] = "1"
+        self.assertEqual(self.route(request)[0], ["default"])
+
+    def test_unsafe_method(self):
+        databases, response = self.route(self.factory.post("/blog/"))
+        self.assertEqual(databases, ["default"])
+        self.assertIn(PRIMARY_PIN_COOKIE, response.cookies)
+
+
+@skipUnless(connection.vendor == "sqlite", "Настройка соединений SQLite")
+class SqliteConnectionTests(TestCase):
+    """
+    Проверка настройки новых соединений SQLite (SQLITE_PRAGMAS) и некорректных параметров
+    """
+
+    def get_pragmas(self, alias="default"):
+        # Новое соединение (сигнал connection_created), а не общее соединение теста
+        wrapper = connections.create_connection(alias)
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            pragmas = {}
+            for name in ("synchronous", "cache_size", "busy_timeout", "query_only"):
+                cursor.execute(f"PRAGMA {name}")
+                pragmas[name] = cursor.fetchone()[0]
+        return pragmas
+
+    def test_pragmas_applied(self):
+        self.assertEqual(
+            self.get_pragmas(),
+            {
+                "synchronous": 1,
+                "cache_size": -20000,
+                "busy_timeout": 5000,
+                "query_only": 0,
+            },
+        )
+
+    @override_settings(DATABASE_REPLICAS=["default"])
+    def test_replica_query_only(self):
+        self.assertEqual(self.get_pragmas()["query_only"], 1)
+
+    def test_invalid_pragma(self):
+        for pragmas in ({"busy_timeout": "1; DROP TABLE app_article"}, {"Bad-Name": 1}):
+            with self.subTest(pragmas):
+                with self.assertRaises(ImproperlyConfigured):
+                    get_pragma_statements(pragmas)
+
+
+class WriteLockTests(SimpleTestCase):
+    """
+    Проверка очереди записи: блокировка пропускает писателей по одному (в т.ч. потоки одного процесса)
+    """
+
+    def test_serialized(self):
+        path = os.path.join(self.media_root, "write.lock")
+        events = []
+
+        def write(number):
+            with WriteLock(path):
+                events.append(("start", number))
+                time.sleep(0.05)
+                events.append(("end", number))
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Следующий писатель начинает только после завершения предыдущего
+        self.assertEqual(len(events), 6)
+        for start, end in zip(events[::2], events[1::2]):
+            self.assertEqual((start[0], end[0], start[1]), ("start", "end", end[1]))
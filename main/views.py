@@ -10,6 +10,10 @@ class MainView(DataMixin, View):
     Представление: отображение основной страницы сайта
     """
 
+    categories_context = (
+        False  # Категории блога в шаблоне главной страницы не используются
+    )
+
     def get(self, request):
         """
         Метод, выполняющийся при GET запросе
@@ -0,0 +1,24 @@
+from django.contrib import admin
+
+from .models import Blob
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    """
+    Админ-панель файлов контентно-адресуемого хранилища (только просмотр: ссылки учитывает само хранилище)
+    """
+
+    # Отображаемые в админ-панели поля модели
+    list_display = ("id", "name", "size", "refcount", "time_create")
+    # Поиск по имени файла
+    search_fields = ("name",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
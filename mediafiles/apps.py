@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+
+
+class MediafilesConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "mediafiles"
+    verbose_name = "Медиафайлы"
+
+    def ready(self):
+        # Файлы, записанные в откаченных транзакциях запроса, удаляются после его обработки
+        from django.core.signals import request_finished
+
+        from .storage import discard_uncommitted_files
+
+        request_finished.connect(
+            discard_uncommitted_files, dispatch_uid="discard_uncommitted_files"
+        )
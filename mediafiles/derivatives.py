@@ -0,0 +1,171 @@
+"""
+Производные изображения (варианты фото разной ширины и формата для srcset / <picture>).
+
+Набор ширин и форматов задается для каждого поля изображения в settings.IMAGE_DERIVATIVES. Варианты хранятся
+на диске по ключу из хэша исходного файла и параметров ("derivatives/<хэш[:2]>/<хэш>/<ширина>-<качество>.<формат>"),
+поэтому повторная генерация для того же файла не пересжимает изображения. Описание вариантов (хэш, размер исходника,
+имена файлов по форматам) хранится в JSON поле модели (variants_field в настройках поля).
+"""
+
+import hashlib
+import posixpath
+from io import BytesIO
+
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from utils import check_image_pixels
+
+ORIENTATION_TAG = 0x0112  # EXIF тег ориентации изображения
+
+# Форматы: расширение файла, MIME тип для <source type="..."> и имя формата Pillow
+FORMATS = {
+    "avif": ("avif", "image/avif", "AVIF"),
+    "webp": ("webp", "image/webp", "WEBP"),
+    "jpeg": ("jpg", "image/jpeg", "JPEG"),
+}
+
+
+def get_derivatives_config(label):
+    """
+    Функция получения настроек вариантов поля ("app.Model.field") с отбором форматов, которые поддерживает
+    установленный Pillow (например, AVIF доступен не во всех сборках)
+    """
+    config = settings.IMAGE_DERIVATIVES[label]
+    Image.init()
+    formats = [name for name in config["formats"] if FORMATS[name][2] in Image.SAVE]
+    return {
+        "widths": sorted(config["widths"]),
+        "formats": formats,
+        "quality": config.get("quality", settings.IMAGE_DERIVATIVES_QUALITY),
+    }
+
+
+def get_derivative_name(digest, width, quality, format_name):
+    """
+    Функция формирования имени файла варианта по хэшу исходного файла и параметрам
+    """
+    extension = FORMATS[format_name][0]
+    return posixpath.join(
+        settings.IMAGE_DERIVATIVES_ROOT,
+        digest[:2],
+        digest,
+        f"{width}-{quality}.{extension}",
+    )
+
+
+def build_derivatives(image, label, storage=None):
+    """
+    Функция генерации вариантов изображения image (файл поля модели) по настройкам поля label. Исходник больше
+    целевой ширины не увеличивается. Уже существующие на диске варианты не пересоздаются. Возвращает описание
+    вариантов для JSON поля модели
+    """
+    storage = storage or default_storage
+    config = get_derivatives_config(label)
+
+    # Хэш исходного файла считается по частям, без чтения файла в память целиком
+    sha = hashlib.sha256()
+    with image.open("rb") as file:
+        for chunk in file.chunks():
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    source = None
+    with image.open("rb") as file, Image.open(file) as im:
+        check_image_pixels(im)
+        rotated = has_rotation(im)
+        size = im.size[::-1] if rotated else im.size  # Размер с учетом поворота по EXIF
+        widths = [width for width in config["widths"] if width < size[0]] or [size[0]]
+        variants = {}
+        for format_name in config["formats"]:
+            variants[format_name] = []
+            for width in widths:
+                name = get_derivative_name(
+                    digest, width, config["quality"], format_name
+                )
+                if not storage.exists(name):
+                    if source is None:
+                        # JPEG декодируется сразу в уменьшенном масштабе, но не меньше наибольшего варианта
+                        if im.format == "JPEG":
+                            box = (widths[-1], widths[-1] * size[1] // size[0])
+                            im.draft("RGB", box[::-1] if rotated else box)
+                        source = ImageOps.exif_transpose(im)
+                        source.load()
+                    content = encode_derivative(
+                        source, width, format_name, config["quality"]
+                    )
+                    name = storage.save(name, content)
+                variants[format_name].append([width, name])
+
+    return {"hash": digest, "width": size[0], "height": size[1], "formats": variants}
+
+
+def has_rotation(im):
+    """
+    Функция проверки, нужно ли поворачивать изображение по EXIF (тогда ширина и высота меняются местами)
+    """
+    return im.getexif().get(ORIENTATION_TAG, 1) in (5, 6, 7, 8)
+
+
+def encode_derivative(source, width, format_name, quality):
+    """
+    Функция уменьшения изображения до ширины width и кодирования в формат format_name
+    """
+    height = max(1, round(source.height * width / source.width))
+    im = source.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+    if format_name == "jpeg" and im.mode not in ("RGB", "L"):
+        im = im.convert("RGB")  # JPEG не поддерживает прозрачность
+    buffer = BytesIO()
+    im.save(buffer, format=FORMATS[format_name][2], quality=quality)
+    return ContentFile(buffer.getvalue())
+
+
+def release_derivatives(instance, variants_field, variants=None, storage=None):
+    """
+    Функция удаления файлов вариантов, описанных в JSON поле variants_field объекта (или переданных в variants -
+    например, прежних вариантов при замене фото). Варианты общие для одинаковых исходных файлов, поэтому файлы
+    не удаляются, пока на них ссылается другой объект
+    """
+    storage = storage or default_storage
+    if variants is None:
+        variants = getattr(instance, variants_field)
+    variants = variants or {}
+    digest = variants.get("hash")
+    if not digest:
+        return
+    shared = (
+        type(instance)
+        ._base_manager.filter(**{f"{variants_field}__hash": digest})
+        .exclude(pk=instance.pk)
+        .exists()
+    )
+    if shared:
+        return
+    for items in variants["formats"].values():
+        for _width, name in items:
+            storage.delete(name)
+
+
+def get_srcset(variants, format_name, storage=None):
+    """
+    Функция формирования значения атрибута srcset ("url 320w, url 600w") для формата format_name
+    """
+    storage = storage or default_storage
+    items = (variants or {}).get("formats", {}).get(format_name, [])
+    return ", ".join(f"{storage.url(name)} {width}w" for width, name in items)
+
+
+def get_variant_url(variants, width, format_name="webp", storage=None):
+    """
+    Функция получения URL наименьшего варианта не уже width (или наибольшего из имеющихся). None - вариантов нет
+    """
+    storage = storage or default_storage
+    items = (variants or {}).get("formats", {}).get(format_name)
+    if not items:
+        return None
+    for item_width, name in items:
+        if item_width >= width:
+            return storage.url(name)
+    return storage.url(items[-1][1])
@@ -0,0 +1,38 @@
+from django.apps import apps
+from django.db.models import Q
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.queue import enqueue
+
+
+class Command(BaseCommand):
+    """
+    Команда постановки в очередь задач генерации вариантов изображений (и превью-заглушек) для объектов, у которых
+    их еще нет (например, загруженных до появления вариантов или после изменения настроек IMAGE_DERIVATIVES)
+    """
+
+    help = "Ставит в очередь генерацию вариантов изображений (IMAGE_DERIVATIVES)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Пересоздать варианты для всех объектов, а не только для объектов без вариантов",
+        )
+
+    def handle(self, *args, **options):
+        for label, config in settings.IMAGE_DERIVATIVES.items():
+            app_label, model_name, field_name = label.split(".")
+            model = apps.get_model(app_label, model_name)
+            queryset = model._base_manager.exclude(**{field_name: ""})
+            if not options["all"]:
+                queryset = queryset.filter(
+                    Q(**{config["variants_field"]: {}})
+                    | Q(**{config["placeholder_field"]: ""})
+                )
+            count = 0
+            for pk in queryset.values_list("pk", flat=True).iterator():
+                enqueue(config["task"], pk)
+                count += 1
+            self.stdout.write(self.style.SUCCESS(f"{label}: задач в очереди {count}"))
@@ -0,0 +1,62 @@
+import multiprocessing
+import resource
+import time
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from utils import image_compress
+
+
+def compress_and_measure(path, width, profile, results):
+    """
+    Сжатие файла в отдельном процессе: пиковая память (ru_maxrss) процесса относится только к этому сжатию
+    """
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    with open(path, "rb") as file:
+        compressed = image_compress(File(file, name=path), width=width, profile=profile)
+    results.put(
+        {
+            "seconds": time.perf_counter() - started,
+            "size": compressed.size,
+            "rss_before": before,
+            "rss_peak": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+    )
+    compressed.close()
+
+
+class Command(BaseCommand):
+    """
+    Команда измерения времени и пиковой памяти сжатия изображения (utils.image_compress)
+    """
+
+    help = "Измеряет время и пиковую память (ru_maxrss) сжатия изображения"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к изображению")
+        parser.add_argument(
+            "--width", type=int, default=700, help="Ширина сжатого изображения"
+        )
+        parser.add_argument(
+            "--profile", default="default", help="Профиль из IMAGE_COMPRESS_PROFILES"
+        )
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        process = context.Process(
+            target=compress_and_measure,
+            args=(options["path"], options["width"], options["profile"], results),
+        )
+        process.start()
+        result = results.get()
+        process.join()
+
+        # ru_maxrss в Linux - в килобайтах
+        self.stdout.write(
+            f"Время: {result['seconds']:.2f} с, размер: {result['size'] / 1024:.1f} КБ, "
+            f"пиковая память: {result['rss_peak'] // 1024} МБ "
+            f"(+{(result['rss_peak'] - result['rss_before']) // 1024} МБ на сжатие)"
+        )
@@ -0,0 +1,188 @@
+import os
+import posixpath
+import shutil
+from collections import defaultdict
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Count, F, Value, When
+
+from blog.cache import (
+    ARTICLE_LIST_TAG,
+    CATEGORY_TREE_TAG,
+    invalidate_articles,
+    invalidate_tags,
+)
+from mediafiles.models import Blob
+from mediafiles.references import get_content_fields
+from mediafiles.storage import (
+    CONTENT_NAME_RE,
+    get_content_hash,
+    get_sharded_name,
+    get_sharded_pattern,
+)
+
+
+class Command(BaseCommand):
+    """
+    Команда переноса файлов media в подпапки по префиксу хэша (MEDIA_SHARD_DEPTH). Файлы со старыми именами
+    получают имена из хэша содержимого. Обработка идет порциями: новый файл создается жесткой ссылкой (или копией),
+    имена в БД меняются одним UPDATE на порцию, старый файл удаляется после коммита. Прерванную команду можно
+    запустить повторно - уже перенесенные файлы не выбираются, а созданные ранее ссылки используются повторно
+    """
+
+    help = "Переносит файлы media в подпапки по префиксу хэша (MEDIA_SHARD_DEPTH)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Кол-во файлов в одной порции",
+        )
+
+    def handle(self, *args, **options):
+        for storage, fields in get_content_fields().items():
+            for model, field in fields:
+                moved, missing = self.shard_field(
+                    storage, fields, model, field, options["batch_size"]
+                )
+                label = f"{model._meta.label}.{field.name}"
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"{label}: перенесено файлов {moved}, не найдено {missing}"
+                    )
+                )
+
+    def shard_field(self, storage, fields, model, field, batch_size):
+        """
+        Метод переноса файлов поля порциями (по возрастанию имени, поэтому пропущенные файлы не выбираются снова)
+        """
+        queryset = (
+            model._base_manager.exclude(**{field.attname: ""})
+            .exclude(**{f"{field.attname}__regex": get_sharded_pattern()})
+            .order_by(field.attname)
+            .values_list(field.attname, flat=True)
+            .distinct()
+        )
+        moved = missing = 0
+        last = None
+        while True:
+            batch = queryset
+            if last is not None:
+                batch = batch.filter(**{f"{field.attname}__gt": last})
+            names = list(batch[:batch_size])
+            if not names:
+                return moved, missing
+            last = names[-1]
+
+            renames = {}
+            for name in names:
+                target = self.link_sharded(storage, name)
+                if target is None:
+                    missing += 1
+                else:
+                    renames[name] = target
+            if renames:
+                with transaction.atomic():
+                    articles = self.rename(storage, fields, renames)
+                    transaction.on_commit(
+                        lambda renames=renames: self.remove_sources(storage, renames)
+                    )
+                    # В закэшированных страницах блога остались адреса старых файлов
+                    transaction.on_commit(
+                        lambda articles=articles: self.invalidate_pages(articles)
+                    )
+            moved += len(renames)
+
+    def link_sharded(self, storage, name):
+        """
+        Метод создания файла с новым именем (жесткая ссылка на старый файл или его копия). Возвращает новое имя
+        или None, если файла нет на диске
+        """
+        directory, basename = posixpath.split(name)
+        root, extension = posixpath.splitext(basename)
+        if CONTENT_NAME_RE.search(name):  # Имя уже из хэша, файл читать не нужно
+            digest = root
+        elif storage.exists(name):
+            with storage.open(name, "rb") as file:
+                digest = get_content_hash(File(file))
+        else:
+            return None
+        target = get_sharded_name(directory, digest, extension.lower())
+        # Ссылка создана при прерванном запуске или такой файл уже загружен
+        if storage.exists(target):
+            return target
+        if not storage.exists(name):
+            return None
+        os.makedirs(os.path.dirname(storage.path(target)), exist_ok=True)
+        try:
+            os.link(storage.path(name), storage.path(target))
+        except OSError:
+            # Жесткие ссылки не поддерживаются (например, другая файловая система)
+            shutil.copyfile(storage.path(name), storage.path(target))
+        return target
+
+    def rename(self, storage, fields, renames):
+        """
+        Метод замены имен файлов во всех полях хранилища (один UPDATE на поле) и переноса учета ссылок (Blob).
+        Возвращает пары (id статьи, id категории) статей блога, у которых изменились имена файлов
+        """
+        # Кол-во ссылок на старые имена в полях (для файлов без учета ссылок)
+        references = defaultdict(int)
+        articles = set()
+        for model, field in fields:
+            queryset = model._base_manager.filter(
+                **{f"{field.attname}__in": list(renames)}
+            )
+            if model._meta.label_lower == "blog.article":
+                articles.update(queryset.values_list("pk", "category_id"))
+            for name, count in (
+                queryset.order_by()
+                .values_list(field.attname)
+                .annotate(count=Count("pk"))
+            ):
+                references[name] += count
+            queryset.update(
+                **{
+                    field.attname: Case(
+                        *[
+                            When(**{field.attname: old}, then=Value(new))
+                            for old, new in renames.items()
+                        ],
+                        default=F(field.attname),
+                        output_field=field,
+                    )
+                }
+            )
+
+        for old, new in renames.items():
+            blob = Blob.objects.filter(name=storage.get_key(old)).first()
+            count = blob.refcount if blob else references[old]
+            if blob:
+                blob.delete()
+            if not count:
+                continue
+            if not Blob.objects.filter(name=storage.get_key(new)).update(
+                refcount=F("refcount") + count
+            ):
+                Blob.objects.create(
+                    name=storage.get_key(new), size=storage.size(new), refcount=count
+                )
+        return articles
+
+    def invalidate_pages(self, articles):
+        """
+        Метод инвалидации кэша страниц блога со старыми адресами файлов: лент, страниц статей и их категорий
+        """
+        invalidate_tags(ARTICLE_LIST_TAG, CATEGORY_TREE_TAG)
+        invalidate_articles(articles)
+
+    def remove_sources(self, storage, renames):
+        """
+        Метод удаления старых файлов после коммита (новые имена уже сохранены в БД)
+        """
+        for old in renames:
+            if os.path.lexists(storage.path(old)):
+                os.remove(storage.path(old))
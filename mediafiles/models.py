@@ -0,0 +1,32 @@
+from django.db import models
+
+
+class Blob(models.Model):
+    """
+    Модель файла контентно-адресуемого хранилища (mediafiles.storage.ContentAddressedStorage). Одинаковые файлы
+    хранятся на диске один раз, refcount - кол-во сохранений файла, на которые еще есть ссылки. Файл удаляется
+    с диска, когда удалена последняя ссылка
+    """
+
+    # Поле пути к файлу относительно MEDIA_ROOT ("gallery/<sha256>.jpg")
+    name = models.CharField(max_length=255, unique=True, verbose_name="Файл")
+    # Поле размера файла в байтах
+    size = models.PositiveBigIntegerField(default=0, verbose_name="Размер")
+    # Поле кол-ва ссылок на файл
+    refcount = models.PositiveIntegerField(default=1, verbose_name="Ссылок")
+    # Поле даты первого сохранения файла
+    time_create = models.DateTimeField(
+        auto_now_add=True, verbose_name="Время добавления"
+    )
+
+    class Meta:
+        """
+        Метамодель: сортировка, названия полей в админ-панели
+        """
+
+        ordering = ["-id"]
+        verbose_name = "Файл"  # Имя в единственном числе (для админ-панели)
+        verbose_name_plural = "Файлы"  # Имя во множественном числе (для админ-панели)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,61 @@
+"""
+Сведения об изображении для шаблонов: размер (для резервирования места на странице до загрузки фото),
+крошечное превью (LQIP - WEBP в base64 для data: URI) и преобладающий цвет.
+
+Сведения вычисляются один раз фоновой задачей сжатия фото и хранятся в полях модели, поэтому шаблонам не нужно
+открывать файлы изображений.
+"""
+
+import base64
+from io import BytesIO
+
+from PIL import Image, ImageOps
+from django.conf import settings
+
+from utils import check_image_pixels
+from .derivatives import has_rotation
+
+
+def get_image_info(image):
+    """
+    Функция получения сведений об изображении image (файл поля модели): ширина и высота с учетом поворота по EXIF,
+    превью-заглушка (data: URI) и преобладающий цвет ("#rrggbb"). JPEG декодируется сразу в уменьшенном масштабе
+    """
+    size = settings.IMAGE_PLACEHOLDER_SIZE
+    with image.open("rb") as file, Image.open(file) as im:
+        check_image_pixels(im)
+        width, height = im.size[::-1] if has_rotation(im) else im.size
+        # JPEG декодируется сразу в уменьшенном масштабе (не меньше size), остальные форматы - целиком
+        im.draft("RGB", (size, size))
+        # Палитра и другие режимы приводятся к RGB / RGBA до уменьшения (иначе уменьшение без сглаживания)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if im.has_transparency_data else "RGB")
+        small = ImageOps.exif_transpose(im)
+        small.thumbnail((size, size), Image.LANCZOS, reducing_gap=3.0)
+
+    return {
+        "width": width,
+        "height": height,
+        "placeholder": encode_placeholder(small),
+        "color": get_dominant_color(small),
+    }
+
+
+def encode_placeholder(im):
+    """
+    Функция кодирования уменьшенного изображения в WEBP и формирования data: URI
+    """
+    buffer = BytesIO()
+    im.save(buffer, format="WEBP", quality=settings.IMAGE_PLACEHOLDER_QUALITY)
+    data = base64.b64encode(buffer.getvalue()).decode("ascii")
+    return f"data:image/webp;base64,{data}"
+
+
+def get_dominant_color(im, colors=5):
+    """
+    Функция получения преобладающего цвета изображения: самого частого цвета палитры из colors цветов
+    """
+    palette_image = im.convert("RGB").quantize(colors=colors)
+    _count, index = max(palette_image.getcolors())
+    red, green, blue = palette_image.getpalette()[index * 3 : index * 3 + 3]
+    return f"#{red:02x}{green:02x}{blue:02x}"
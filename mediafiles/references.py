@@ -0,0 +1,74 @@
+"""
+Учет ссылок на файлы контентно-адресуемого хранилища по значениям полей моделей.
+
+Обычно ссылки (mediafiles.Blob) добавляет и убирает само хранилище при сохранении и удалении файла поля. Код,
+который записывает имена файлов в БД в обход полей (импорт bulk_create, перенос файлов), пересчитывает ссылки
+на эти имена по фактическим значениям полей.
+"""
+
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, FileField
+
+from .storage import ContentAddressedStorage
+
+
+def is_content_field(field):
+    """
+    Функция проверки, что поле - поле файла контентно-адресуемого хранилища
+    """
+    return isinstance(field, FileField) and isinstance(
+        field.storage, ContentAddressedStorage
+    )
+
+
+def get_content_fields():
+    """
+    Функция получения полей файлов моделей, хранящихся в контентно-адресуемом хранилище, сгруппированных
+    по хранилищу (одно имя файла может встречаться в разных полях одного хранилища)
+    """
+    groups = defaultdict(list)
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if is_content_field(field):
+                groups[field.storage].append((model, field))
+    return groups
+
+
+def recount_references(storage, names, using="default", chunk_size=500):
+    """
+    Функция пересчета ссылок на файлы names хранилища storage по кол-ву объектов, у которых они записаны в полях.
+    Записи Blob создаются для файлов, которые есть на диске, файлы без ссылок удаляются после коммита
+    """
+    Blob = apps.get_model("mediafiles", "Blob")
+    fields = get_content_fields()[storage]
+    names = sorted(set(names))
+    for start in range(0, len(names), chunk_size):
+        chunk = names[start : start + chunk_size]
+        counts = Counter()
+        for model, field in fields:
+            rows = (
+                model._base_manager.using(using)
+                .filter(**{f"{field.attname}__in": chunk})
+                .order_by()
+                .values_list(field.attname)
+                .annotate(count=Count("pk"))
+            )
+            for name, count in rows:
+                counts[name] += count
+        for name in chunk:
+            blobs = Blob.objects.using(using).filter(name=storage.get_key(name))
+            if not counts[name]:
+                if blobs.delete()[0]:
+                    transaction.on_commit(
+                        lambda name=name: storage.delete_unreferenced(name),
+                        using=using,
+                    )
+            elif not blobs.update(refcount=counts[name]) and storage.exists(name):
+                Blob.objects.using(using).create(
+                    name=storage.get_key(name),
+                    size=storage.size(name),
+                    refcount=counts[name],
+                )
@@ -0,0 +1,212 @@
+"""
+Контентно-адресуемое хранилище медиафайлов.
+
+Файл сохраняется под именем из sha256 его содержимого (в папке, которую задает upload_to поля, с подпапками
+по первым символам хэша - MEDIA_SHARD_DEPTH уровней, чтобы в одной папке не копились десятки тысяч файлов:
+"gallery/ab/cd/abcd...ef.jpg"), поэтому одинаковые загрузки хранятся на диске один раз, а содержимое файла
+никогда не меняется при неизменном имени (такие файлы можно отдавать с Cache-Control: immutable). Кол-во ссылок
+на файл хранится в модели Blob: каждое сохранение добавляет ссылку, каждое удаление убирает одну, файл удаляется
+с диска вместе с последней ссылкой.
+"""
+
+import hashlib
+import posixpath
+import re
+import threading
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+# Имя файла хранилища: sha256 содержимого и расширение исходного файла
+CONTENT_NAME_RE = re.compile(r"(?:^|/)[0-9a-f]{64}(?:\.[0-9a-z]+)?$")
+
+# Ссылки на файлы, сохраненные в еще не закоммиченных транзакциях текущего потока
+_uncommitted = threading.local()
+
+
+def get_uncommitted():
+    """
+    Функция получения незакоммиченных ссылок текущего потока: pending - кол-во ожидающих коммита ссылок
+    по ключу Blob, files - файлы, записанные на диск этими сохранениями ({ключ: (хранилище, имя)})
+    """
+    if not hasattr(_uncommitted, "pending"):
+        _uncommitted.pending = Counter()
+        _uncommitted.files = {}
+    return _uncommitted
+
+
+def discard_uncommitted_files(**kwargs):
+    """
+    Функция удаления файлов, записанных в транзакциях, которые были откачены (ссылка так и не была добавлена
+    после коммита). Вызывается после обработки запроса (сигнал request_finished) и после фоновой задачи.
+    Внутри транзакции ничего не делает: она еще может быть закоммичена
+    """
+    state = get_uncommitted()
+    if not state.pending or transaction.get_connection().in_atomic_block:
+        return
+    files = {key: state.files[key] for key in state.pending if key in state.files}
+    state.pending.clear()
+    state.files.clear()
+    if not files:
+        return
+    Blob = apps.get_model("mediafiles", "Blob")
+    # Файл мог получить ссылку из другого процесса
+    referenced = set(
+        Blob.objects.filter(name__in=list(files)).values_list("name", flat=True)
+    )
+    for key, (storage, name) in files.items():
+        if key not in referenced:
+            FileSystemStorage.delete(storage, name)
+
+
+def get_content_hash(content):
+    """
+    Функция получения sha256 содержимого файла (читается по частям)
+    """
+    sha = hashlib.sha256()
+    for chunk in content.chunks():
+        sha.update(chunk)
+    content.seek(0)
+    return sha.hexdigest()
+
+
+def get_sharded_name(directory, digest, extension):
+    """
+    Функция формирования имени файла из хэша с подпапками по его префиксу ("<папка>/ab/cd/<хэш><расширение>")
+    """
+    shards = [digest[i * 2 : i * 2 + 2] for i in range(settings.MEDIA_SHARD_DEPTH)]
+    return posixpath.join(directory, *shards, digest + extension)
+
+
+def get_sharded_pattern():
+    """
+    Функция получения регулярного выражения имени файла в подпапках по префиксу хэша (в т.ч. для фильтра в БД)
+    """
+    return r"(?:^|/)(?:[0-9a-f]{2}/){%d}[0-9a-f]{64}(?:\.[0-9a-z]+)?$" % (
+        settings.MEDIA_SHARD_DEPTH
+    )
+
+
+def is_immutable_name(name):
+    """
+    Функция проверки, что содержимое файла media (путь относительно MEDIA_ROOT) не меняется при неизменном имени:
+    имя - хэш содержимого, либо это вариант изображения из IMAGE_DERIVATIVES_ROOT (имя из хэша исходника)
+    """
+    name = name.replace("\\", "/")
+    derivatives_root = settings.IMAGE_DERIVATIVES_ROOT.strip("/") + "/"
+    return bool(CONTENT_NAME_RE.search(name)) or name.startswith(derivatives_root)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Класс хранилища файлов с именами по хэшу содержимого и подсчетом ссылок (модель mediafiles.Blob)
+    """
+
+    # Путь location хранилища относительно MEDIA_ROOT (для ключа Blob, если хранилище не в корне media)
+    key_prefix = ""
+
+    def __init__(self, **kwargs):
+        # Файл с тем же именем - файл с тем же содержимым, поэтому альтернативное имя ему не нужно
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def get_key(self, name):
+        """
+        Метод получения ключа Blob для файла: путь относительно MEDIA_ROOT
+        """
+        return posixpath.join(self.key_prefix, name) if self.key_prefix else name
+
+    def get_content_name(self, name, content):
+        """
+        Метод формирования имени файла по хэшу содержимого: папка из name (upload_to поля) и исходное расширение
+        """
+        directory, basename = posixpath.split(name.replace("\\", "/"))
+        extension = posixpath.splitext(basename)[1].lower()
+        return get_sharded_name(directory, get_content_hash(content), extension)
+
+    def _save(self, name, content):
+        name = self.get_content_name(name, content)
+        key = self.get_key(name)
+        state = get_uncommitted()
+        if not self.exists(name):  # Такой же файл уже сохранен - повторно не пишется
+            name = super()._save(name, content)
+            state.files[key] = (self, name)
+        # Ссылка учитывается после коммита транзакции сохранения объекта: при откате записи Blob не будет,
+        # а новый файл удалит discard_uncommitted_files
+        state.pending[key] += 1
+        transaction.on_commit(lambda: self.commit_reference(name))
+        return name
+
+    def commit_reference(self, name):
+        """
+        Метод добавления ссылки после коммита (если ссылку не отменило удаление в той же транзакции)
+        """
+        state = get_uncommitted()
+        key = self.get_key(name)
+        if state.pending[key] <= 0:
+            return
+        state.pending[key] -= 1
+        if not state.pending[key]:
+            del state.pending[key]
+            state.files.pop(key, None)
+        self.add_reference(name)
+
+    def add_reference(self, name):
+        """
+        Метод добавления ссылки на файл (запись Blob создается при первом сохранении)
+        """
+        Blob = apps.get_model("mediafiles", "Blob")
+        blobs = Blob.objects.filter(name=self.get_key(name))
+        if blobs.update(refcount=F("refcount") + 1):
+            return
+        try:
+            with transaction.atomic():
+                Blob.objects.create(name=self.get_key(name), size=self.size(name))
+        except IntegrityError:  # Тот же файл одновременно сохранен другим процессом
+            blobs.update(refcount=F("refcount") + 1)
+
+    def delete(self, name):
+        """
+        Метод удаления ссылки на файл. Файл удаляется с диска (после коммита транзакции), только если ссылок
+        на него больше нет. Ссылка, еще ожидающая коммита (файл сохранен в этой же транзакции), просто
+        отменяется. Файлы этого хранилища без записи Blob (например, перенесенные импортом) не удаляются,
+        файлы со старыми (не контентными) именами удаляются как обычно
+        """
+        self.path(
+            name
+        )  # Путь за пределами хранилища - SuspiciousFileOperation сразу, а не после коммита
+        state = get_uncommitted()
+        key = self.get_key(name)
+        if state.pending[key] > 0:
+            state.pending[key] -= 1
+            transaction.on_commit(lambda: self.delete_unreferenced(name))
+            return
+        Blob = apps.get_model("mediafiles", "Blob")
+        blobs = Blob.objects.filter(name=key)
+        if blobs.filter(refcount__gt=1).update(refcount=F("refcount") - 1):
+            return
+        if not blobs.filter(refcount__lte=1).delete()[0]:
+            # Ссылка добавлена другим процессом между запросами
+            if blobs.update(refcount=F("refcount") - 1):
+                return
+            if CONTENT_NAME_RE.search(name):
+                return
+        transaction.on_commit(lambda: self.delete_unreferenced(name))
+
+    def delete_unreferenced(self, name):
+        """
+        Метод удаления файла с диска, если на него так и не появилось новых ссылок (в т.ч. ожидающих коммита)
+        """
+        if get_uncommitted().pending[self.get_key(name)] > 0:
+            return
+        Blob = apps.get_model("mediafiles", "Blob")
+        if not Blob.objects.filter(name=self.get_key(name)).exists():
+            super().delete(name)
+
+
+# Хранилище загружаемых изображений моделей (превью статей, фото галереи)
+content_storage = ContentAddressedStorage()
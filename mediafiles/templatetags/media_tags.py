@@ -0,0 +1,60 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+
+from mediafiles.derivatives import FORMATS, get_srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(image, variants, sizes="100vw", placeholder="", color="", **attrs):
+    """
+    Тег, формирующий <picture> с вариантами изображения: <source> для каждого формата (AVIF, WEBP) и <img> с JPEG
+    вариантами в srcset. Пока варианты не созданы, выводится <img> с исходным изображением image.
+    placeholder (data: URI превью-заглушки) и color (преобладающий цвет) выводятся фоном <img> до загрузки фото,
+    атрибуты width / height резервируют место под изображение. Атрибуты со значением None не выводятся.
+    Пример: {% picture a.thumbnail_preview a.thumbnail_variants sizes="(min-width: 768px) 350px, 100vw" alt=a.title %}
+    """
+    attrs = {name: value for name, value in attrs.items() if value is not None}
+    if placeholder or color:
+        attrs["style"] = get_placeholder_style(placeholder, color, attrs.get("style"))
+    if not (variants or {}).get("formats"):
+        return format_html('<img src="{}"{}>', image.url, flatatt(attrs))
+
+    sources = [
+        (FORMATS[format_name][1], get_srcset(variants, format_name), sizes)
+        for format_name in variants["formats"]
+        if format_name != "jpeg"
+    ]
+    srcset = get_srcset(variants, "jpeg")
+    img_attrs = {"width": variants["width"], "height": variants["height"], **attrs}
+    if srcset:
+        img_attrs.update(srcset=srcset, sizes=sizes)
+    return format_html(
+        '<picture>{}<img src="{}"{}></picture>',
+        format_html_join("", '<source type="{}" srcset="{}" sizes="{}">', sources),
+        image.url,
+        flatatt(img_attrs),
+    )
+
+
+def get_placeholder_style(placeholder, color, style=None):
+    """
+    Функция формирования атрибута style с фоном-заглушкой (превью и / или цвет) для <img>
+    """
+    background = " ".join(
+        part for part in (color, f'url("{placeholder}")' if placeholder else "") if part
+    )
+    rules = [f"background: {background} center / cover no-repeat"]
+    if style:
+        rules.append(style)
+    return "; ".join(rules)
+
+
+@register.filter
+def srcset(variants, format_name="webp"):
+    """
+    Фильтр, возвращающий значение атрибута srcset для формата: <img srcset="{{ p.photo_variants|srcset:'webp' }}">
+    """
+    return get_srcset(variants, format_name)
@@ -0,0 +1,348 @@
+import base64
+import hashlib
+import io
+import shutil
+import tempfile
+
+from PIL import Image
+from django.conf import settings
+from django.core.management import call_command
+from django.core.files.storage import FileSystemStorage
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.http import Http404
+from django.test import RequestFactory, override_settings
+
+from blog.models import Article, Category
+from gallery.models import Gallery
+from main.testing import SimpleTestCase, TestCase, TransactionTestCase, make_image
+from .derivatives import ORIENTATION_TAG
+from .models import Blob
+from .placeholders import get_image_info
+from .references import recount_references
+from .storage import (
+    ContentAddressedStorage,
+    content_storage,
+    discard_uncommitted_files,
+    get_sharded_name,
+)
+from .views import serve_media
+
+
+class StorageTestMixin:
+    """
+    Миксин тестов хранилища: отдельная временная папка MEDIA_ROOT для каждого теста (тесты проверяют появление
+    и удаление файлов) и отдельный объект хранилища
+    """
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = ContentAddressedStorage()
+
+    def get_refcount(self, name):
+        blob = Blob.objects.filter(name=name).first()
+        return blob.refcount if blob else 0
+
+
+class ContentAddressedStorageTests(StorageTestMixin, TestCase):
+    """
+    Проверка подсчета ссылок на файлы контентно-адресуемого хранилища
+    """
+
+    def save(self, content=b"photo"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.storage.save("gallery/photo.jpg", ContentFile(content))
+
+    def delete(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+
+    def test_same_content_saved_once(self):
+        first = self.save()
+        second = self.save()
+        self.assertEqual(first, second)
+        self.assertRegex(first, r"^gallery/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        self.assertEqual(self.get_refcount(first), 2)
+        self.assertNotEqual(self.save(b"other"), first)
+
+    def test_delete_reference(self):
+        name = self.save()
+        self.save()
+        self.delete(name)
+        # Осталась одна ссылка - файл не удаляется
+        self.assertEqual(self.get_refcount(name), 1)
+        self.assertTrue(self.storage.exists(name))
+        self.delete(name)
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+        self.assertFalse(self.storage.exists(name))
+
+    def test_reference_added_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            name = self.storage.save("gallery/photo.jpg", ContentFile(b"photo"))
+            self.assertEqual(self.get_refcount(name), 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get_refcount(name), 1)
+
+    def test_save_and_delete_in_one_transaction(self):
+        name = self.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            # Новая ссылка отменена удалением до коммита
+            self.storage.save("gallery/photo.jpg", ContentFile(b"photo"))
+            self.storage.delete(name)
+        self.assertEqual(self.get_refcount(name), 1)
+        self.assertTrue(self.storage.exists(name))
+
+    def test_delete_content_file_without_blob(self):
+        # Файл с именем из хэша без учета ссылок (например, перенесен импортом) не удаляется
+        name = self.save()
+        Blob.objects.filter(name=name).delete()
+        self.delete(name)
+        self.assertTrue(self.storage.exists(name))
+
+
+class RolledBackSaveTests(StorageTestMixin, TransactionTestCase):
+    """
+    Проверка удаления файлов, записанных в откаченной транзакции
+    """
+
+    def save_and_rollback(self, content):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                name = self.storage.save("gallery/photo.jpg", ContentFile(content))
+                raise RuntimeError
+        return name
+
+    def test_new_file_removed(self):
+        name = self.save_and_rollback(b"photo")
+        self.assertTrue(self.storage.exists(name))
+        discard_uncommitted_files()
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+
+    def test_referenced_file_kept(self):
+        name = self.storage.save("gallery/photo.jpg", ContentFile(b"photo"))
+        self.assertEqual(self.get_refcount(name), 1)
+        self.save_and_rollback(b"photo")
+        discard_uncommitted_files()
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.get_refcount(name), 1)
+
+    def test_request_finished(self):
+        name = self.save_and_rollback(b"photo")
+        # Ответ любого запроса вызывает request_finished
+        self.client.get("/robots-missing/")
+        self.assertFalse(self.storage.exists(name))
+
+
+class RecountReferencesTests(StorageTestMixin, TestCase):
+    """
+    Проверка пересчета ссылок на файлы, записанные в поля в обход хранилища (например, импортом)
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.storage = content_storage
+        with self.captureOnCommitCallbacks(execute=True):
+            self.name = self.storage.save("blog/thumbnails/a.jpg", ContentFile(b"a"))
+        Blob.objects.all().delete()
+        category = Category.objects.create(title="Python", slug="python")
+        self.articles = Article.objects.bulk_create(
+            Article(
+                title=f"Статья {i}",
+                slug=f"statya-{i}",
+                short_description="Описание",
+                full_description="Текст",
+                category=category,
+                thumbnail=self.name,
+            )
+            for i in range(2)
+        )
+
+    def recount(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recount_references(self.storage, [self.name, "blog/thumbnails/missing.jpg"])
+
+    def test_recount(self):
+        self.recount()
+        self.assertEqual(self.get_refcount(self.name), 2)
+        self.assertFalse(
+            Blob.objects.filter(name="blog/thumbnails/missing.jpg").exists()
+        )
+        Article.objects.get_queryset().filter(pk=self.articles[0].pk).update(
+            thumbnail=""
+        )
+        self.recount()
+        self.assertEqual(self.get_refcount(self.name), 1)
+
+    def test_unreferenced_file_removed(self):
+        self.recount()
+        Article.objects.get_queryset().update(thumbnail="")
+        self.recount()
+        self.assertFalse(Blob.objects.filter(name=self.name).exists())
+        self.assertFalse(self.storage.exists(self.name))
+
+
+@override_settings(MEDIA_SERVE_BACKEND=None)
+class ServeMediaTests(StorageTestMixin, SimpleTestCase):
+    """
+    Проверка отдачи media: условные запросы (ETag / If-None-Match) и диапазоны байтов (Range / If-Range)
+    """
+
+    content = b"0123456789"
+
+    def setUp(self):
+        super().setUp()
+        self.name = "gallery/photo.jpg"
+        FileSystemStorage().save(self.name, ContentFile(self.content))
+
+    def get(self, name=None, **headers):
+        request = RequestFactory().get("/media/", headers=headers)
+        response = serve_media(request, name or self.name)
+        self.addCleanup(response.close)  # FileResponse держит файл открытым
+        return response
+
+    def get_body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(self.get_body(response), self.content)
+        self.assertNotIn("immutable", response.get("Cache-Control", ""))
+
+    def test_content_name(self):
+        digest = "a" * 64
+        name = get_sharded_name("gallery", digest, ".jpg")
+        FileSystemStorage().save(name, ContentFile(self.content))
+        response = self.get(name)
+        self.assertEqual(response["ETag"], f'"{digest}"')
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_if_none_match(self):
+        etag = self.get()["ETag"]
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(self.get(if_none_match='"other"').status_code, 200)
+
+    def test_range(self):
+        cases = {
+            "bytes=0-3": (0, 3),
+            "bytes=5-": (5, 9),
+            "bytes=-3": (7, 9),
+            "bytes=8-100": (8, 9),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(header):
+                response = self.get(range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/10")
+                self.assertEqual(response["Content-Length"], str(end - start + 1))
+                self.assertEqual(self.get_body(response), self.content[start : end + 1])
+
+    def test_unsatisfiable_range(self):
+        for header in ("bytes=10-", "bytes=5-2"):
+            with self.subTest(header):
+                response = self.get(range=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response["Content-Range"], "bytes */10")
+
+    def test_ignored_range(self):
+        # Несколько диапазонов и устаревший If-Range - файл отдается целиком
+        etag = self.get()["ETag"]
+        for headers in (
+            {"range": "bytes=0-1,4-5"},
+            {"range": "bytes=0-1", "if_range": '"other"'},
+        ):
+            with self.subTest(headers):
+                self.assertEqual(self.get(**headers).status_code, 200)
+        self.assertEqual(self.get(range="bytes=0-1", if_range=etag).status_code, 206)
+
+    def test_not_found(self):
+        for name in ("gallery/missing.jpg", "../settings.py", "gallery"):
+            with self.subTest(name):
+                with self.assertRaises(Http404):
+                    self.get(name)
+
+    @override_settings(MEDIA_SERVE_BACKEND="x-accel-redirect")
+    def test_accel_redirect(self):
+        response = self.get()
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected-media/gallery/photo.jpg",
+        )
+        self.assertIn("ETag", response)
+
+
+class ImageInfoTests(SimpleTestCase):
+    """
+    Проверка сведений об изображении: размер, превью-заглушка (LQIP) и преобладающий цвет
+    """
+
+    def test_placeholder_and_color(self):
+        image = make_image("photo.png", color=(0, 128, 255), image_format="PNG")
+        info = get_image_info(image)
+        self.assertEqual((info["width"], info["height"]), (1200, 800))
+        self.assertEqual(info["color"], "#0080ff")
+        prefix = "data:image/webp;base64,"
+        self.assertTrue(info["placeholder"].startswith(prefix))
+        data = base64.b64decode(info["placeholder"][len(prefix) :])
+        with Image.open(io.BytesIO(data)) as im:
+            self.assertEqual(im.format, "WEBP")
+            self.assertEqual(max(im.size), settings.IMAGE_PLACEHOLDER_SIZE)
+
+    def test_exif_rotation(self):
+        exif = Image.Exif()
+        exif[ORIENTATION_TAG] = 6  # Поворот на 90°: ширина и высота меняются местами
+        info = get_image_info(make_image(size=(300, 200), exif=exif.tobytes()))
+        self.assertEqual((info["width"], info["height"]), (200, 300))
+
+
+class ShardMediaTests(StorageTestMixin, TestCase):
+    """
+    Проверка переноса файлов со старыми именами в подпапки по префиксу хэша (команда shard_media)
+    """
+
+    content = b"photo"
+
+    def setUp(self):
+        super().setUp()
+        self.name = FileSystemStorage().save(
+            "gallery/old.jpg", ContentFile(self.content)
+        )
+        self.photos = Gallery.objects.bulk_create(
+            Gallery(title=f"Фото {i}", content="Описание", photo_full=name)
+            for i, name in enumerate((self.name, self.name, "gallery/missing.jpg"))
+        )
+
+    def shard(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("shard_media", stdout=io.StringIO())
+
+    def test_shard(self):
+        self.shard()
+        target = get_sharded_name(
+            "gallery", hashlib.sha256(self.content).hexdigest(), ".jpg"
+        )
+        names = [
+            Gallery.objects.get(pk=photo.pk).photo_full.name for photo in self.photos
+        ]
+        self.assertEqual(names, [target, target, "gallery/missing.jpg"])
+        self.assertTrue(content_storage.exists(target))
+        self.assertFalse(content_storage.exists(self.name))
+        # Ссылки перенесены на новое имя по кол-ву объектов с этим файлом
+        self.assertEqual(self.get_refcount(target), 2)
+
+    def test_repeated_run(self):
+        self.shard()
+        self.shard()
+        target = Gallery.objects.get(pk=self.photos[0].pk).photo_full.name
+        self.assertEqual(self.get_refcount(target), 2)
+        self.assertTrue(content_storage.exists(target))
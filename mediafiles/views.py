@@ -0,0 +1,148 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import CONTENT_NAME_RE, is_immutable_name
+
+# Заголовок Range с одним диапазоном байтов ("bytes=0-499", "bytes=500-", "bytes=-500")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Размер порции чтения файла при отдаче диапазона
+CHUNK_SIZE = 64 * 1024
+
+
+def get_etag(path, stat):
+    """
+    Функция получения строгого ETag файла: для файлов с именем из хэша содержимого - сам хэш, для остальных -
+    время изменения и размер файла
+    """
+    if CONTENT_NAME_RE.search(path):
+        return '"%s"' % posixpath.splitext(posixpath.basename(path))[0]
+    return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+
+def get_range(request, etag, last_modified, size):
+    """
+    Функция получения запрошенного диапазона байтов (начало, конец включительно). None - отдать файл целиком
+    (диапазона нет, их несколько, или If-Range не совпал с текущей версией файла). Для недопустимого
+    диапазона вызывается ValueError
+    """
+    header = request.META.get("HTTP_RANGE", "").strip()
+    match = RANGE_RE.match(header)
+    if not match or not any(match.groups()):
+        return None
+    if_range = request.META.get("HTTP_IF_RANGE", "").strip()
+    if (
+        if_range
+        and if_range != etag
+        and parse_http_date_safe(if_range) != last_modified
+    ):
+        return None
+
+    start, end = match.groups()
+    if not start:  # Последние end байтов
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("Недопустимый диапазон")
+    return start, end
+
+
+def read_range(path, start, end):
+    """
+    Генератор чтения диапазона байтов файла порциями
+    """
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Представление: отдача файла из MEDIA_ROOT с условными запросами (ETag / Last-Modified, ответ 304) и диапазонами
+    байтов (Range, ответ 206). Если настроен MEDIA_SERVE_BACKEND, сам файл отдает фронт-сервер (nginx -
+    X-Accel-Redirect, Apache / lighttpd - X-Sendfile), иначе - FileResponse (wsgi.file_wrapper / sendfile сервера
+    приложения). Файлы с именами из хэша содержимого не меняются, поэтому отдаются с Cache-Control: immutable
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Файл не найден")
+    try:
+        stat = os.stat(fullpath)
+    except OSError:
+        raise Http404("Файл не найден")
+    if not os.path.isfile(fullpath):
+        raise Http404("Файл не найден")
+
+    etag = get_etag(path, stat)
+    last_modified = int(stat.st_mtime)
+    # Заголовки, общие для всех ответов (в т.ч. 304)
+    headers = HttpResponse()
+    headers["ETag"] = etag
+    headers["Last-Modified"] = http_date(last_modified)
+    if is_immutable_name(path):
+        patch_cache_control(
+            headers,
+            public=True,
+            max_age=settings.MEDIA_IMMUTABLE_MAX_AGE,
+            immutable=True,
+        )
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=headers
+    )
+    if conditional is not headers:  # 304 Not Modified / 412 Precondition Failed
+        return conditional
+
+    content_type = mimetypes.guess_type(fullpath)[0] or "application/octet-stream"
+    backend = settings.MEDIA_SERVE_BACKEND
+    if backend == "x-accel-redirect":
+        # nginx сам отдает файл из internal location (в т.ч. диапазоны байтов)
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(
+            path
+        )
+    elif backend == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = fullpath
+    else:
+        try:
+            byte_range = get_range(request, etag, last_modified, stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+            return response
+        if byte_range is None:
+            response = FileResponse(open(fullpath, "rb"))
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                read_range(fullpath, start, end),
+                status=206,
+                content_type=content_type,
+            )
+            response["Content-Length"] = end - start + 1
+            response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        response["Accept-Ranges"] = "bytes"
+
+    for header in ("ETag", "Last-Modified", "Cache-Control"):
+        if header in headers:
+            response[header] = headers[header]
+    return response
@@ -1,10 +1,24 @@
-from io import BytesIO
+import base64
+import copy
+import inspect
+import json
+import re
+from datetime import date, datetime
 from PIL import Image
-from config import settings
-from urllib.parse import urljoin
-from django.core.files.base import ContentFile
-from django.core.files.storage import FileSystemStorage
+from django.conf import settings
+from urllib.parse import unquote, urljoin
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Q
+from django.http import Http404
+from django.urls import URLPattern
+from django.utils.functional import cached_property
+from main.routers import primary_reads
+from mediafiles.storage import ContentAddressedStorage
 from django.core.files import File
+from tempfile import SpooledTemporaryFile
 from pytils.translit import slugify
 from uuid import uuid4
 import os
@@ -40,65 +54,630 @@ class DataMixin:
             user_nav.pop(-1)  # Убрать из меню навигации путь для добавления статьи
 
         context["nav"] = user_nav  # Расширяем словарь контекста новым ключом 'nav'
-        context[
-            "article_actions"
-        ] = article_actions  # Расширяем словарь контекста новым ключом 'article_actions'
+        context["article_actions"] = (
+            article_actions  # Расширяем словарь контекста новым ключом 'article_actions'
+        )
 
         return context
 
+    async def aget_mixin_context(self, **kwargs):
+        """
+        Асинхронный метод получения контекста (для async представлений). Шаблон рендерится в цикле событий, где
+        синхронные запросы к БД запрещены, поэтому данные контекст процессоров auth и messages загружаются заранее
+        """
+        # Пользователь загружается асинхронно и подменяет ленивый request.user (его читают навигация и шаблоны)
+        self.request.user = await self.request.auser()
+        # Сообщения, не поместившиеся в cookie, хранятся в сессии
+        if "messages" in self.request.COOKIES:
+            await self.request.session.aitems()
+        return self.get_mixin_context(**kwargs)
+
+
+class InvalidCursor(Exception):
+    """
+    Исключение: некорректный курсор пагинации
+    """
+
+
+class KeysetPage:
+    """
+    Класс страницы курсорной пагинации (повторяет интерфейс django.core.paginator.Page, кроме номеров страниц)
+    """
+
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<KeysetPage: {len(self.object_list)} объектов>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Класс курсорной (keyset) пагинации: страница выбирается условием WHERE по ключу сортировки вместо OFFSET,
+    а общее кол-во объектов не считается на каждой странице, а берется из кэша (count_cache_key)
+    """
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        ordering=("-time_create", "-id"),
+        count_cache_key=None,
+        count_cache_timeout=None,
+        count=None,
+    ):
+        self.object_list = object_list
+        # Функция получения общего кол-ва объектов (например, из денормализованного счетчика) вместо COUNT(*)
+        self.count_function = count
+        self.per_page = int(per_page)
+        # Сортировка должна однозначно определять порядок объектов (последнее поле - уникальное, например id)
+        self.ordering = tuple(ordering)
+        self.count_cache_key = count_cache_key
+        self.count_cache_timeout = (
+            count_cache_timeout
+            if count_cache_timeout is not None
+            else settings.PAGINATION_COUNT_CACHE_TIMEOUT
+        )
+
+    @cached_property
+    def count(self):
+        """
+        Общее кол-во объектов: значение функции count, из кэша, либо COUNT(*) с сохранением результата в кэш
+        """
+        if self.count_function is not None:
+            return self.count_function()
+        if self.count_cache_key is None:
+            return self.object_list.count()
+        count = cache.get(self.count_cache_key)
+        if count is None:
+            # Кол-во сохраняется в кэш, поэтому считается по основной БД, а не по отстающей реплике
+            with primary_reads():
+                count = self.object_list.count()
+            cache.set(self.count_cache_key, count, self.count_cache_timeout)
+        return count
+
+    async def acount(self):
+        """
+        Асинхронное получение общего кол-ва объектов (результат сохраняется в count, шаблон читает его без запроса).
+        Функция count может быть асинхронной
+        """
+        if "count" not in self.__dict__:
+            if self.count_function is not None:
+                count = self.count_function()
+                if inspect.isawaitable(count):
+                    count = await count
+            elif self.count_cache_key is None:
+                count = await self.object_list.acount()
+            else:
+                count = await cache.aget(self.count_cache_key)
+                if count is None:
+                    with primary_reads():
+                        count = await self.object_list.acount()
+                    await cache.aset(
+                        self.count_cache_key, count, self.count_cache_timeout
+                    )
+            self.__dict__["count"] = count
+        return self.count
+
+    def _fields(self, reverse=False):
+        """
+        Метод получения полей сортировки в виде [(название поля, по убыванию), ...]
+        """
+        fields = []
+        for field in self.ordering:
+            descending = field.startswith("-")
+            fields.append((field.lstrip("-"), descending != reverse))
+        return fields
+
+    def encode_cursor(self, obj, direction):
+        """
+        Метод формирования непрозрачного курсора (base64 от значений ключа сортировки объекта)
+        """
+        # Даты сериализуются полностью (DjangoJSONEncoder обрезает микросекунды, что сломало бы сравнение ключей)
+        values = [
+            value.isoformat() if isinstance(value, (datetime, date)) else value
+            for value in (getattr(obj, name) for name, _ in self._fields())
+        ]
+        data = json.dumps([direction, *values], cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """
+        Метод разбора курсора: возвращает направление ("next" / "prev") и значения ключа сортировки
+        """
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            direction, *values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        except (ValueError, TypeError):
+            raise InvalidCursor(cursor)
+        if direction not in ("next", "prev") or len(values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _keyset_filter(self, fields, values):
+        """
+        Метод формирования условия "строго после ключа" для сортировки fields:
+        (a < x) OR (a = x AND b < y) OR ...
+        """
+        condition = Q()
+        for i, (name, descending) in enumerate(fields):
+            lookup = Q(**{f"{name}__{'lt' if descending else 'gt'}": values[i]})
+            for j in range(i):
+                lookup &= Q(**{fields[j][0]: values[j]})
+            condition |= lookup
+        return condition
+
+    def get_page_queryset(self, cursor=None):
+        """
+        Метод получения qs страницы по курсору (на один объект больше размера страницы, чтобы узнать, есть ли
+        следующая страница). Возвращает qs, признак движения назад и значения ключа курсора
+        """
+        direction, values = ("next", None) if not cursor else self.decode_cursor(cursor)
+        backward = direction == "prev"
+        fields = self._fields(reverse=backward)
+
+        queryset = self.object_list.order_by(
+            *(f"-{name}" if descending else name for name, descending in fields)
+        )
+        if values is not None:
+            try:
+                queryset = queryset.filter(self._keyset_filter(fields, values))
+            except (ValidationError, ValueError, TypeError):
+                raise InvalidCursor(cursor)
+        return queryset[: self.per_page + 1], backward, values
+
+    def build_page(self, objects, backward, values):
+        """
+        Метод формирования страницы из загруженных объектов qs страницы
+        """
+        has_more = len(objects) > self.per_page
+        objects = objects[: self.per_page]
+
+        if backward:
+            objects.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return KeysetPage(
+            objects,
+            self,
+            next_cursor=(
+                self.encode_cursor(objects[-1], "next")
+                if has_next and objects
+                else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(objects[0], "prev")
+                if has_previous and objects
+                else None
+            ),
+        )
+
+    def page(self, cursor=None):
+        """
+        Метод получения страницы по курсору (без курсора - первая страница)
+        """
+        queryset, backward, values = self.get_page_queryset(cursor)
+        return self.build_page(list(queryset), backward, values)
+
+    async def apage(self, cursor=None):
+        """
+        Асинхронный метод получения страницы по курсору (для async представлений)
+        """
+        queryset, backward, values = self.get_page_queryset(cursor)
+        return self.build_page([obj async for obj in queryset], backward, values)
+
+
+class KeysetPaginationMixin:
+    """
+    Класс миксина курсорной пагинации для ListView. Номер страницы заменяется курсором из request.GET
+    """
+
+    keyset_ordering = (
+        "-time_create",
+        "-id",
+    )  # Ключ сортировки (последнее поле - уникальное)
+    cursor_kwarg = "cursor"  # Название параметра курсора в URL
+
+    def get_keyset_pagination(self):
+        """
+        Метод, определяющий, используется ли курсорная пагинация (иначе - стандартная постраничная)
+        """
+        return True
+
+    def get_count_cache_key(self):
+        """
+        Метод получения ключа кэша для общего кол-ва объектов (None - кол-во считается на каждой странице)
+        """
+        return None
+
+    def get_count_function(self):
+        """
+        Метод получения функции, возвращающей общее кол-во объектов без COUNT(*) (None - используется кэш / COUNT)
+        """
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.get_keyset_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(
+            queryset,
+            page_size,
+            ordering=self.keyset_ordering,
+            count_cache_key=self.get_count_cache_key(),
+            count=self.get_count_function(),
+        )
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404("Некорректный курсор пагинации")
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """
+        Асинхронный метод курсорной пагинации (для async представлений). Общее кол-во объектов загружается заранее,
+        только если оно выводится (страниц больше одной)
+        """
+        paginator = KeysetPaginator(
+            queryset,
+            page_size,
+            ordering=self.keyset_ordering,
+            count_cache_key=self.get_count_cache_key(),
+            count=self.get_count_function(),
+        )
+        try:
+            page = await paginator.apage(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404("Некорректный курсор пагинации")
+        if page.has_other_pages():
+            await paginator.acount()
+        return paginator, page
+
 
-def image_compress(image, width):
+class FieldTrackerMixin:
     """
-    Метод для сжатия загруженного фото и конвертации в webp
+    Класс миксина модели, запоминающего значения полей tracked_fields при загрузке объекта из БД (и после сохранения
+    или refresh_from_db). Позволяет узнать, изменилось ли поле (например, загружено ли новое фото), без запроса к БД.
+    Для файловых полей запоминается имя файла
     """
+
+    tracked_fields = ()  # Отслеживаемые поля
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_tracked_fields()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None:
+            self._remember_tracked_fields()
+        else:
+            # Загрузка отложенного поля (или обновление части полей) не должна затирать запомненные значения
+            # остальных полей: иначе изменение, сделанное до обращения к отложенному полю, будет потеряно
+            fields = set(fields)
+            self._remember_tracked_fields(
+                name
+                for name in self.tracked_fields
+                if name in fields or self._meta.get_field(name).attname in fields
+            )
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_tracked_fields()
+
+    def _get_tracked_value(self, name):
+        """
+        Метод получения текущего значения отслеживаемого поля (для файлового поля - имя файла)
+        """
+        field = self._meta.get_field(name)
+        value = getattr(self, field.attname)
+        if isinstance(field, models.FileField):
+            return (value.name or "") if value is not None else ""
+        return copy.deepcopy(value)
+
+    def _remember_tracked_fields(self, names=None):
+        """
+        Метод запоминания значений отслеживаемых полей (names - только указанных, остальные не меняются)
+        """
+        deferred = self.get_deferred_fields()
+        values = {
+            name: self._get_tracked_value(name)
+            for name in (self.tracked_fields if names is None else names)
+            if self._meta.get_field(name).attname not in deferred
+        }
+        if names is None:
+            self._tracked_values = values
+        else:
+            self._tracked_values = {**getattr(self, "_tracked_values", {}), **values}
+
+    def get_previous_values(self, *names):
+        """
+        Метод получения сохраненных в БД значений полей (по умолчанию - всех отслеживаемых). Поля, не загруженные
+        в объект, пропускаются (их значение не менялось). Значения, не запомненные при загрузке (объект создан
+        вручную с pk), читаются из БД одним запросом
+        """
+        names = names or self.tracked_fields
+        deferred = self.get_deferred_fields()
+        names = [
+            name for name in names if self._meta.get_field(name).attname not in deferred
+        ]
+        tracked = getattr(self, "_tracked_values", {})
+        values = {name: tracked[name] for name in names if name in tracked}
+        missing = [name for name in names if name not in tracked]
+        if missing and self.pk is not None:
+            row = (
+                type(self)
+                ._base_manager.filter(pk=self.pk)
+                .values(*(self._meta.get_field(name).attname for name in missing))
+                .first()
+            )
+            for name in missing:
+                attname = self._meta.get_field(name).attname
+                values[name] = row[attname] if row is not None else None
+        return values
+
+    def has_changed(self, name):
+        """
+        Метод проверки, изменилось ли поле по сравнению с сохраненным в БД значением
+        """
+        previous = self.get_previous_values(name)
+        return name in previous and previous[name] != self._get_tracked_value(name)
+
+
+class ImageTooLargeError(ValueError):
+    """
+    Исключение: изображение больше IMAGE_COMPRESS_MAX_PIXELS (декодирование потребовало бы слишком много памяти)
+    """
+
+
+def check_image_pixels(im):
+    """
+    Метод проверки кол-ва пикселей открытого (еще не декодированного) изображения
+    """
+    pixels = im.size[0] * im.size[1]
+    if pixels > settings.IMAGE_COMPRESS_MAX_PIXELS:
+        raise ImageTooLargeError(
+            f"Изображение {im.size[0]}x{im.size[1]} больше допустимых "
+            f"{settings.IMAGE_COMPRESS_MAX_PIXELS} пикселей"
+        )
+
+
+def validate_image_pixels(image):
+    """
+    Валидатор поля изображения: изображение не больше IMAGE_COMPRESS_MAX_PIXELS (читается только заголовок файла).
+    Уже сохраненные файлы не проверяются
+    """
+    if getattr(image, "_committed", False):
+        return
+    try:
+        with Image.open(image) as im:
+            check_image_pixels(im)
+    except ImageTooLargeError as error:
+        raise ValidationError(str(error))
+    finally:
+        image.seek(0)
+
+
+def image_compress(image, width, profile="default"):
+    """
+    Метод для сжатия загруженного фото и конвертации в webp.
+    Пиковая память ограничена: JPEG декодируется сразу в уменьшенном масштабе (draft), изображение сначала
+    уменьшается в целое число раз (reduce) и только потом сглаживается до нужной ширины, а результат пишется
+    во временный файл (в памяти до IMAGE_COMPRESS_SPOOL_SIZE байт, далее на диске). Качество и трудоемкость
+    сжатия задаются профилем из IMAGE_COMPRESS_PROFILES
+    """
+    options = settings.IMAGE_COMPRESS_PROFILES[profile]
     im = Image.open(
         image
-    )  # Передаем переменной im открыть и идентифицировать файл изображения
+    )  # Открытие файла (читается только заголовок, без декодирования)
+    check_image_pixels(im)  # Защита от слишком больших изображений
     aspect_ratio = im.size[0] / im.size[1]  # Расчет соотношения сторон
-    height = int(width / aspect_ratio)  # Расчет высоты сжатого изображения
-    im = im.resize(
-        (width, height)
-    )  # Меняем разрешение изображения на рассчитанное выше
-    im_bytes = BytesIO()  #  Создание потока, использующего буфер байтов в памяти
+    height = max(1, int(width / aspect_ratio))  # Расчет высоты сжатого изображения
+
+    # JPEG: декодирование в масштабе 1/2, 1/4 или 1/8, но не меньше целевого размера
+    if im.format == "JPEG":
+        im.draft("RGB", (width, height))
+    # Уменьшение в целое число раз (быстро и без большого промежуточного буфера), с запасом x2 для сглаживания
+    factor = min(im.size[0] // (width * 2), im.size[1] // (height * 2))
+    if factor > 1:
+        im = im.reduce(factor)
+    im = im.resize((width, height), Image.LANCZOS)  # Меняем разрешение изображения
+    if im.mode not in ("RGB", "RGBA"):
+        im = im.convert(
+            "RGBA" if "A" in im.getbands() or "transparency" in im.info else "RGB"
+        )
+
+    # Поток во временный файл вместо буфера байтов в памяти (без лишней копии через getvalue)
+    output = SpooledTemporaryFile(max_size=settings.IMAGE_COMPRESS_SPOOL_SIZE)
     im.save(
-        fp=im_bytes, format="WEBP", quality=100
-    )  # Выбираем формат выходного изображения и его качество
-    image_content_file = ContentFile(
-        content=im_bytes.getvalue()
-    )  # Получаем байтовое значение файла
+        fp=output,
+        format="WEBP",
+        quality=options["quality"],
+        method=options["method"],
+    )  # Выбираем формат выходного изображения и параметры сжатия
+    size = output.tell()
+    output.seek(0)
     name = f'{".".join(image.name.split(".")[0:-1])}_compressed.WEBP'  # Переименовываем файл
-    image_compressed = File(image_content_file, name=name)  # Сохраняем файл
+    image_compressed = File(output, name=name)  # Файл для сохранения в хранилище
+    image_compressed.size = size
     return image_compressed
 
 
+class SlugAllocator:
+    """
+    Класс выбора уникальных slug для поля модели. Все занятые slug с той же основой получаются одним запросом
+    (slug LIKE 'основа%'), после чего выбирается первый свободный вариант "основа", "основа-2", "основа-3"...
+    Длина slug не превышает max_length поля (при необходимости основа укорачивается под суффикс)
+    """
+
+    suffix_reserve = (
+        6  # Запас длины под суффикс "-N" при поиске занятых slug (до "-99999")
+    )
+    batch_size = 500  # Кол-во основ в одном запросе массового режима (ограничение глубины выражения SQLite)
+
+    def __init__(self, model, field_name="slug", using=None):
+        self.model = model
+        self.field_name = field_name
+        self.max_length = model._meta.get_field(field_name).max_length
+        self.using = using
+        # Состояние массового режима: занятые slug, уже запрошенные префиксы, следующий номер суффикса по основе
+        self.taken = set()
+        self.queried = set()
+        self.next_number = {}
+
+    def get_base(self, text):
+        """
+        Метод формирования основы slug из текста (транслитерация, обрезка до max_length)
+        """
+        base = slugify(text)[: self.max_length].strip("-")
+        return base or uuid4().hex[: min(8, self.max_length)]
+
+    def get_prefix(self, base):
+        """
+        Метод получения общего начала всех вариантов slug с основой base (в т.ч. укороченных под суффикс)
+        """
+        return base[: max(1, self.max_length - self.suffix_reserve)]
+
+    def get_candidate(self, base, number):
+        """
+        Метод формирования варианта slug с номером (1 - без суффикса)
+        """
+        if number == 1:
+            return base
+        suffix = f"-{number}"
+        return f"{base[: self.max_length - len(suffix)].rstrip('-')}{suffix}"
+
+    def get_taken(self, prefixes, exclude_pk=None):
+        """
+        Метод получения занятых slug, начинающихся с любого из префиксов (один запрос на batch_size префиксов)
+        """
+        queryset = self.model._base_manager.using(self.using)
+        if exclude_pk is not None:
+            queryset = queryset.exclude(pk=exclude_pk)
+        prefixes = sorted(set(prefixes))
+        taken = set()
+        for i in range(0, len(prefixes), self.batch_size):
+            condition = Q()
+            for prefix in prefixes[i : i + self.batch_size]:
+                condition |= Q(**{f"{self.field_name}__startswith": prefix})
+            taken.update(
+                queryset.filter(condition).values_list(self.field_name, flat=True)
+            )
+        return taken
+
+    def pick(self, base, taken):
+        """
+        Метод выбора первого свободного варианта slug (выбранный slug добавляется в taken)
+        """
+        number = self.next_number.get(base, 1)
+        while (candidate := self.get_candidate(base, number)) in taken:
+            number += 1
+        taken.add(candidate)
+        self.next_number[base] = number + 1
+        return candidate
+
+    def allocate(self, text, exclude_pk=None):
+        """
+        Метод получения уникального slug для одного объекта (один запрос к БД)
+        """
+        base = self.get_base(text)
+        return self.pick(base, self.get_taken([self.get_prefix(base)], exclude_pk))
+
+    def allocate_many(self, texts):
+        """
+        Метод получения уникальных slug для множества новых объектов (массовый импорт): slug уникальны как между
+        собой, так и относительно БД. Объект помнит выданные slug и запрошенные префиксы, поэтому при импорте
+        пакетами один объект используется для всех пакетов, а занятые slug по каждому префиксу запрашиваются
+        один раз (по одному запросу на batch_size новых префиксов)
+        """
+        bases = [self.get_base(text) for text in texts]
+        prefixes = {self.get_prefix(base) for base in bases}
+        new = [
+            prefix
+            for prefix in prefixes
+            if not any(prefix[:i] in self.queried for i in range(1, len(prefix) + 1))
+        ]
+        if new:
+            self.taken |= self.get_taken(new)
+            self.queried.update(new)
+        return [self.pick(base, self.taken) for base in bases]
+
+
 def unique_slugify(instance, slug):
     """
     Функция: генерация уникального SLUG для объекта модели
     """
-    model = instance.__class__  # Получаем модель по объекту
-    unique_slug = slugify(
-        slug
-    )  # Формируем уникальный slug из переданного функции аргумента slug
-    while model.objects.filter(
-        slug=unique_slug
-    ).exists():  # Пока наш уникальный slug повторяет другой
-        unique_slug = f"{unique_slug}-{uuid4().hex[:8]}"  # Сформируем новый slug
-    return unique_slug
+    return SlugAllocator(type(instance), using=instance._state.db).allocate(
+        slug, exclude_pk=instance.pk
+    )
 
 
-class CkeditorCustomStorage(FileSystemStorage):
+class UniqueSlugMixin:
     """
-    Кастомное расположение для медиа файлов редактора
+    Класс миксина модели, заполняющего пустой slug уникальным значением из поля slug_source при сохранении.
+    Если параллельный запрос успел занять тот же slug (IntegrityError), slug выбирается заново (до slug_attempts раз);
+    сохранение выполняется в точке сохранения транзакции, поэтому ошибка не прерывает внешнюю транзакцию
     """
 
-    def _save(self, name, content):
-        folder_name = datetime.now().strftime(
-            "%Y/%m/%d"
-        )  # Присваиваем имя папки в формате (год > месяц > день)
-        name = os.path.join(
-            folder_name, name
-        )  # Включаем в имя файла расположение в соответсвующих дате папках
-        return super()._save(name, content)
+    slug_source = "title"  # Поле, из которого формируется slug
+    slug_attempts = 3  # Кол-во попыток сохранения при конфликте slug
+
+    def save(self, *args, **kwargs):
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        for attempt in range(1, self.slug_attempts + 1):
+            self.slug = unique_slugify(self, getattr(self, self.slug_source))
+            try:
+                with transaction.atomic(using=using):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Ошибка не из-за slug или попытки исчерпаны - пробрасываем
+                conflict = (
+                    type(self)
+                    ._base_manager.using(using)
+                    .filter(slug=self.slug)
+                    .exclude(pk=self.pk)
+                    .exists()
+                )
+                self.slug = ""
+                if not conflict or attempt == self.slug_attempts:
+                    raise
+
+
+class CkeditorCustomStorage(ContentAddressedStorage):
+    """
+    Кастомное расположение для медиа файлов редактора. Файлы хранятся под именами из хэша содержимого (одинаковые
+    загрузки - один файл на диске, удаление файла одной статьи не затрагивает другие статьи с тем же файлом)
+    """
 
     location = os.path.join(
         settings.MEDIA_ROOT, "blog/uploads/"
@@ -106,3 +685,46 @@ class CkeditorCustomStorage(FileSystemStorage):
     base_url = urljoin(
         settings.MEDIA_URL, "blog/uploads/"
     )  # URL-адрес, по которому хранятся файлы в этом каталоге
+    key_prefix = "blog/uploads"  # Путь каталога относительно MEDIA_ROOT (для учета ссылок на файлы)
+
+
+def delete_unused_uploads(old_html, new_html, queryset, field_name):
+    """
+    Функция удаления (после коммита транзакции) файлов редактора, на которые ссылался старый текст статьи,
+    но не ссылается новый. Файл, вставленный и в текст (поле field_name) другого объекта queryset, не удаляется
+    """
+    storage = CkeditorCustomStorage()
+    pattern = re.compile(
+        r'<img[^>]+src=["\']{0}([^"\']+)["\']'.format(re.escape(storage.base_url))
+    )
+    unused = set(pattern.findall(old_html or "")) - set(pattern.findall(new_html or ""))
+
+    def delete():
+        for name in unused:
+            lookup = {f"{field_name}__contains": storage.base_url + name}
+            if queryset.filter(**lookup).exists():
+                continue
+            try:
+                storage.delete(unquote(name))
+            except SuspiciousFileOperation:  # Путь за пределами папки редактора
+                pass
+
+    if unused:
+        transaction.on_commit(delete)
+
+
+def replace_views(urlpatterns, views):
+    """
+    Функция получения копии списка маршрутов, в которой представления маршрутов с именами из словаря views
+    заменены (например, асинхронными версиями). Остальные маршруты остаются прежними
+    """
+    return [
+        (
+            URLPattern(
+                pattern.pattern, views[pattern.name], pattern.default_args, pattern.name
+            )
+            if isinstance(pattern, URLPattern) and pattern.name in views
+            else pattern
+        )
+        for pattern in urlpatterns
+    ]